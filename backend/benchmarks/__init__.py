@@ -0,0 +1,14 @@
+"""
+Benchmarks del backend de MiConsorcio
+
+Se ejecutan desde el directorio backend/:
+
+    python -m benchmarks.run --sizes 100,1000,10000
+    python -m benchmarks.compare results/base.json results/nuevo.json
+
+- generator: datos sintéticos deterministas de un consorcio
+- microbench: mide los caminos críticos para un tamaño (en un proceso propio)
+- run: ejecuta microbench para cada tamaño y guarda los resultados en JSON
+- coldload: carga en frío de la base en JSON y en snapshot binario
+- compare: compara dos archivos de resultados (por ejemplo, entre commits)
+"""
@@ -0,0 +1,156 @@
+"""
+Carga en frío de la base: JSON contra snapshot binario (database.snapshot)
+
+Para cada tamaño genera la base en JSON, la convierte a snapshot y mide,
+cada caso en un proceso nuevo:
+
+- open: leer el archivo hasta tener la base (el snapshot no decodifica
+  ninguna colección), acceder a los participantes y luego al resto
+- load: la primera carga completa del almacén (lectura e índices), como al
+  arrancar un worker o recargar un consorcio desalojado
+
+Se informa el tiempo, la memoria residente al terminar y el pico de memoria.
+
+Uso:
+    python -m benchmarks.coldload --sizes 10000,100000,1000000
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+from benchmarks.generator import DEFAULT_SEED, SyntheticConsorcio, scale_for
+
+
+FORMATS = ("json", "snapshot")
+MODES = ("open", "load")
+
+
+def _max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB y macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _rss_bytes() -> int:
+    # Memoria residente actual (solo Linux); en otros sistemas, el pico
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return _max_rss_bytes()
+
+
+def child(data_dir: str, mode: str) -> dict:
+    """
+    Medir una carga en frío en el proceso actual
+
+    Args:
+        data_dir (str): Directorio con database.json (en cualquiera de los dos formatos)
+        mode (str): "open" o "load"
+
+    Returns:
+        dict: Tiempos (segundos) y memoria (bytes)
+    """
+    os.environ["MICONSORCIO_DATA_DIR"] = data_dir
+    # Importar la aplicación recién ahora: config lee MICONSORCIO_DATA_DIR
+    from database import snapshot
+    from database.connection import load_database
+
+    baseline = _rss_bytes()
+    result = {}
+    start = time.perf_counter()
+    if mode == "open":
+        db, _ = snapshot.read_ledger(os.path.join(data_dir, "database.json"))
+        result["open_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        len(db.participantes)
+        result["participantes_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot.materialize(db)
+        result["all_s"] = time.perf_counter() - start
+    else:
+        # La aplicación completa registra todos los índices que se construyen al cargar
+        import main  # noqa: F401
+        baseline = _rss_bytes()
+        start = time.perf_counter()
+        load_database()
+        result["load_s"] = time.perf_counter() - start
+    result["rss_bytes"] = _rss_bytes() - baseline
+    result["max_rss_bytes"] = _max_rss_bytes()
+    return result
+
+
+def run(sizes: List[int], seed: int) -> List[dict]:
+    """
+    Generar las bases y medir cada formato y modo en un proceso propio
+
+    Args:
+        sizes (List[int]): Cantidades de gastos (ver benchmarks.generator.scale_for)
+        seed (int): Semilla del generador
+
+    Returns:
+        List[dict]: Una fila por tamaño, formato y modo
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for size in sizes:
+        root = tempfile.mkdtemp(prefix=f"coldload-{size}-")
+        try:
+            dirs = {name: os.path.join(root, name) for name in FORMATS}
+            for path in dirs.values():
+                os.makedirs(path)
+            source = os.path.join(dirs["json"], "database.json")
+            SyntheticConsorcio(scale_for(size), seed=seed).write(source)
+            subprocess.run(
+                [sys.executable, "-m", "database.snapshot", "to-snapshot",
+                 source, os.path.join(dirs["snapshot"], "database.json")],
+                cwd=backend_dir, check=True, stdout=subprocess.DEVNULL,
+                env={**os.environ, "MICONSORCIO_DATA_DIR": root}
+            )
+            for file_format in FORMATS:
+                file_bytes = os.path.getsize(os.path.join(dirs[file_format], "database.json"))
+                for mode in MODES:
+                    output = subprocess.run(
+                        [sys.executable, "-m", "benchmarks.coldload", "--child", dirs[file_format], "--mode", mode],
+                        cwd=backend_dir, check=True, capture_output=True, text=True
+                    ).stdout
+                    row = {"size": size, "format": file_format, "mode": mode, "file_bytes": file_bytes}
+                    row.update(json.loads(output.strip().splitlines()[-1]))
+                    results.append(row)
+                    print(_format_row(row), file=sys.stderr)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def _format_row(row: dict) -> str:
+    times = "  ".join(f"{key[:-2]}={row[key] * 1000:.0f}ms" for key in ("open_s", "participantes_s", "all_s", "load_s") if key in row)
+    return (
+        f"[{row['size']}] {row['format']:<8} {row['mode']:<4} archivo={row['file_bytes'] / 1e6:.1f}MB  "
+        f"{times}  rss={row['rss_bytes'] / 1e6:.0f}MB  pico={row['max_rss_bytes'] / 1e6:.0f}MB"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Carga en frío: JSON contra snapshot binario")
+    parser.add_argument("--sizes", default="10000,100000", help="Cantidades de gastos separadas por coma")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Semilla del generador")
+    parser.add_argument("--child", metavar="DATA_DIR", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, default="load", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child, args.mode)))
+        return
+    results = run([int(size) for size in args.sizes.split(",")], args.seed)
+    json.dump(results, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
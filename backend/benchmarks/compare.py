@@ -0,0 +1,102 @@
+"""
+Comparar dos archivos de resultados de benchmarks
+
+Compara cada operación y tamaño presentes en ambos archivos y termina con
+código 1 si alguna empeoró más que el umbral, de modo que se puede usar
+para frenar una regresión entre commits.
+
+Uso:
+    python -m benchmarks.compare results/base.json results/nuevo.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+def load_results(path: str, metric: str) -> Dict[Tuple[str, int], Tuple[float, str]]:
+    """
+    Leer un archivo de resultados
+
+    Args:
+        path (str): Archivo generado por benchmarks.run
+        metric (str): Estadística de los tiempos a comparar (median, min o mean)
+
+    Returns:
+        Dict[Tuple[str, int], Tuple[float, str]]: Valor y unidad por (operación, tamaño)
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        (result["name"], result["size"]): (result.get(metric, result["value"]), result["unit"])
+        for result in data["results"]
+    }
+
+
+def _format(value: float, unit: str) -> str:
+    if unit == "s":
+        if value < 1e-3:
+            return f"{value * 1e6:.1f} µs"
+        if value < 1:
+            return f"{value * 1e3:.2f} ms"
+        return f"{value:.2f} s"
+    if unit == "bytes":
+        return f"{value / 1e6:.1f} MB"
+    return f"{value:g} {unit}"
+
+
+def compare(base: dict, new: dict, threshold: float, min_delta: float) -> Tuple[List[str], List[str]]:
+    """
+    Comparar dos conjuntos de resultados
+
+    Args:
+        base (dict): Resultados de referencia
+        new (dict): Resultados a evaluar
+        threshold (float): Aumento relativo tolerado (0.1 = 10 %)
+        min_delta (float): Diferencia de tiempo mínima (segundos) para considerar una regresión
+
+    Returns:
+        Tuple[List[str], List[str]]: Líneas de la tabla y operaciones que empeoraron
+    """
+    lines = [f"{'operación':<32} {'tamaño':>9} {'base':>12} {'nuevo':>12} {'cambio':>9}"]
+    regressions = []
+    for key in sorted(base.keys() & new.keys(), key=lambda k: (k[0], k[1])):
+        name, size = key
+        (old_value, unit), (new_value, _) = base[key], new[key]
+        change = (new_value - old_value) / old_value if old_value else 0.0
+        regressed = change > threshold and (unit != "s" or new_value - old_value > min_delta)
+        marker = "  <-- regresión" if regressed else ""
+        lines.append(
+            f"{name:<32} {size:>9} {_format(old_value, unit):>12} {_format(new_value, unit):>12} "
+            f"{change:>+8.1%}{marker}"
+        )
+        if regressed:
+            regressions.append(f"{name} [{size}]")
+    for key in sorted(base.keys() ^ new.keys()):
+        lines.append(f"{key[0]:<32} {key[1]:>9}  (solo en {'base' if key in base else 'nuevo'})")
+    return lines, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Comparar resultados de benchmarks")
+    parser.add_argument("base", help="Resultados de referencia")
+    parser.add_argument("new", help="Resultados a evaluar")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Aumento relativo tolerado (0.10 = 10%%)")
+    parser.add_argument("--min-delta", type=float, default=1e-5, help="Diferencia mínima de tiempo (s) para fallar")
+    parser.add_argument("--metric", choices=("median", "min", "mean"), default="min", help="Estadística a comparar")
+    args = parser.parse_args(argv)
+
+    lines, regressions = compare(
+        load_results(args.base, args.metric),
+        load_results(args.new, args.metric),
+        args.threshold,
+        args.min_delta
+    )
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regresiones por encima de {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Generador determinista de consorcios sintéticos
+
+La misma escala y la misma semilla producen siempre el mismo archivo, byte
+a byte, de modo que los resultados de distintos commits se miden sobre los
+mismos datos. Los IDs son ULID con timestamps crecientes (como los que
+genera la aplicación) y los gastos se reparten entre grupos chicos de
+participantes, con algunos gastos de todo un piso.
+
+Uso:
+    python -m benchmarks.generator --size 10000 --output /tmp/database.json
+    python -m benchmarks.generator --participantes 40 --gastos 5000 --pagos 800 --usuarios 40 --output db.json
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, TextIO
+import bcrypt
+from utils.helpers import _encode_ulid
+
+
+# Semilla por defecto
+DEFAULT_SEED = 20250101
+
+# Contraseña de todos los usuarios generados (para logins en pruebas de carga)
+PASSWORD = "benchmark"
+
+# Sal fija: el hash (y por lo tanto el archivo) es el mismo en cada ejecución
+_BCRYPT_SALT = b"MiConsorcioBenchmarkSe"
+
+# Fecha de creación del primer registro de cada colección
+_BASE_TIMESTAMP_MS = int(datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+# Separación entre registros consecutivos (gastos y pagos se intercalan)
+_GASTO_STEP_MS = 60_000
+_PAGO_STEP_MS = 4 * _GASTO_STEP_MS
+
+_NOMBRES = [
+    "María", "Juan", "Lucía", "Carlos", "Sofía", "Martín", "Valentina", "Diego",
+    "Camila", "Santiago", "Florencia", "Matías", "Agustina", "Nicolás", "Julieta", "Tomás"
+]
+_APELLIDOS = [
+    "González", "Rodríguez", "Fernández", "López", "Martínez", "Pérez", "Gómez", "Díaz",
+    "Sánchez", "Romero", "Álvarez", "Torres", "Ruiz", "Ramírez", "Acosta", "Benítez"
+]
+
+# Categorías con su peso relativo
+_CATEGORIAS = [
+    ("Mantenimiento", 20), ("Limpieza", 15), ("Servicios", 15), ("Ascensor", 8),
+    ("Reparaciones", 10), ("Jardinería", 5), ("Seguridad", 6), ("Administración", 8),
+    ("Seguros", 3), ("Impuestos", 4), ("Plomería", 4), ("Electricidad", 2)
+]
+
+_ACCIONES = ["Reparación", "Cambio", "Limpieza", "Revisión", "Pintura", "Compra", "Instalación", "Service"]
+_OBJETOS = [
+    "de cañería", "del ascensor", "de luces", "de la bomba de agua", "del portón",
+    "de matafuegos", "de vidrios", "del tanque", "de cerradura", "de membrana"
+]
+_LUGARES = ["del hall", "de la terraza", "del garage", "del pasillo", "de la escalera", "del SUM", "", ""]
+
+# Tamaños de reparto: (mínimo, máximo, peso relativo)
+_SPLITS = [(2, 4, 60), (5, 8, 30), (9, 16, 10)]
+
+_UNIT_LETTERS = "ABCDEFGH"
+
+
+class Scale(NamedTuple):
+    """Cantidad de registros de cada colección"""
+    participantes: int
+    gastos: int
+    pagos: int
+    usuarios: int
+
+
+def scale_for(size: int) -> Scale:
+    """
+    Escala típica para una cantidad de gastos
+
+    Los pagos son un cuarto de los gastos y la cantidad de unidades crece con
+    el volumen (entre 8 y 5000), con un usuario por participante.
+
+    Args:
+        size (int): Cantidad de gastos
+
+    Returns:
+        Scale: Escala del consorcio
+    """
+    participantes = min(max(size // 200, 8), 5000)
+    return Scale(
+        participantes=participantes,
+        gastos=size,
+        pagos=max(size // 4, 1),
+        usuarios=participantes
+    )
+
+
+def _ulid(rng: random.Random, timestamp_ms: int) -> str:
+    return _encode_ulid((timestamp_ms << 80) | rng.getrandbits(80))
+
+
+def _fecha(timestamp_ms: int, rng: random.Random) -> str:
+    created = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+    return (created - timedelta(days=rng.randint(0, 10))).strftime("%Y-%m-%d")
+
+
+class SyntheticConsorcio:
+    """Datos de un consorcio sintético con el formato de database.json"""
+
+    def __init__(self, scale: Scale, seed: int = DEFAULT_SEED, bcrypt_rounds: int = 4):
+        """
+        Args:
+            scale (Scale): Cantidad de registros de cada colección
+            seed (int): Semilla de la generación
+            bcrypt_rounds (int): Costo del hash de las contraseñas (12 en producción)
+        """
+        if scale.participantes < 2:
+            raise ValueError("Se necesitan al menos 2 participantes")
+        if scale.usuarios > scale.participantes:
+            raise ValueError("No puede haber más usuarios que participantes")
+        self.scale = scale
+        self.seed = seed
+        self.bcrypt_rounds = bcrypt_rounds
+        # Los IDs se calculan una vez: los gastos y pagos los referencian
+        rng = self._rng("ids")
+        self.participante_ids = [
+            _ulid(rng, _BASE_TIMESTAMP_MS - scale.participantes + i) for i in range(scale.participantes)
+        ]
+        self.usuario_ids = [
+            _ulid(rng, _BASE_TIMESTAMP_MS - scale.usuarios + i) for i in range(scale.usuarios)
+        ]
+
+    def _rng(self, collection: str) -> random.Random:
+        """Generador propio por colección: cada una es reproducible por separado"""
+        return random.Random(f"{self.seed}:{collection}")
+
+    def email(self, index: int) -> str:
+        """Email del participante (y usuario) número index"""
+        return f"unidad{index + 1}@consorcio.com.ar"
+
+    def participantes(self) -> Iterator[dict]:
+        """Participantes, uno por unidad"""
+        rng = self._rng("participantes")
+        for i, participante_id in enumerate(self.participante_ids):
+            yield {
+                "id": participante_id,
+                "nombre": f"{rng.choice(_NOMBRES)} {rng.choice(_APELLIDOS)}",
+                "email": self.email(i),
+                "telefono": f"11{rng.randint(40000000, 69999999)}",
+                "unidad": f"{i // len(_UNIT_LETTERS) + 1}{_UNIT_LETTERS[i % len(_UNIT_LETTERS)]}",
+                "activo": rng.random() < 0.95,
+                "version": 1
+            }
+
+    def usuarios(self) -> Iterator[dict]:
+        """Usuarios de los primeros participantes, todos con la contraseña PASSWORD"""
+        salt = b"$2b$%02d$" % self.bcrypt_rounds + _BCRYPT_SALT
+        password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), salt).decode("utf-8")
+        for i, usuario_id in enumerate(self.usuario_ids):
+            yield {
+                "id": usuario_id,
+                "participante_id": self.participante_ids[i],
+                "email": self.email(i),
+                "password_hash": password_hash,
+                "activo": True
+            }
+
+    def _split(self, rng: random.Random, pagador: str) -> List[str]:
+        low, high, _ = rng.choices(_SPLITS, weights=[w for _, _, w in _SPLITS])[0]
+        size = min(rng.randint(low, high), len(self.participante_ids))
+        participantes = rng.sample(self.participante_ids, size)
+        # Casi siempre el que paga también aporta
+        if pagador not in participantes and rng.random() < 0.8:
+            participantes[0] = pagador
+        return participantes
+
+    def gastos(self) -> Iterator[dict]:
+        """Gastos en orden de creación"""
+        rng = self._rng("gastos")
+        categorias = [c for c, _ in _CATEGORIAS]
+        pesos = [w for _, w in _CATEGORIAS]
+        for i in range(self.scale.gastos):
+            timestamp_ms = _BASE_TIMESTAMP_MS + i * _GASTO_STEP_MS
+            pagador = rng.choice(self.participante_ids)
+            yield {
+                "id": _ulid(rng, timestamp_ms),
+                "descripcion": " ".join(
+                    filter(None, (rng.choice(_ACCIONES), rng.choice(_OBJETOS), rng.choice(_LUGARES)))
+                ),
+                "monto": round(rng.lognormvariate(9.5, 1.0), 2),
+                "fecha": _fecha(timestamp_ms, rng),
+                "categoria": rng.choices(categorias, weights=pesos)[0],
+                "comprobante": None,
+                "pagado_por": pagador,
+                "participantes": self._split(rng, pagador),
+                "creado_por": rng.choice(self.usuario_ids),
+                "version": 1
+            }
+
+    def pagos(self) -> Iterator[dict]:
+        """Pagos entre participantes en orden de creación"""
+        rng = self._rng("pagos")
+        for i in range(self.scale.pagos):
+            timestamp_ms = _BASE_TIMESTAMP_MS + i * _PAGO_STEP_MS
+            deudor, acreedor = rng.sample(self.participante_ids, 2)
+            fecha = _fecha(timestamp_ms, rng)
+            yield {
+                "id": _ulid(rng, timestamp_ms),
+                "descripcion": f"Pago de expensas {fecha[:7]}",
+                "monto": round(rng.lognormvariate(8.5, 0.8), 2),
+                "fecha": fecha,
+                "deudor_id": deudor,
+                "acreedor_id": acreedor,
+                "comprobante": "",
+                "creado_por": rng.choice(self.usuario_ids),
+                "version": 1
+            }
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Base completa en memoria (solo para escalas chicas)
+
+        Returns:
+            Dict[str, object]: Datos con el formato de database.json
+        """
+        return {
+            "gastos": list(self.gastos()),
+            "pagos": list(self.pagos()),
+            "participantes": list(self.participantes()),
+            "usuarios": list(self.usuarios()),
+            "usuarioActual": None
+        }
+
+    def write(self, path: str) -> int:
+        """
+        Escribir la base en un archivo, registro por registro
+
+        El resultado es idéntico a json.dumps(self.to_dict(), indent=2) (el
+        formato que escribe la aplicación) sin tener toda la base en memoria.
+
+        Args:
+            path (str): Ruta del archivo a escribir
+
+        Returns:
+            int: Tamaño del archivo en bytes
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{")
+            for index, (name, records) in enumerate((
+                ("gastos", self.gastos()),
+                ("pagos", self.pagos()),
+                ("participantes", self.participantes()),
+                ("usuarios", self.usuarios())
+            )):
+                f.write(",\n" if index else "\n")
+                _write_list(f, name, records)
+            f.write(',\n  "usuarioActual": null\n}')
+            return f.tell()
+
+
+def _write_list(f: TextIO, name: str, records: Iterator[dict]) -> None:
+    f.write(f'  "{name}": [')
+    empty = True
+    for record in records:
+        f.write("\n    " if empty else ",\n    ")
+        f.write(json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+        empty = False
+    f.write("]" if empty else "\n  ]")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generar un consorcio sintético (database.json)")
+    parser.add_argument("--size", type=int, default=1000, help="Cantidad de gastos (define la escala típica)")
+    parser.add_argument("--participantes", type=int, help="Cantidad de participantes (N)")
+    parser.add_argument("--gastos", type=int, help="Cantidad de gastos (M)")
+    parser.add_argument("--pagos", type=int, help="Cantidad de pagos (P)")
+    parser.add_argument("--usuarios", type=int, help="Cantidad de usuarios (K)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Semilla")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="Costo del hash de contraseñas")
+    parser.add_argument("--output", required=True, help="Archivo a escribir")
+    args = parser.parse_args(argv)
+
+    scale = scale_for(args.size)._replace(**{
+        field: value for field in Scale._fields
+        if (value := getattr(args, field)) is not None
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    size = SyntheticConsorcio(scale, seed=args.seed, bcrypt_rounds=args.bcrypt_rounds).write(args.output)
+    print(f"{args.output}: {scale} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+Prueba de carga HTTP de punta a punta
+
+Levanta main:app con uvicorn sobre un consorcio sintético (ver
+benchmarks.generator) y lo recorre con usuarios virtuales concurrentes que
+mezclan lecturas del dashboard, altas de gastos y pagos, logins y subidas
+de comprobantes. Informa throughput y latencias p50/p95/p99 por ruta.
+
+Con --baseline compara contra un resultado guardado y termina con código
+1 si alguna ruta empeoró más que el umbral (--update-baseline lo reescribe).
+
+Uso:
+    python -m benchmarks.loadtest --size 10000 --concurrency 16 --duration 30
+    python -m benchmarks.loadtest --baseline benchmarks/baselines/loadtest.json
+    python -m benchmarks.loadtest --url http://localhost:8000   # servidor ya levantado
+
+Requiere httpx.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from benchmarks.generator import DEFAULT_SEED, PASSWORD, SyntheticConsorcio, scale_for
+from benchmarks.run import BACKEND_DIR, environment
+
+try:
+    import httpx
+except ImportError:  # httpx es una dependencia de desarrollo
+    httpx = None
+
+
+# Peso relativo de cada operación en la mezcla por defecto
+DEFAULT_MIX = {
+    "list_gastos": 25,
+    "list_pagos": 15,
+    "list_participantes": 15,
+    "create_gasto": 15,
+    "create_pago": 10,
+    "login": 5,
+    "upload": 5
+}
+
+# Ruta (método y plantilla) que ejercita cada operación
+ROUTES = {
+    "list_gastos": "GET /gastos/",
+    "list_pagos": "GET /pagos/",
+    "list_participantes": "GET /participantes/",
+    "create_gasto": "POST /gastos/",
+    "create_pago": "POST /pagos/",
+    "login": "POST /auth/login",
+    "upload": "POST /upload/comprobante"
+}
+
+# Percentiles informados
+PERCENTILES = (50, 95, 99)
+
+# Versión del formato de los archivos de resultados
+RESULTS_FORMAT = 1
+
+
+class Sample(NamedTuple):
+    """Resultado de una petición"""
+    operation: str
+    latency: float
+    status: int
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Percentil por rango más cercano
+
+    Args:
+        sorted_values (List[float]): Valores ordenados de menor a mayor
+        p (float): Percentil (0 a 100)
+
+    Returns:
+        float: Valor del percentil (0 si no hay valores)
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _png(seed: int, width: int = 64, height: int = 64) -> bytes:
+    """Imagen PNG chica y distinta para cada seed (sin depender de Pillow)"""
+    rng = random.Random(seed)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _pdf(seed: int, size: int = 32 * 1024) -> bytes:
+    """Contenido con forma de PDF, distinto para cada seed"""
+    return b"%PDF-1.4\n" + random.Random(seed).randbytes(size) + b"\n%%EOF\n"
+
+
+class Workload:
+    """Peticiones de la mezcla, con datos tomados del consorcio del servidor"""
+
+    def __init__(self, client: "httpx.AsyncClient", participantes: List[dict], seed: int):
+        self.client = client
+        self.participante_ids = [p["id"] for p in participantes]
+        self.emails = [p["email"] for p in participantes]
+        self.seed = seed
+        self._uploads = 0
+
+    async def list_gastos(self, rng: random.Random) -> "httpx.Response":
+        return await self.client.get("/gastos/")
+
+    async def list_pagos(self, rng: random.Random) -> "httpx.Response":
+        return await self.client.get("/pagos/")
+
+    async def list_participantes(self, rng: random.Random) -> "httpx.Response":
+        return await self.client.get("/participantes/")
+
+    async def create_gasto(self, rng: random.Random) -> "httpx.Response":
+        participantes = rng.sample(self.participante_ids, min(rng.randint(2, 6), len(self.participante_ids)))
+        return await self.client.post("/gastos/", json={
+            "descripcion": "Prueba de carga",
+            "monto": round(rng.uniform(1000, 50000), 2),
+            "fecha": "2025-01-15",
+            "categoria": "Mantenimiento",
+            "pagado_por": participantes[0],
+            "participantes": participantes,
+            "creado_por": participantes[0]
+        })
+
+    async def create_pago(self, rng: random.Random) -> "httpx.Response":
+        deudor, acreedor = rng.sample(self.participante_ids, 2)
+        return await self.client.post("/pagos/", json={
+            "descripcion": "Prueba de carga",
+            "monto": round(rng.uniform(500, 20000), 2),
+            "fecha": "2025-01-15",
+            "deudor_id": deudor,
+            "acreedor_id": acreedor,
+            "comprobante": "",
+            "creado_por": deudor
+        })
+
+    async def login(self, rng: random.Random) -> "httpx.Response":
+        return await self.client.post("/auth/login", json={
+            "email": rng.choice(self.emails),
+            "password": PASSWORD
+        })
+
+    async def upload(self, rng: random.Random) -> "httpx.Response":
+        # Contenido distinto en cada subida: el almacén deduplica por SHA-256
+        self._uploads += 1
+        seed = self.seed * 1_000_003 + self._uploads
+        if self._uploads % 2:
+            files = {"file": (f"ticket-{self._uploads}.png", _png(seed), "image/png")}
+        else:
+            files = {"file": (f"factura-{self._uploads}.pdf", _pdf(seed), "application/pdf")}
+        return await self.client.post("/upload/comprobante", files=files)
+
+
+async def run_load(
+    base_url: str,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int
+) -> Tuple[List[Sample], float]:
+    """
+    Ejecutar la carga contra un servidor
+
+    Args:
+        base_url (str): URL del servidor
+        mix (Dict[str, int]): Peso relativo de cada operación
+        concurrency (int): Usuarios virtuales simultáneos
+        duration (float): Duración de la medición (segundos)
+        warmup (float): Duración del calentamiento, que no se mide (segundos)
+        seed (int): Semilla de la secuencia de operaciones
+
+    Returns:
+        Tuple[List[Sample], float]: Peticiones medidas y duración real de la medición
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        response = await client.get("/participantes/")
+        response.raise_for_status()
+        workload = Workload(client, response.json(), seed)
+        if len(workload.participante_ids) < 2:
+            raise RuntimeError("El servidor necesita al menos 2 participantes")
+
+        operations = list(mix)
+        weights = [mix[name] for name in operations]
+        samples: List[Sample] = []
+        start = time.perf_counter()
+        measure_from = start + warmup
+        deadline = measure_from + duration
+
+        async def user(index: int) -> None:
+            rng = random.Random(f"{seed}:{index}")
+            while True:
+                operation = rng.choices(operations, weights=weights)[0]
+                request: Callable[[random.Random], Awaitable] = getattr(workload, operation)
+                sent = time.perf_counter()
+                if sent >= deadline:
+                    return
+                try:
+                    status = (await request(rng)).status_code
+                except httpx.HTTPError:
+                    status = 0
+                if sent >= measure_from:
+                    samples.append(Sample(operation, time.perf_counter() - sent, status))
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - max(measure_from, start)
+    return samples, elapsed
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, dict]:
+    """
+    Throughput, errores y percentiles de latencia por ruta
+
+    Args:
+        samples (List[Sample]): Peticiones medidas
+        elapsed (float): Duración de la medición (segundos)
+
+    Returns:
+        Dict[str, dict]: Estadísticas por ruta, más "total" con todas las peticiones
+    """
+    by_route: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_route[ROUTES[sample.operation]].append(sample)
+    by_route["total"] = samples
+
+    summary = {}
+    for route, route_samples in sorted(by_route.items()):
+        latencies = sorted(s.latency for s in route_samples)
+        stats = {
+            "count": len(route_samples),
+            "errors": sum(1 for s in route_samples if not 200 <= s.status < 300),
+            "throughput": len(route_samples) / elapsed if elapsed > 0 else 0.0,
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "max": latencies[-1] if latencies else 0.0
+        }
+        for p in PERCENTILES:
+            stats[f"p{p}"] = percentile(latencies, p)
+        summary[route] = stats
+    return summary
+
+
+def format_report(summary: Dict[str, dict]) -> str:
+    """Tabla legible de las estadísticas por ruta (latencias en ms)"""
+    lines = [
+        f"{'ruta':<28} {'peticiones':>10} {'errores':>8} {'req/s':>8} "
+        + " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+        + f" {'máx':>9}"
+    ]
+    for route, stats in summary.items():
+        lines.append(
+            f"{route:<28} {stats['count']:>10} {stats['errors']:>8} {stats['throughput']:>8.1f} "
+            + " ".join(f"{stats['p' + str(p)] * 1e3:>9.1f}" for p in PERCENTILES)
+            + f" {stats['max'] * 1e3:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def check_baseline(
+    summary: Dict[str, dict],
+    baseline: Dict[str, dict],
+    threshold: float,
+    min_delta: float
+) -> List[str]:
+    """
+    Comparar contra un resultado de referencia
+
+    Una ruta empeora si su p95 o p99 crece más que el umbral (y más que
+    min_delta), si su throughput cae más que el umbral o si aparecen errores
+    que la referencia no tenía.
+
+    Args:
+        summary (Dict[str, dict]): Estadísticas actuales
+        baseline (Dict[str, dict]): Estadísticas de referencia
+        threshold (float): Cambio relativo tolerado (0.2 = 20 %)
+        min_delta (float): Aumento mínimo de latencia (segundos) para fallar
+
+    Returns:
+        List[str]: Descripción de cada regresión (vacía si no hay)
+    """
+    regressions = []
+    for route, base in baseline.items():
+        current = summary.get(route)
+        if current is None or not current["count"]:
+            continue
+        for key in ("p95", "p99"):
+            if current[key] > base[key] * (1 + threshold) and current[key] - base[key] > min_delta:
+                regressions.append(
+                    f"{route}: {key} {base[key] * 1e3:.1f} ms -> {current[key] * 1e3:.1f} ms"
+                )
+        if current["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{route}: throughput {base['throughput']:.1f} -> {current['throughput']:.1f} req/s"
+            )
+        if current["errors"] and not base["errors"]:
+            regressions.append(f"{route}: {current['errors']} errores")
+    return regressions
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(work_dir: str, workers: int, extra_env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """
+    Levantar main:app con uvicorn sobre los datos de work_dir
+
+    El proceso corre con work_dir como directorio actual, de modo que nada
+    de lo que escribe el servidor queda dentro del repositorio.
+
+    Args:
+        work_dir (str): Directorio con data/database.json
+        workers (int): Procesos worker de uvicorn
+        extra_env (Dict[str, str]): Variables de entorno adicionales
+
+    Returns:
+        Tuple[subprocess.Popen, str]: Proceso del servidor y su URL
+
+    Raises:
+        RuntimeError: Si el servidor no responde a tiempo
+    """
+    port = _free_port()
+    env = {**os.environ, "MICONSORCIO_DATA_DIR": os.path.join(work_dir, "data"), **extra_env}
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--app-dir", BACKEND_DIR,
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+            "--no-access-log"
+        ],
+        cwd=work_dir,
+        env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó con código {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """Detener el servidor (SIGTERM y, si no termina, SIGKILL)"""
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, int]:
+    """
+    Leer una mezcla "operación=peso,..." (las no mencionadas quedan en 0)
+
+    Args:
+        text (Optional[str]): Mezcla en texto, o None para la mezcla por defecto
+
+    Returns:
+        Dict[str, int]: Peso por operación
+
+    Raises:
+        ValueError: Si alguna operación no existe o ningún peso es positivo
+    """
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Operación desconocida: {name} (opciones: {', '.join(ROUTES)})")
+        mix[name] = int(weight)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        raise ValueError("La mezcla no tiene operaciones con peso positivo")
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP de MiConsorcio")
+    parser.add_argument("--url", help="Servidor ya levantado (por defecto se levanta uno con datos sintéticos)")
+    parser.add_argument("--size", type=int, default=10000, help="Cantidad de gastos del consorcio sintético")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn del servidor levantado")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="Costo del hash de las contraseñas")
+    parser.add_argument("--concurrency", type=int, default=16, help="Usuarios virtuales simultáneos")
+    parser.add_argument("--duration", type=float, default=30, help="Duración de la medición (s)")
+    parser.add_argument("--warmup", type=float, default=5, help="Calentamiento sin medir (s)")
+    parser.add_argument("--mix", help="Pesos, por ejemplo list_gastos=50,create_gasto=10 (por defecto: "
+                        + ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()) + ")")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Semilla de los datos y de la mezcla")
+    parser.add_argument("--output", help="Guardar los resultados en JSON")
+    parser.add_argument("--baseline", help="Resultado de referencia con el que comparar")
+    parser.add_argument("--update-baseline", action="store_true", help="Reescribir --baseline con este resultado")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Empeoramiento tolerado (0.20 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Aumento mínimo de latencia (s) para fallar")
+    parser.add_argument("--keep-data", action="store_true", help="No borrar el directorio del servidor levantado")
+    args = parser.parse_args(argv)
+
+    if httpx is None:
+        parser.error("La prueba de carga requiere httpx (pip install httpx)")
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline requiere --baseline")
+    mix = parse_mix(args.mix)
+
+    process = None
+    work_dir = None
+    url = args.url
+    try:
+        if url is None:
+            work_dir = tempfile.mkdtemp(prefix="miconsorcio-load-")
+            os.makedirs(os.path.join(work_dir, "data"))
+            consorcio = SyntheticConsorcio(scale_for(args.size), seed=args.seed, bcrypt_rounds=args.bcrypt_rounds)
+            consorcio.write(os.path.join(work_dir, "data", "database.json"))
+            # Sin recolector de comprobantes: su trabajo de fondo no es parte de la mezcla
+            process, url = start_server(work_dir, args.workers, {"MICONSORCIO_GC_INTERVAL_SECONDS": "0"})
+        print(
+            f"Carga contra {url}: {args.concurrency} usuarios, {args.warmup:g}s de calentamiento "
+            f"y {args.duration:g}s de medición",
+            file=sys.stderr
+        )
+        samples, elapsed = asyncio.run(
+            run_load(url, mix, args.concurrency, args.duration, args.warmup, args.seed)
+        )
+    finally:
+        if process is not None:
+            stop_server(process)
+        if work_dir is not None and not args.keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = summarize(samples, elapsed)
+    print(format_report(summary))
+
+    result = {
+        "format": RESULTS_FORMAT,
+        "environment": environment(),
+        "options": {
+            "url": args.url,
+            "size": None if args.url else args.size,
+            "workers": None if args.url else args.workers,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": mix,
+            "seed": args.seed
+        },
+        "routes": summary
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        if args.update_baseline:
+            os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+            print(f"Referencia guardada en {args.baseline}")
+            return
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("options", {}).get("mix") != mix:
+            print("Aviso: la referencia se midió con otra mezcla", file=sys.stderr)
+        regressions = check_baseline(summary, baseline["routes"], args.threshold, args.min_delta)
+        if regressions:
+            print(f"\nRegresiones respecto de {args.baseline}:")
+            print("\n".join(f"  {line}" for line in regressions))
+            sys.exit(1)
+        print(f"\nSin regresiones respecto de {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Microbenchmarks de los caminos críticos para un tamaño de base
+
+Corre en un proceso propio por tamaño (ver benchmarks.run): la
+configuración se lee de variables de entorno al importar los módulos de la
+aplicación, de modo que el directorio de datos se fija antes de importarlos
+y cada tamaño arranca con la memoria limpia.
+
+Uso:
+    python -m benchmarks.microbench --size 10000 --data-dir /tmp/bench-10000
+"""
+import argparse
+import gc
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional
+from benchmarks.generator import DEFAULT_SEED, SyntheticConsorcio, scale_for
+
+
+class Benchmark(NamedTuple):
+    """Operación a medir"""
+    name: str
+    func: Callable[[], object]
+    max_size: Optional[int] = None  # Tamaño máximo en que se ejecuta (None = siempre)
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """
+    Medir una operación como timeit: varias muestras de N llamadas cada una
+
+    N se elige para que cada muestra dure al menos min_time. El recolector
+    de basura se desactiva mientras se mide.
+
+    Args:
+        func (Callable[[], object]): Operación a medir
+        repeat (int): Cantidad de muestras
+        min_time (float): Duración mínima de cada muestra (segundos)
+
+    Returns:
+        dict: Llamadas por muestra y estadísticas del tiempo por llamada (segundos)
+    """
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        first = time.perf_counter() - start
+        loops = max(1, min(int(min_time / first) if first > 0 else 1000, 100_000))
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            samples.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0
+    }
+
+
+def _max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB y macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run(size: int, data_dir: str, repeat: int, min_time: float, only: Optional[str], seed: int) -> List[dict]:
+    """
+    Generar la base de un tamaño y medir todas las operaciones
+
+    Args:
+        size (int): Cantidad de gastos (ver benchmarks.generator.scale_for)
+        data_dir (str): Directorio de datos a usar (se crea si no existe)
+        repeat (int): Muestras por operación
+        min_time (float): Duración mínima de cada muestra (segundos)
+        only (Optional[str]): Expresión regular para filtrar operaciones por nombre
+        seed (int): Semilla del generador
+
+    Returns:
+        List[dict]: Un resultado por operación
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    os.environ["MICONSORCIO_DATA_DIR"] = data_dir
+    results: List[dict] = []
+
+    def record(name: str, value: float, unit: str) -> None:
+        results.append({"name": name, "size": size, "unit": unit, "value": value})
+
+    consorcio = SyntheticConsorcio(scale_for(size), seed=seed)
+    start = time.perf_counter()
+    file_size = consorcio.write(os.path.join(data_dir, "database.json"))
+    print(f"[{size}] base generada en {time.perf_counter() - start:.1f}s ({file_size / 1e6:.1f} MB)", file=sys.stderr)
+    del consorcio
+
+    # Importar la aplicación recién ahora: config lee MICONSORCIO_DATA_DIR
+    from fastapi import HTTPException
+    from database import connection
+    from database.connection import load_database, save_database, transaction
+    from models.schemas import Database, GastoCreate, PagoCreate, ParticipanteCreate
+    from services.gasto_service import GastoService
+    from services.pago_service import PagoService
+    from services.participante_service import ParticipanteService
+    from services.resumen_service import ResumenService
+    from utils.helpers import generate_id
+
+    # Primera carga: lectura, validación y construcción de todos los índices
+    start = time.perf_counter()
+    db = load_database()
+    record("storage.first_load", time.perf_counter() - start, "s")
+    record("storage.file_bytes", file_size, "bytes")
+    record("process.max_rss_bytes", _max_rss_bytes(), "bytes")
+
+    middle_gasto = db.gastos[len(db.gastos) // 2].id
+    middle_pago = db.pagos[len(db.pagos) // 2].id
+    middle_participante = db.participantes[len(db.participantes) // 2].id
+    pagador = db.gastos[0].pagado_por
+    usuario = db.usuarios[0].id
+
+    gasto_data = GastoCreate(
+        descripcion="Benchmark de alta de gasto",
+        monto=1234.5,
+        fecha="2025-01-15",
+        categoria="Mantenimiento",
+        pagado_por=pagador,
+        participantes=list(db.gastos[0].participantes),
+        creado_por=usuario
+    )
+    pago_data = PagoCreate(
+        descripcion="Benchmark de alta de pago",
+        monto=500.0,
+        fecha="2025-01-15",
+        deudor_id=db.pagos[0].deudor_id,
+        acreedor_id=db.pagos[0].acreedor_id,
+        comprobante="",
+        creado_por=usuario
+    )
+    participante_data = ParticipanteCreate(
+        nombre="Benchmark", email="benchmark@consorcio.com.ar", telefono="1100000000", unidad="PB"
+    )
+
+    def reload_from_disk() -> None:
+        # Simular la escritura de otro worker: la próxima carga relee el archivo
+        connection.current_store().generation.increment()
+        load_database()
+
+    def flush() -> None:
+        # Transacción vacía: paga la serialización y la escritura atómica completas
+        with transaction():
+            pass
+
+    def save() -> None:
+        ledger = load_database()
+        save_database(Database.model_construct(
+            gastos=[g.to_model() for g in ledger.gastos],
+            pagos=[p.to_model() for p in ledger.pagos],
+            participantes=[p.to_model() for p in ledger.participantes],
+            usuarios=list(ledger.usuarios),
+            usuarioActual=ledger.usuarioActual
+        ))
+
+    # Peor caso del guard de ParticipanteService.delete: el único gasto del
+    # participante es el último, de modo que se recorren todos los gastos
+    guard_participante = ParticipanteService.create(participante_data, generate_id()).id
+    GastoService.create(
+        gasto_data.model_copy(update={"participantes": [guard_participante]}), generate_id()
+    )
+
+    def delete_guard() -> None:
+        try:
+            ParticipanteService.delete(guard_participante)
+        except HTTPException as e:
+            if e.status_code != 400:
+                raise
+        else:
+            raise AssertionError("El participante con gastos no debería poder eliminarse")
+
+    # Primero las lecturas; las altas agregan registros y van al final
+    benchmarks = [
+        Benchmark("storage.load_warm", load_database),
+        Benchmark("storage.reload", reload_from_disk),
+        Benchmark("storage.read_file", connection.current_store().read_file),
+        Benchmark("participantes.get_all", ParticipanteService.get_all),
+        Benchmark("participantes.get_by_id", lambda: ParticipanteService.get_by_id(middle_participante)),
+        Benchmark("participantes.delete_guard", delete_guard),
+        Benchmark("gastos.get_all", GastoService.get_all),
+        Benchmark("gastos.get_by_id", lambda: GastoService.get_by_id(middle_gasto)),
+        Benchmark("gastos.get_by_participante", lambda: GastoService.get_by_participante(pagador)),
+        Benchmark("pagos.get_all", PagoService.get_all),
+        Benchmark("pagos.get_by_id", lambda: PagoService.get_by_id(middle_pago)),
+        Benchmark("pagos.get_by_participante", lambda: PagoService.get_by_participante(pagador)),
+        Benchmark("balances.records", lambda: balances_from_records(load_database())),
+        Benchmark("balances.resumen", lambda: balances_from_resumen(ResumenService, load_database())),
+        Benchmark("storage.flush", flush),
+        Benchmark("storage.save_database", save, max_size=100_000),
+        Benchmark("participantes.create", lambda: ParticipanteService.create(participante_data, generate_id())),
+        Benchmark("gastos.create", lambda: GastoService.create(gasto_data, generate_id())),
+        Benchmark("pagos.create", lambda: PagoService.create(pago_data, generate_id())),
+    ]
+
+    # Los dos cálculos de balances tienen que coincidir
+    esperado = balances_from_records(load_database())
+    obtenido = balances_from_resumen(ResumenService, load_database())
+    if esperado.keys() != obtenido.keys() or any(abs(esperado[k] - obtenido[k]) > 0.01 for k in esperado):
+        raise AssertionError("Los balances calculados por registros y por resumen no coinciden")
+
+    pattern = re.compile(only) if only else None
+    for benchmark in benchmarks:
+        if pattern and not pattern.search(benchmark.name):
+            continue
+        if benchmark.max_size is not None and size > benchmark.max_size:
+            print(f"[{size}] {benchmark.name}: omitido (máximo {benchmark.max_size})", file=sys.stderr)
+            continue
+        stats = measure(benchmark.func, repeat, min_time)
+        results.append({"name": benchmark.name, "size": size, "unit": "s", "value": stats["median"], **stats})
+        print(f"[{size}] {benchmark.name}: {stats['median'] * 1e3:.3f} ms", file=sys.stderr)
+
+    record("process.max_rss_bytes.final", _max_rss_bytes(), "bytes")
+    return results
+
+
+def balances_from_records(db) -> Dict[str, float]:
+    """
+    Balance de cada participante recorriendo los registros
+
+    Igual que el dashboard: lo pagado en gastos menos la parte equitativa
+    del total, más los pagos hechos y menos los recibidos.
+
+    Args:
+        db (Ledger): Base de datos en memoria
+
+    Returns:
+        Dict[str, float]: Balance por ID de participante
+    """
+    pagado: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for gasto in db.gastos:
+        pagado[gasto.pagado_por] += gasto.monto
+        total += gasto.monto
+    for pago in db.pagos:
+        pagado[pago.deudor_id] += pago.monto
+        pagado[pago.acreedor_id] -= pago.monto
+    aporte = total / len(db.participantes) if db.participantes else 0.0
+    return {p.id: round(pagado.get(p.id, 0.0) - aporte, 2) for p in db.participantes}
+
+
+def balances_from_resumen(resumen_service, db) -> Dict[str, float]:
+    """
+    Balance de cada participante a partir de los resúmenes (copia columnar)
+
+    Args:
+        resumen_service: services.resumen_service.ResumenService
+        db (Ledger): Base de datos en memoria (para la lista de participantes)
+
+    Returns:
+        Dict[str, float]: Balance por ID de participante
+    """
+    gastos = resumen_service.gastos()
+    pagos = resumen_service.pagos()
+    pagado: Dict[str, float] = defaultdict(float)
+    for fila in gastos["por_pagador"]:
+        pagado[fila["clave"]] += fila["total"]
+    for fila in pagos["por_deudor"]:
+        pagado[fila["clave"]] += fila["total"]
+    for fila in pagos["por_acreedor"]:
+        pagado[fila["clave"]] -= fila["total"]
+    aporte = gastos["total"] / len(db.participantes) if db.participantes else 0.0
+    return {p.id: round(pagado.get(p.id, 0.0) - aporte, 2) for p in db.participantes}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks para un tamaño de base")
+    parser.add_argument("--size", type=int, required=True, help="Cantidad de gastos")
+    parser.add_argument("--data-dir", required=True, help="Directorio de datos (se sobrescribe)")
+    parser.add_argument("--repeat", type=int, default=5, help="Muestras por operación")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Duración mínima de cada muestra (s)")
+    parser.add_argument("--only", help="Expresión regular para elegir operaciones")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Semilla del generador")
+    args = parser.parse_args(argv)
+
+    results = run(args.size, os.path.abspath(args.data_dir), args.repeat, args.min_time, args.only, args.seed)
+    json.dump(results, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Ejecutar los microbenchmarks para varios tamaños y guardar los resultados
+
+Cada tamaño corre en un proceso nuevo (ver benchmarks.microbench) sobre
+una base generada en un directorio temporal. Los resultados se guardan en
+JSON junto con el commit y el entorno, para compararlos con
+benchmarks.compare.
+
+Uso:
+    python -m benchmarks.run                          # 100 a 1.000.000 gastos
+    python -m benchmarks.run --sizes 100,10000 --only "gastos\\."
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+from benchmarks.generator import DEFAULT_SEED
+
+
+# Directorio backend/ (desde donde se importan los módulos de la aplicación)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directorio por defecto de los resultados
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+DEFAULT_SIZES = "100,1000,10000,100000,1000000"
+
+# Versión del formato de los archivos de resultados
+RESULTS_FORMAT = 1
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def environment() -> dict:
+    """
+    Describir el commit y el entorno en que se midió
+
+    Returns:
+        dict: Commit, si había cambios sin commitear, versión de Python, plataforma y extras
+    """
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": importlib.util.find_spec("numpy") is not None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+
+
+def run_size(size: int, work_dir: str, args: argparse.Namespace) -> List[dict]:
+    """
+    Ejecutar los microbenchmarks de un tamaño en un proceso nuevo
+
+    Args:
+        size (int): Cantidad de gastos
+        work_dir (str): Directorio donde crear la base de este tamaño
+        args (argparse.Namespace): Opciones de la línea de comandos
+
+    Returns:
+        List[dict]: Resultados del tamaño
+
+    Raises:
+        RuntimeError: Si el proceso termina con error
+    """
+    data_dir = os.path.join(work_dir, f"size-{size}")
+    command = [
+        sys.executable, "-m", "benchmarks.microbench",
+        "--size", str(size),
+        "--data-dir", data_dir,
+        "--repeat", str(args.repeat),
+        "--min-time", str(args.min_time),
+        "--seed", str(args.seed)
+    ]
+    if args.only:
+        command += ["--only", args.only]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True)
+    if not args.keep_data:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Los benchmarks del tamaño {size} terminaron con código {completed.returncode}")
+    return json.loads(completed.stdout)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ejecutar los benchmarks de MiConsorcio")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Cantidades de gastos, separadas por comas")
+    parser.add_argument("--repeat", type=int, default=5, help="Muestras por operación")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Duración mínima de cada muestra (s)")
+    parser.add_argument("--only", help="Expresión regular para elegir operaciones")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Semilla del generador")
+    parser.add_argument("--output", help="Archivo de resultados (por defecto results/<commit>.json)")
+    parser.add_argument("--work-dir", help="Directorio para las bases generadas (por defecto uno temporal)")
+    parser.add_argument("--keep-data", action="store_true", help="No borrar las bases generadas")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    env = environment()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{env['commit'][:12] or 'local'}{'-dirty' if env['dirty'] else ''}.json"
+    )
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="miconsorcio-bench-")
+    results: List[dict] = []
+    try:
+        for size in sizes:
+            results.extend(run_size(size, work_dir, args))
+    finally:
+        if not args.work_dir and not args.keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "format": RESULTS_FORMAT,
+            "environment": env,
+            "options": {"sizes": sizes, "repeat": args.repeat, "min_time": args.min_time, "seed": args.seed},
+            "results": results
+        }, f, indent=2)
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Configuración de la aplicación a partir de variables de entorno
+"""
+import os
+
+
+# Directorio base del backend
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Directorio de datos (base de datos JSON y archivos subidos)
+DATA_DIR = os.path.abspath(os.getenv("MICONSORCIO_DATA_DIR", os.path.join(BASE_DIR, "data")))
+
+# Archivo de la base de datos JSON
+DATABASE_FILE = os.path.join(DATA_DIR, "database.json")
+
+# Formato en que se escribe la base: "json" o "snapshot" (binario con carga
+# diferida, ver database.snapshot); la lectura reconoce ambos
+STORAGE_FORMAT = os.getenv("MICONSORCIO_STORAGE_FORMAT", "json").strip().lower()
+
+# Directorio de los consorcios alojados (uno por subdirectorio: database.json y uploads/)
+TENANTS_DIR = os.path.abspath(os.getenv("MICONSORCIO_TENANTS_DIR", os.path.join(DATA_DIR, "consorcios")))
+
+# Prefijo de ruta que elige el consorcio (/consorcios/<id>/gastos/); también se acepta el header X-Consorcio
+TENANT_PATH_PREFIX = "/consorcios"
+
+# Consorcios con su base en memoria: cantidad y memoria estimada máximas
+TENANT_CACHE_MAX = int(os.getenv("MICONSORCIO_TENANT_CACHE_MAX", "256"))
+TENANT_CACHE_MAX_BYTES = int(os.getenv("MICONSORCIO_TENANT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Ventana (en milisegundos) durante la cual se agrupan escrituras concurrentes
+WRITE_COALESCE_WINDOW_MS = float(os.getenv("MICONSORCIO_WRITE_WINDOW_MS", "5"))
+
+# Directorio de los comprobantes subidos
+UPLOAD_DIR = os.path.abspath(os.getenv("MICONSORCIO_UPLOAD_DIR", os.path.join(DATA_DIR, "uploads")))
+
+# Tamaño máximo de un comprobante subido (bytes)
+UPLOAD_MAX_SIZE = int(os.getenv("MICONSORCIO_UPLOAD_MAX_SIZE", str(10 * 1024 * 1024)))
+
+# Tamaño de los bloques con que se copian los archivos subidos (bytes)
+UPLOAD_CHUNK_SIZE = int(os.getenv("MICONSORCIO_UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+# Procesos dedicados a generar miniaturas de comprobantes (0 = deshabilitado)
+IMAGE_WORKERS = int(os.getenv("MICONSORCIO_IMAGE_WORKERS", "1"))
+
+# Antigüedad mínima (segundos) de un comprobante sin referencias antes de eliminarlo
+GC_GRACE_SECONDS = int(os.getenv("MICONSORCIO_GC_GRACE_SECONDS", str(24 * 60 * 60)))
+
+# Intervalo (segundos) entre pasadas del recolector de comprobantes (0 = deshabilitado)
+GC_INTERVAL_SECONDS = float(os.getenv("MICONSORCIO_GC_INTERVAL_SECONDS", "60"))
+
+# Particiones de primer nivel (de 256) revisadas en cada pasada del recolector
+GC_SHARDS_PER_TICK = int(os.getenv("MICONSORCIO_GC_SHARDS_PER_TICK", "8"))
+
+# Mantener la copia columnar de gastos y pagos para los resúmenes (0 = calcularla en cada consulta)
+COLUMNAR_MIRROR = os.getenv("MICONSORCIO_COLUMNAR", "1") != "0"
+
+# Respuestas de listados guardadas ya serializadas (cantidad y tamaño total en bytes)
+RESPONSE_CACHE_ENTRIES = int(os.getenv("MICONSORCIO_RESPONSE_CACHE_ENTRIES", "32"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("MICONSORCIO_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Compresión gzip/brotli de las respuestas (0 = deshabilitada), tamaño mínimo del cuerpo y niveles
+COMPRESSION = os.getenv("MICONSORCIO_COMPRESSION", "1") != "0"
+COMPRESSION_MIN_BYTES = int(os.getenv("MICONSORCIO_COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("MICONSORCIO_COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("MICONSORCIO_COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Procesos dedicados a generar estados de cuenta (0 = en el pool de hilos del worker)
+STATEMENT_WORKERS = int(os.getenv("MICONSORCIO_STATEMENT_WORKERS", "1"))
+
+# Estados de cuenta guardados ya generados (cantidad y tamaño total en bytes)
+STATEMENT_CACHE_ENTRIES = int(os.getenv("MICONSORCIO_STATEMENT_CACHE_ENTRIES", "4096"))
+STATEMENT_CACHE_MAX_BYTES = int(os.getenv("MICONSORCIO_STATEMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Directorio de los respaldos (un repositorio por consorcio)
+BACKUP_DIR = os.path.abspath(os.getenv("MICONSORCIO_BACKUP_DIR", os.path.join(DATA_DIR, "backups")))
+
+# Respaldos conservados por consorcio y nivel de compresión gzip (1-9)
+BACKUP_KEEP = int(os.getenv("MICONSORCIO_BACKUP_KEEP", "14"))
+BACKUP_COMPRESSION_LEVEL = int(os.getenv("MICONSORCIO_BACKUP_COMPRESSION_LEVEL", "6"))
+
+# Token para operaciones de administración (sin token quedan deshabilitadas)
+ADMIN_TOKEN = os.getenv("MICONSORCIO_ADMIN_TOKEN", "")
+
+# Directorio de los perfiles de peticiones
+PROFILES_DIR = os.path.join(DATA_DIR, "profiles")
+
+# Peticiones perfiladas a la vez y perfiles conservados
+PROFILE_MAX_CONCURRENT = int(os.getenv("MICONSORCIO_PROFILE_MAX_CONCURRENT", "1"))
+PROFILE_KEEP = int(os.getenv("MICONSORCIO_PROFILE_KEEP", "50"))
+
+# Chequeo de salud: intervalo del muestreo del event loop y umbrales de /health/ready
+HEALTH_LOOP_INTERVAL_MS = float(os.getenv("MICONSORCIO_HEALTH_LOOP_INTERVAL_MS", "100"))
+HEALTH_MAX_LOOP_LAG_MS = float(os.getenv("MICONSORCIO_HEALTH_MAX_LOOP_LAG_MS", "500"))
+HEALTH_MAX_STORAGE_MS = float(os.getenv("MICONSORCIO_HEALTH_MAX_STORAGE_MS", "1000"))
+HEALTH_MAX_PENDING_WRITES = int(os.getenv("MICONSORCIO_HEALTH_MAX_PENDING_WRITES", "1000"))
+HEALTH_MIN_FREE_BYTES = int(os.getenv("MICONSORCIO_HEALTH_MIN_FREE_BYTES", str(100 * 1024 * 1024)))
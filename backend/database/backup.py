@@ -0,0 +1,516 @@
+"""
+Respaldos consistentes de la base y los comprobantes, sin detener las escrituras
+
+La base se guarda siempre con un rename atómico (ver database.files), de
+modo que el archivo abierto para leer es una foto inmutable del último lote
+persistido: el respaldo la copia sin tomar ningún lock de escritura. Los
+comprobantes que esa foto referencia (el mismo cálculo que el índice de
+referencias) se copian con sus metadatos; como el almacén está direccionado
+por contenido, un comprobante ya respaldado no se vuelve a copiar.
+
+Cada consorcio tiene un repositorio en BACKUP_DIR:
+
+    objects/ab/<sha256>.gz    contenidos comprimidos (base y comprobantes)
+    manifests/<id>.json       un manifiesto por respaldo
+
+La restauración verifica el hash de cada objeto y que la base sea válida
+antes de escribir nada.
+
+Uso:
+    python -m database.backup [--consorcio ID] create [--keep N]
+    python -m database.backup [--consorcio ID] list
+    python -m database.backup [--consorcio ID] verify BACKUP_ID
+    python -m database.backup [--consorcio ID] restore BACKUP_ID [--target DIR] [--force]
+    python -m database.backup [--consorcio ID] prune [--keep N]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from database.coherence import ProcessLock, SharedGeneration
+from database.comprobante_store import ComprobanteStore
+from database.files import atomic_write_bytes, fsync_directory
+from database.snapshot import ledger_from_bytes, materialize
+from database.records import participant_ids
+from database.reference_index import ReferenceIndex
+import config
+
+
+# Versión del formato de los manifiestos
+MANIFEST_FORMAT = 1
+
+# Tamaño de los bloques con que se copian y verifican los objetos
+_CHUNK_SIZE = 1024 * 1024
+
+# Nombre del repositorio del almacén por defecto (no es un ID de consorcio válido)
+DEFAULT_REPOSITORY = "_default"
+
+
+def _is_legacy_name(name: str) -> bool:
+    """Nombre del esquema anterior: un archivo en la raíz de los uploads"""
+    return bool(name) and os.path.basename(name) == name and not name.startswith(".")
+
+
+class BackupError(Exception):
+    """Respaldo inexistente, incompleto o corrupto"""
+
+
+class BackupRepository:
+    """Repositorio de respaldos de un consorcio"""
+
+    def __init__(self, root: str, database_file: str, upload_dir: str):
+        """
+        Args:
+            root (str): Directorio del repositorio
+            database_file (str): Archivo JSON de la base a respaldar
+            upload_dir (str): Directorio de los comprobantes
+        """
+        self.root = Path(root)
+        self.database_file = database_file
+        self.comprobantes = ComprobanteStore(Path(upload_dir))
+        self.objects_dir = self.root / "objects"
+        self.manifests_dir = self.root / "manifests"
+        # Serializa create y prune: prune no debe borrar un objeto que create da por existente
+        self._lock = ProcessLock(str(self.root / ".lock"))
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}.gz"
+
+    def _manifest_path(self, backup_id: str) -> Path:
+        if not backup_id or "/" in backup_id or backup_id.startswith("."):
+            raise BackupError(f"ID de respaldo inválido: {backup_id}")
+        return self.manifests_dir / f"{backup_id}.json"
+
+    def _put_bytes(self, data: bytes) -> Tuple[str, bool]:
+        """Guardar un contenido en memoria (hash, True si era nuevo)"""
+        digest = hashlib.sha256(data).hexdigest()
+        target = self._object_path(digest)
+        if target.exists():
+            return digest, False
+        atomic_write_bytes(str(target), gzip.compress(data, compresslevel=config.BACKUP_COMPRESSION_LEVEL))
+        return digest, True
+
+    def _put_file(self, source: Path, digest: Optional[str]) -> Tuple[str, int, bool]:
+        """
+        Copiar un archivo comprimido al repositorio
+
+        Si se conoce el hash y el objeto ya existe, no se lee el archivo.
+
+        Returns:
+            Tuple[str, int, bool]: Hash, tamaño y True si el objeto era nuevo
+        """
+        if digest is not None and self._object_path(digest).exists():
+            return digest, source.stat().st_size, False
+        tmp = self.objects_dir / f".{uuid.uuid4().hex}.tmp"
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(source, "rb") as src, open(tmp, "wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=config.BACKUP_COMPRESSION_LEVEL) as dst:
+                    while True:
+                        chunk = src.read(_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        dst.write(chunk)
+                raw.flush()
+                os.fsync(raw.fileno())
+            actual = hasher.hexdigest()
+            if digest is not None and actual != digest:
+                raise BackupError(f"El comprobante {source} no coincide con su hash")
+            target = self._object_path(actual)
+            if target.exists():
+                tmp.unlink()
+                return actual, size, False
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, target)
+            fsync_directory(str(target.parent))
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return actual, size, True
+
+    def _read_object(self, digest: str) -> bytes:
+        """Leer un objeto verificando su hash"""
+        try:
+            data = gzip.decompress(self._object_path(digest).read_bytes())
+        except (OSError, EOFError) as e:
+            raise BackupError(f"Objeto {digest} ilegible: {e}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupError(f"Objeto {digest} corrupto")
+        return data
+
+    def _check_object(self, digest: str, size: Optional[int]) -> None:
+        """Verificar un objeto sin cargarlo completo en memoria"""
+        hasher = hashlib.sha256()
+        total = 0
+        try:
+            with gzip.open(self._object_path(digest), "rb") as f:
+                while True:
+                    chunk = f.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    total += len(chunk)
+        except (OSError, EOFError) as e:
+            raise BackupError(f"Objeto {digest} ilegible: {e}")
+        if hasher.hexdigest() != digest or (size is not None and total != size):
+            raise BackupError(f"Objeto {digest} corrupto")
+
+    def create(self, keep: Optional[int] = None) -> dict:
+        """
+        Respaldar la última versión persistida de la base y sus comprobantes
+
+        No bloquea a los escritores: lee el archivo de la base (reemplazado
+        siempre de forma atómica) y los comprobantes, que no se modifican.
+        Las mutaciones que todavía están en la ventana de escritura no se
+        incluyen.
+
+        Args:
+            keep (Optional[int]): Si se indica, aplicar la retención (ver prune)
+
+        Returns:
+            dict: Manifiesto del respaldo (con "new_objects", "new_bytes" y "pruned")
+
+        Raises:
+            BackupError: Si un comprobante del almacén no coincide con su hash
+        """
+        start = time.perf_counter()
+        created_at = time.time()
+        try:
+            with open(self.database_file, "rb") as f:
+                snapshot = f.read()
+        except FileNotFoundError:
+            snapshot = b""
+        # Los IDs de participantes de la foto no se agregan al almacén en curso
+        with participant_ids.isolated():
+            db = ledger_from_bytes(snapshot)
+            references = ReferenceIndex()
+            references.rebuild(db)
+            keys = references.keys()
+            del db, references
+
+        self._lock.acquire()
+        try:
+            database_digest, new = self._put_bytes(snapshot)
+            new_objects, new_bytes = int(new), len(snapshot) if new else 0
+            comprobantes: Dict[str, dict] = {}
+            missing: List[str] = []
+            for key in keys:
+                is_digest = ComprobanteStore.parse_name(key) == key
+                source = self.comprobantes.blob_path(key) if is_digest else self.comprobantes.root / key
+                if not (is_digest or _is_legacy_name(key)) or not source.is_file():
+                    # Eliminado después de la foto: el recolector solo borra lo que ya no se referencia
+                    missing.append(key)
+                    continue
+                digest, size, new = self._put_file(source, key if is_digest else None)
+                new_objects += int(new)
+                new_bytes += size if new else 0
+                entry = {"sha256": digest, "size": size}
+                if is_digest:
+                    entry["metadata"] = self.comprobantes.get_metadata(key)
+                else:
+                    entry["legacy"] = True
+                comprobantes[key] = entry
+
+            # Ordenable por fecha; el sufijo evita choques entre procesos
+            backup_id = (
+                time.strftime("%Y%m%dT%H%M%S", time.gmtime(created_at))
+                + f"{int(created_at * 1e6) % 1000000:06d}-{uuid.uuid4().hex[:4]}"
+            )
+            manifest = {
+                "format": MANIFEST_FORMAT,
+                "id": backup_id,
+                "created_at": created_at,
+                "database": {"sha256": database_digest, "size": len(snapshot)},
+                "comprobantes": comprobantes,
+                "missing": missing
+            }
+            atomic_write_bytes(
+                str(self._manifest_path(backup_id)),
+                json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+            )
+        finally:
+            self._lock.release()
+        pruned = self.prune(keep) if keep is not None else None
+        return {
+            **manifest,
+            "new_objects": new_objects,
+            "new_bytes": new_bytes,
+            "pruned": pruned,
+            "seconds": time.perf_counter() - start
+        }
+
+    def list(self) -> List[dict]:
+        """
+        Listar los respaldos, del más antiguo al más reciente
+
+        Returns:
+            List[dict]: ID, fecha, tamaño de la base y cantidad de comprobantes de cada uno
+        """
+        if not self.manifests_dir.is_dir():
+            return []
+        backups = []
+        for path in sorted(self.manifests_dir.glob("*.json")):
+            manifest = self.manifest(path.stem)
+            backups.append({
+                "id": manifest["id"],
+                "created_at": manifest["created_at"],
+                "database_bytes": manifest["database"]["size"],
+                "comprobantes": len(manifest["comprobantes"]),
+                "missing": len(manifest["missing"])
+            })
+        backups.sort(key=lambda backup: (backup["created_at"], backup["id"]))
+        return backups
+
+    def manifest(self, backup_id: str) -> dict:
+        """
+        Leer el manifiesto de un respaldo
+
+        Args:
+            backup_id (str): ID del respaldo
+
+        Returns:
+            dict: Manifiesto
+
+        Raises:
+            BackupError: Si el respaldo no existe o el manifiesto es ilegible
+        """
+        try:
+            with open(self._manifest_path(backup_id), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"Respaldo no encontrado: {backup_id}")
+        except (OSError, ValueError) as e:
+            raise BackupError(f"Manifiesto ilegible de {backup_id}: {e}")
+        if manifest.get("format") != MANIFEST_FORMAT:
+            raise BackupError(f"Formato de manifiesto no soportado: {manifest.get('format')}")
+        return manifest
+
+    def verify(self, backup_id: str) -> dict:
+        """
+        Verificar un respaldo completo: hashes, base válida y comprobantes referenciados
+
+        Args:
+            backup_id (str): ID del respaldo
+
+        Returns:
+            dict: ID, cantidad de objetos verificados y comprobantes faltantes al respaldar
+
+        Raises:
+            BackupError: Si falta o está corrupto algún objeto, o la base no es válida
+        """
+        manifest = self.manifest(backup_id)
+        snapshot = self._read_object(manifest["database"]["sha256"])
+        references = ReferenceIndex()
+        try:
+            with participant_ids.isolated():
+                references.rebuild(materialize(ledger_from_bytes(snapshot)))
+        except Exception as e:
+            raise BackupError(f"La base del respaldo {backup_id} no es válida: {e}")
+        expected = set(references.keys())
+        recorded = set(manifest["comprobantes"]) | set(manifest["missing"])
+        if expected != recorded:
+            raise BackupError(f"Los comprobantes del respaldo {backup_id} no coinciden con la base")
+        for entry in manifest["comprobantes"].values():
+            self._check_object(entry["sha256"], entry["size"])
+        return {
+            "id": backup_id,
+            "objects": 1 + len(manifest["comprobantes"]),
+            "missing": manifest["missing"]
+        }
+
+    def restore(self, backup_id: str, database_file: str, upload_dir: str, force: bool = False) -> dict:
+        """
+        Restaurar un respaldo verificado
+
+        Los comprobantes se escriben antes que la base, de modo que la base
+        restaurada nunca referencia archivos que todavía no están. La base se
+        reemplaza bajo el lock de escritura entre procesos y se incrementa la
+        generación compartida: los workers en ejecución la vuelven a cargar
+        en su próxima lectura.
+
+        Args:
+            backup_id (str): ID del respaldo
+            database_file (str): Archivo JSON de destino
+            upload_dir (str): Directorio de comprobantes de destino
+            force (bool): Reemplazar una base existente
+
+        Returns:
+            dict: ID, bytes de la base y comprobantes restaurados
+
+        Raises:
+            BackupError: Si el respaldo no pasa la verificación o el destino ya tiene una base
+        """
+        if os.path.exists(database_file) and not force:
+            raise BackupError(f"Ya existe {database_file} (usar --force para reemplazarla)")
+        self.verify(backup_id)
+        manifest = self.manifest(backup_id)
+        snapshot = self._read_object(manifest["database"]["sha256"])
+
+        target = ComprobanteStore(Path(upload_dir))
+        restored = 0
+        for key, entry in manifest["comprobantes"].items():
+            if entry.get("legacy") and not _is_legacy_name(key):
+                raise BackupError(f"Nombre de comprobante inválido en el respaldo: {key}")
+            path = target.root / key if entry.get("legacy") else target.blob_path(key)
+            if not path.is_file():
+                tmp = target.new_temp_path()
+                with gzip.open(self._object_path(entry["sha256"]), "rb") as src, open(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, path)
+                restored += 1
+            if entry.get("metadata") and target.get_metadata(key) is None:
+                atomic_write_bytes(
+                    str(path.with_name(f"{key}.json")),
+                    json.dumps(entry["metadata"], ensure_ascii=False).encode("utf-8")
+                )
+        target.close()
+
+        lock = ProcessLock(database_file + ".lock")
+        generation = SharedGeneration(database_file + ".gen")
+        lock.acquire()
+        try:
+            atomic_write_bytes(database_file, snapshot)
+            generation.increment()
+        finally:
+            lock.close()
+            generation.close()
+        return {"id": backup_id, "database_bytes": len(snapshot), "comprobantes_restored": restored}
+
+    def prune(self, keep: int) -> dict:
+        """
+        Conservar los respaldos más recientes y eliminar los objetos que ya nadie usa
+
+        Args:
+            keep (int): Cantidad de respaldos a conservar (al menos 1)
+
+        Returns:
+            dict: Respaldos y objetos eliminados y bytes liberados
+        """
+        keep = max(keep, 1)
+        self._lock.acquire()
+        try:
+            ids = [backup["id"] for backup in self.list()]
+            removed = ids[:-keep]
+            for backup_id in removed:
+                self._manifest_path(backup_id).unlink()
+
+            live: Set[str] = set()
+            for backup_id in ids[-keep:]:
+                manifest = self.manifest(backup_id)
+                live.add(manifest["database"]["sha256"])
+                live.update(entry["sha256"] for entry in manifest["comprobantes"].values())
+
+            objects = 0
+            freed = 0
+            if self.objects_dir.is_dir():
+                for path in self.objects_dir.glob("*/*.gz"):
+                    if path.name[:-3] not in live:
+                        freed += path.stat().st_size
+                        path.unlink()
+                        objects += 1
+        finally:
+            self._lock.release()
+        return {"backups_removed": removed, "objects_removed": objects, "bytes_freed": freed}
+
+
+def repository_for(tenant_id: Optional[str]) -> BackupRepository:
+    """
+    Repositorio de respaldos de un consorcio
+
+    Args:
+        tenant_id (Optional[str]): ID del consorcio (None para el almacén por defecto)
+
+    Returns:
+        BackupRepository: Repositorio en BACKUP_DIR para la base y los comprobantes del consorcio
+    """
+    if tenant_id is None:
+        return BackupRepository(
+            os.path.join(config.BACKUP_DIR, DEFAULT_REPOSITORY), config.DATABASE_FILE, config.UPLOAD_DIR
+        )
+    tenant_dir = os.path.join(config.TENANTS_DIR, tenant_id)
+    return BackupRepository(
+        os.path.join(config.BACKUP_DIR, tenant_id),
+        os.path.join(tenant_dir, "database.json"),
+        os.path.join(tenant_dir, "uploads")
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Respaldos de MiConsorcio")
+    parser.add_argument("--consorcio", default=None, help="ID del consorcio (por defecto, la base principal)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Crear un respaldo y aplicar la retención")
+    create.add_argument("--keep", type=int, default=config.BACKUP_KEEP, help="Respaldos a conservar")
+    commands.add_parser("list", help="Listar los respaldos")
+    verify = commands.add_parser("verify", help="Verificar un respaldo")
+    verify.add_argument("backup_id")
+    restore = commands.add_parser("restore", help="Verificar y restaurar un respaldo")
+    restore.add_argument("backup_id")
+    restore.add_argument("--target", default=None, help="Directorio de destino (database.json y uploads/)")
+    restore.add_argument("--force", action="store_true", help="Reemplazar la base existente")
+    prune = commands.add_parser("prune", help="Eliminar respaldos antiguos")
+    prune.add_argument("--keep", type=int, default=config.BACKUP_KEEP, help="Respaldos a conservar")
+    args = parser.parse_args(argv)
+
+    if args.consorcio is not None and not os.path.isdir(os.path.join(config.TENANTS_DIR, args.consorcio)):
+        print(f"❌ Consorcio no encontrado: {args.consorcio}")
+        return 1
+    repository = repository_for(args.consorcio)
+    try:
+        if args.command == "create":
+            manifest = repository.create(keep=args.keep)
+            print(
+                f"✅ Respaldo {manifest['id']}: {len(manifest['comprobantes'])} comprobantes, "
+                f"{manifest['new_objects']} objetos nuevos ({manifest['new_bytes']} bytes) "
+                f"en {manifest['seconds']:.3f}s"
+            )
+            for key in manifest["missing"]:
+                print(f"⚠️  Comprobante referenciado inexistente: {key}")
+        elif args.command == "list":
+            for backup in repository.list():
+                print(
+                    f"{backup['id']}  {backup['database_bytes']:>12} bytes  "
+                    f"{backup['comprobantes']} comprobantes"
+                )
+        elif args.command == "verify":
+            result = repository.verify(args.backup_id)
+            print(f"✅ Respaldo {result['id']} íntegro ({result['objects']} objetos)")
+        elif args.command == "restore":
+            if args.target:
+                database_file = os.path.join(args.target, "database.json")
+                upload_dir = os.path.join(args.target, "uploads")
+            else:
+                database_file, upload_dir = repository.database_file, str(repository.comprobantes.root)
+            result = repository.restore(args.backup_id, database_file, upload_dir, force=args.force)
+            print(
+                f"✅ Respaldo {result['id']} restaurado en {database_file} "
+                f"({result['comprobantes_restored']} comprobantes copiados)"
+            )
+        elif args.command == "prune":
+            result = repository.prune(args.keep)
+            print(
+                f"🗑️  {len(result['backups_removed'])} respaldos y {result['objects_removed']} objetos "
+                f"eliminados ({result['bytes_freed']} bytes)"
+            )
+    except BackupError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
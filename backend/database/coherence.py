@@ -0,0 +1,114 @@
+"""
+Coherencia entre procesos que comparten el mismo archivo de base de datos
+
+Cuando el servidor corre con varios workers, cada proceso mantiene su propia
+copia en memoria. Un contador de generación en un archivo pequeño mapeado en
+memoria indica cuándo otro proceso escribió, de modo que las lecturas solo
+vuelven a parsear el JSON si efectivamente cambió. Las escrituras se
+serializan entre procesos con un lock de archivo (flock).
+"""
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos (un solo worker)
+    fcntl = None
+
+
+_GENERATION_FORMAT = "<Q"
+_GENERATION_SIZE = struct.calcsize(_GENERATION_FORMAT)
+
+
+class SharedGeneration:
+    """Contador de generación compartido entre procesos vía mmap"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Ruta del archivo del contador
+        """
+        self.path = path
+        self._mmap = None
+        self._init_lock = threading.Lock()
+
+    def _map(self) -> mmap.mmap:
+        if self._mmap is None:
+            with self._init_lock:
+                if self._mmap is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    try:
+                        if os.fstat(fd).st_size < _GENERATION_SIZE:
+                            os.ftruncate(fd, _GENERATION_SIZE)
+                        self._mmap = mmap.mmap(fd, _GENERATION_SIZE)
+                    finally:
+                        os.close(fd)
+        return self._mmap
+
+    def read(self) -> int:
+        """
+        Leer la generación actual (sin llamadas al sistema una vez mapeado)
+
+        Returns:
+            int: Generación actual
+        """
+        return struct.unpack_from(_GENERATION_FORMAT, self._map(), 0)[0]
+
+    def increment(self) -> int:
+        """
+        Incrementar la generación; requiere tener el ProcessLock
+
+        Returns:
+            int: Nueva generación
+        """
+        mapped = self._map()
+        generation = struct.unpack_from(_GENERATION_FORMAT, mapped, 0)[0] + 1
+        struct.pack_into(_GENERATION_FORMAT, mapped, 0, generation)
+        return generation
+
+    def close(self) -> None:
+        """Liberar el mapeo (se vuelve a mapear si se usa de nuevo)"""
+        with self._init_lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+
+class ProcessLock:
+    """Lock exclusivo entre procesos basado en flock"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Ruta del archivo de lock
+        """
+        self.path = path
+        self.held = False
+        self._fd = None
+
+    def acquire(self) -> None:
+        """Tomar el lock (bloqueante)"""
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self.held = True
+
+    def release(self) -> None:
+        """Liberar el lock"""
+        if not self.held:
+            return
+        self.held = False
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        """Liberar el lock y cerrar el archivo (se vuelve a abrir si se usa de nuevo)"""
+        self.release()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,321 @@
+"""
+Copia columnar en memoria de gastos y pagos para consultas de resumen
+
+Cada colección se guarda como arreglos tipados contiguos (array): montos
+en centavos, fechas como ordinales, mes como año*12+mes-1 y categorías y
+participantes codificados como enteros. Las filas se mantienen compactas:
+al borrar, la última fila ocupa el lugar de la eliminada.
+
+Se reconstruye cada vez que la base se carga del archivo y se mantiene de
+forma incremental en las altas, modificaciones y bajas de GastoService y
+PagoService. Con numpy instalado (opcional) las agregaciones se hacen
+sobre los mismos buffers sin copiarlos; sin numpy se recorren los arreglos.
+"""
+import threading
+from array import array
+from collections import Counter, defaultdict
+from datetime import date
+from itertools import compress
+from typing import Dict, List, Optional, Tuple
+from database.records import GastoRecord, Interner, Ledger, PagoRecord
+from database.connection import tenant_local
+import config
+
+try:
+    import numpy
+except ImportError:  # numpy es opcional
+    numpy = None
+
+
+# Mes de los registros con fecha inválida
+MES_DESCONOCIDO = -1
+
+
+def fecha_a_ordinal(fecha: str) -> Tuple[int, int]:
+    """
+    Convertir una fecha "YYYY-MM-DD" a (ordinal, mes)
+
+    Args:
+        fecha (str): Fecha del gasto o pago
+
+    Returns:
+        Tuple[int, int]: Ordinal del día y mes como año*12+mes-1
+            ((0, MES_DESCONOCIDO) si la fecha no es válida)
+    """
+    try:
+        dia = date.fromisoformat(fecha[:10])
+    except (TypeError, ValueError):
+        return 0, MES_DESCONOCIDO
+    return dia.toordinal(), dia.year * 12 + dia.month - 1
+
+
+def mes_a_texto(mes: int) -> str:
+    """
+    Convertir un mes codificado a "YYYY-MM"
+
+    Args:
+        mes (int): Mes como año*12+mes-1
+
+    Returns:
+        str: Mes en formato "YYYY-MM" (o "desconocido")
+    """
+    if mes == MES_DESCONOCIDO:
+        return "desconocido"
+    return f"{mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+def a_centavos(monto: float) -> int:
+    """
+    Convertir un monto a centavos enteros
+
+    Args:
+        monto (float): Monto en pesos
+
+    Returns:
+        int: Monto en centavos, redondeado al más cercano
+    """
+    return int(round(monto * 100))
+
+
+class ColumnTable:
+    """Columnas tipadas de una colección, una fila por entidad"""
+
+    def __init__(self, typecodes: Dict[str, str]):
+        """
+        Args:
+            typecodes (Dict[str, str]): Nombre de cada columna y su tipo de array
+        """
+        self._typecodes = typecodes
+        self.clear()
+
+    def clear(self) -> None:
+        """Eliminar todas las filas"""
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.columns: Dict[str, array] = {
+            name: array(typecode) for name, typecode in self._typecodes.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, entity_id: str, values: Dict[str, int]) -> None:
+        """
+        Insertar o reemplazar la fila de una entidad
+
+        Args:
+            entity_id (str): ID de la entidad
+            values (Dict[str, int]): Valor de cada columna
+        """
+        row = self.rows.get(entity_id)
+        if row is None:
+            self.rows[entity_id] = len(self.ids)
+            self.ids.append(entity_id)
+            for name, column in self.columns.items():
+                column.append(values[name])
+        else:
+            for name, column in self.columns.items():
+                column[row] = values[name]
+
+    def remove(self, entity_id: str) -> None:
+        """
+        Eliminar la fila de una entidad moviendo la última a su lugar
+
+        Args:
+            entity_id (str): ID de la entidad
+        """
+        row = self.rows.pop(entity_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+            for column in self.columns.values():
+                column[row] = column[last]
+        self.ids.pop()
+        for column in self.columns.values():
+            column.pop()
+
+    def sum_by(self, key: str, desde: Optional[int] = None, hasta: Optional[int] = None) -> Dict[int, Tuple[int, int]]:
+        """
+        Sumar los montos agrupando por una columna
+
+        Args:
+            key (str): Columna de agrupación
+            desde (Optional[int]): Ordinal mínimo de fecha (inclusive)
+            hasta (Optional[int]): Ordinal máximo de fecha (inclusive)
+
+        Returns:
+            Dict[int, Tuple[int, int]]: Por cada valor de la columna, (centavos, cantidad)
+        """
+        if not self.ids:
+            return {}
+        if numpy is not None:
+            return self._sum_by_numpy(key, desde, hasta)
+
+        keys = self.columns[key]
+        montos = self.columns["monto"]
+        if desde is not None or hasta is not None:
+            low = desde if desde is not None else 0
+            high = hasta if hasta is not None else date.max.toordinal()
+            mask = [low <= fecha <= high for fecha in self.columns["fecha"]]
+            keys = list(compress(keys, mask))
+            montos = compress(montos, mask)
+        totals: Dict[int, int] = defaultdict(int)
+        for k, monto in zip(keys, montos):
+            totals[k] += monto
+        counts = Counter(keys)
+        return {k: (totals[k], counts[k]) for k in totals}
+
+    def _sum_by_numpy(self, key: str, desde: Optional[int], hasta: Optional[int]) -> Dict[int, Tuple[int, int]]:
+        # Vistas sobre los buffers de los arrays: se liberan al salir de la función
+        keys = numpy.frombuffer(self.columns[key], dtype=self._typecodes[key]).astype(numpy.int64)
+        montos = numpy.frombuffer(self.columns["monto"], dtype=self._typecodes["monto"])
+        if desde is not None or hasta is not None:
+            fechas = numpy.frombuffer(self.columns["fecha"], dtype=self._typecodes["fecha"])
+            mask = numpy.ones(len(fechas), dtype=bool)
+            if desde is not None:
+                mask &= fechas >= desde
+            if hasta is not None:
+                mask &= fechas <= hasta
+            keys = keys[mask]
+            montos = montos[mask]
+        if len(keys) == 0:
+            return {}
+        offset = int(keys.min())
+        shifted = keys - offset
+        totals = numpy.rint(numpy.bincount(shifted, weights=montos)).astype(numpy.int64)
+        counts = numpy.bincount(shifted)
+        present = numpy.nonzero(counts)[0]
+        return {int(i) + offset: (int(totals[i]), int(counts[i])) for i in present}
+
+
+class ColumnarStore:
+    """Copia columnar de gastos y pagos"""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled (bool): Mantener la copia en cada mutación (False la deja
+                vacía; sirve solo para construir copias con from_ledger)
+        """
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.categorias = Interner()
+        self.gastos = ColumnTable({
+            "monto": "q", "fecha": "i", "mes": "i", "categoria": "I", "pagador": "I"
+        })
+        self.pagos = ColumnTable({
+            "monto": "q", "fecha": "i", "mes": "i", "deudor": "I", "acreedor": "I"
+        })
+
+    @classmethod
+    def from_ledger(cls, db: Ledger) -> "ColumnarStore":
+        """
+        Construir una copia columnar independiente de la base
+
+        Args:
+            db (Ledger): Base de datos cargada
+
+        Returns:
+            ColumnarStore: Copia construida
+        """
+        store = cls()
+        store.rebuild(db)
+        return store
+
+    def _gasto_values(self, gasto: GastoRecord) -> Dict[str, int]:
+        ordinal, mes = fecha_a_ordinal(gasto.fecha)
+        return {
+            "monto": a_centavos(gasto.monto),
+            "fecha": ordinal,
+            "mes": mes,
+            "categoria": self.categorias.code(gasto.categoria),
+            "pagador": gasto.pagado_por_code
+        }
+
+    @staticmethod
+    def _pago_values(pago: PagoRecord) -> Dict[str, int]:
+        ordinal, mes = fecha_a_ordinal(pago.fecha)
+        return {
+            "monto": a_centavos(pago.monto),
+            "fecha": ordinal,
+            "mes": mes,
+            "deudor": pago.deudor_code,
+            "acreedor": pago.acreedor_code
+        }
+
+    def rebuild(self, db: Ledger) -> None:
+        """
+        Reconstruir las columnas a partir de la base
+
+        Args:
+            db (Ledger): Base de datos cargada
+        """
+        with self.lock:
+            self.gastos.clear()
+            self.pagos.clear()
+            for gasto in db.gastos:
+                self.gastos.upsert(gasto.id, self._gasto_values(gasto))
+            for pago in db.pagos:
+                self.pagos.upsert(pago.id, self._pago_values(pago))
+
+    def upsert_gasto(self, gasto: GastoRecord) -> None:
+        """
+        Registrar un gasto nuevo o modificado
+
+        Args:
+            gasto (GastoRecord): Gasto en memoria
+        """
+        if not self.enabled:
+            return
+        values = self._gasto_values(gasto)
+        with self.lock:
+            self.gastos.upsert(gasto.id, values)
+
+    def remove_gasto(self, gasto_id: str) -> None:
+        """
+        Quitar un gasto
+
+        Args:
+            gasto_id (str): ID del gasto
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gastos.remove(gasto_id)
+
+    def upsert_pago(self, pago: PagoRecord) -> None:
+        """
+        Registrar un pago nuevo o modificado
+
+        Args:
+            pago (PagoRecord): Pago en memoria
+        """
+        if not self.enabled:
+            return
+        values = self._pago_values(pago)
+        with self.lock:
+            self.pagos.upsert(pago.id, values)
+
+    def remove_pago(self, pago_id: str) -> None:
+        """
+        Quitar un pago
+
+        Args:
+            pago_id (str): ID del pago
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.pagos.remove(pago_id)
+
+
+# Copia de cada consorcio, sincronizada con su base en memoria (si está habilitada)
+columnar_store = tenant_local(
+    lambda: ColumnarStore(enabled=config.COLUMNAR_MIRROR),
+    ColumnarStore.rebuild if config.COLUMNAR_MIRROR else None,
+    name="ColumnarStore"
+)
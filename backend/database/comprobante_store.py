@@ -0,0 +1,290 @@
+"""
+Almacenamiento de comprobantes direccionado por contenido
+
+Cada archivo se guarda una sola vez, con su SHA-256 como nombre, en
+directorios anidados por prefijo (sha256/ab/cd/abcd...) para que ningún
+directorio acumule millones de entradas. Junto a cada archivo se guarda un
+JSON de metadatos (nombre original, tipo, tamaño y cantidad de referencias).
+
+Los nombres que se entregan a los clientes tienen la forma
+"<sha256>.<extensión>"; los archivos subidos antes de este esquema
+("{timestamp}_{nombre}" en la raíz del directorio) se siguen resolviendo.
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+from database.coherence import ProcessLock
+from database.files import atomic_write_bytes
+
+
+_CONTENT_NAME = re.compile(r"^([0-9a-f]{64})(\.[A-Za-z0-9]{1,8})?$")
+
+
+class ComprobanteStore:
+    """Almacén de archivos deduplicado por SHA-256"""
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root (Path): Directorio raíz de los comprobantes
+        """
+        self.root = Path(root)
+        self.blobs_dir = self.root / "sha256"
+        self.tmp_dir = self.root / ".tmp"
+        self._thread_lock = threading.Lock()
+        self._process_lock = ProcessLock(str(self.root / ".store.lock"))
+
+    def close(self) -> None:
+        """Cerrar el archivo de lock (se vuelve a abrir si se usa de nuevo)"""
+        with self._thread_lock:
+            self._process_lock.close()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Serializar actualizaciones de metadatos entre hilos y procesos"""
+        with self._thread_lock:
+            self._process_lock.acquire()
+            try:
+                yield
+            finally:
+                self._process_lock.release()
+
+    @staticmethod
+    def parse_name(filename: str) -> Optional[str]:
+        """
+        Obtener el SHA-256 de un nombre direccionado por contenido
+
+        Args:
+            filename (str): Nombre de archivo entregado al cliente
+
+        Returns:
+            Optional[str]: Hash, o None si es un nombre del esquema anterior
+        """
+        match = _CONTENT_NAME.match(filename)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def public_name(digest: str, original_name: str) -> str:
+        """
+        Construir el nombre que se entrega al cliente
+
+        Args:
+            digest (str): SHA-256 del contenido
+            original_name (str): Nombre original (para conservar la extensión)
+
+        Returns:
+            str: Nombre de la forma "<sha256>.<extensión>"
+        """
+        extension = os.path.splitext(original_name or "")[1].lower()
+        if not re.match(r"^\.[a-z0-9]{1,8}$", extension):
+            extension = ""
+        return f"{digest}{extension}"
+
+    def blob_path(self, digest: str) -> Path:
+        """
+        Ruta del archivo de contenido para un hash
+
+        Args:
+            digest (str): SHA-256 del contenido
+
+        Returns:
+            Path: Ruta dentro del árbol particionado
+        """
+        return self.blobs_dir / digest[:2] / digest[2:4] / digest
+
+    def _meta_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest[2:4] / f"{digest}.json"
+
+    def new_temp_path(self) -> Path:
+        """
+        Ruta para un archivo temporal en el mismo sistema de archivos
+
+        Returns:
+            Path: Ruta de un archivo temporal inexistente
+        """
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return self.tmp_dir / f"{uuid.uuid4().hex}.part"
+
+    def get_metadata(self, digest: str) -> Optional[dict]:
+        """
+        Obtener los metadatos de un contenido
+
+        Args:
+            digest (str): SHA-256 del contenido
+
+        Returns:
+            Optional[dict]: Metadatos, o None si no existe
+        """
+        try:
+            with open(self._meta_path(digest), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_metadata(self, digest: str, metadata: dict) -> None:
+        payload = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+        atomic_write_bytes(str(self._meta_path(digest)), payload)
+
+    def add(self, tmp_path: Path, digest: str, size: int, original_name: str, content_type: str) -> dict:
+        """
+        Incorporar un archivo temporal ya hasheado al almacén
+
+        Si el contenido ya existe, el temporal se descarta y solo se
+        actualizan la cantidad y el momento de las subidas. La cantidad de
+        subidas no es una cuenta de referencias: qué gastos y pagos usan un
+        contenido lo sabe database.reference_index.
+
+        Args:
+            tmp_path (Path): Archivo temporal con el contenido completo
+            digest (str): SHA-256 del contenido
+            size (int): Tamaño en bytes
+            original_name (str): Nombre original del archivo
+            content_type (str): Tipo MIME declarado
+
+        Returns:
+            dict: Metadatos del contenido (incluye "deduplicated")
+        """
+        blob = self.blob_path(digest)
+        with self._locked():
+            metadata = self.get_metadata(digest)
+            deduplicated = metadata is not None and blob.exists()
+            if deduplicated:
+                os.unlink(tmp_path)
+                # "refcount" es el nombre anterior del campo
+                metadata["uploads"] = metadata.get("uploads", metadata.pop("refcount", 0)) + 1
+                metadata["uploaded_at"] = int(time.time())
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, blob)
+                metadata = {
+                    "sha256": digest,
+                    "original_name": original_name,
+                    "content_type": content_type,
+                    "size": size,
+                    "uploads": 1,
+                    "created_at": int(time.time()),
+                    "uploaded_at": int(time.time())
+                }
+            self._write_metadata(digest, metadata)
+
+        return {**metadata, "deduplicated": deduplicated}
+
+    def resolve(self, filename: str) -> Optional[Path]:
+        """
+        Resolver un nombre entregado al cliente a una ruta en disco
+
+        Args:
+            filename (str): Nombre direccionado por contenido o del esquema anterior
+
+        Returns:
+            Optional[Path]: Ruta existente, o None si no se encuentra
+        """
+        digest = self.parse_name(filename)
+        path = self.blob_path(digest) if digest else self.root / filename
+        return path if path.is_file() else None
+
+    @staticmethod
+    def shard_prefixes() -> List[str]:
+        """
+        Prefijos de primer nivel del árbol particionado, en orden
+
+        Returns:
+            List[str]: "00" a "ff"
+        """
+        return [f"{i:02x}" for i in range(256)]
+
+    def iter_shard(self, prefix: str) -> Iterator[str]:
+        """
+        Recorrer los hashes almacenados bajo un prefijo de primer nivel
+
+        Args:
+            prefix (str): Prefijo de dos caracteres hexadecimales
+
+        Yields:
+            str: SHA-256 de cada contenido
+        """
+        shard = self.blobs_dir / prefix
+        if not shard.is_dir():
+            return
+        for sub in sorted(os.listdir(shard)):
+            sub_dir = shard / sub
+            if not sub_dir.is_dir():
+                continue
+            for name in sorted(os.listdir(sub_dir)):
+                if _CONTENT_NAME.match(name) and "." not in name:
+                    yield name
+
+    def iter_legacy(self) -> Iterator[Path]:
+        """
+        Recorrer los archivos del esquema anterior (raíz del directorio)
+
+        Yields:
+            Path: Ruta de cada archivo
+        """
+        if not self.root.is_dir():
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith("."):
+                yield Path(entry.path)
+
+    def iter_temp(self) -> Iterator[Path]:
+        """
+        Recorrer los temporales de uploads en curso o abandonados
+
+        Yields:
+            Path: Ruta de cada temporal
+        """
+        if not self.tmp_dir.is_dir():
+            return
+        for entry in os.scandir(self.tmp_dir):
+            if entry.is_file():
+                yield Path(entry.path)
+
+    def last_used(self, digest: str) -> float:
+        """
+        Momento de la última subida de un contenido
+
+        Args:
+            digest (str): SHA-256 del contenido
+
+        Returns:
+            float: Timestamp de la última subida (o de modificación del archivo)
+        """
+        metadata = self.get_metadata(digest) or {}
+        uploaded = metadata.get("uploaded_at") or metadata.get("created_at")
+        if uploaded:
+            return float(uploaded)
+        try:
+            return self.blob_path(digest).stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def remove(self, digest: str, still_unused: Callable[[], bool]) -> int:
+        """
+        Eliminar un contenido, sus metadatos y sus variantes
+
+        Args:
+            digest (str): SHA-256 del contenido
+            still_unused (Callable[[], bool]): Verificación final, evaluada bajo el lock
+
+        Returns:
+            int: Bytes liberados (0 si no se eliminó)
+        """
+        blob = self.blob_path(digest)
+        freed = 0
+        with self._locked():
+            if not still_unused():
+                return 0
+            for path in blob.parent.glob(f"{digest}*"):
+                try:
+                    freed += path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        return freed
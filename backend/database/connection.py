@@ -1,69 +1,601 @@
 """
 Módulo de conexión y manejo de la base de datos JSON
+
+Los datos se mantienen en memoria y las escrituras se agrupan en lotes
+(ver database.write_coalescer) que se persisten de forma atómica. Con varios
+workers, un contador de generación compartido y un lock entre procesos
+(ver database.coherence) mantienen coherentes las copias en memoria.
+
+Cada consorcio tiene su propio almacén (LedgerStore): archivo, copia en
+memoria, cola de escrituras, comprobantes e índices derivados. Las
+funciones del módulo operan sobre el almacén de la petición en curso (ver
+use_store y database.tenants); si no se eligió ninguno se usa el almacén
+por defecto (DATABASE_FILE), el de una instalación de un solo consorcio.
 """
+import itertools
 import json
 import os
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from models.schemas import Database
+from database.records import Interner, Ledger, participant_ids
+from database.coherence import ProcessLock, SharedGeneration
+from database.comprobante_store import ComprobanteStore
+from database.files import atomic_write_bytes
+from database import snapshot
+from database.write_coalescer import WriteCoalescer
+from utils.metrics import INDEX_REBUILD_DURATION, STORAGE_DURATION
+import config
+
+
+# Ruta del archivo JSON del almacén por defecto
+DATABASE_FILE = config.DATABASE_FILE
+
+# Memoria estimada de una base cargada (registros e índices) por byte del
+# archivo JSON; medido con el generador de benchmarks (~2.8)
+MEMORY_PER_FILE_BYTE = 3
 
+# Versiones de datos: un contador único para todos los almacenes, de modo que
+# un consorcio que se vuelve a cargar tras ser desalojado no repite versiones
+_versions = itertools.count(1)
 
-# Ruta del archivo JSON
-DATABASE_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "database.json"))
+# Objetos derivados de la base con una instancia por almacén
+_tenant_locals: List["TenantLocal"] = []
 
 
-def load_database() -> Database:
+class TenantLocal:
     """
-    Cargar datos desde el archivo JSON
-    
+    Objeto derivado de la base (un índice, una copia columnar) con una instancia por almacén
+
+    Se usa como si fuera la instancia: los atributos se resuelven sobre la
+    del almacén de la petición en curso, creada la primera vez que se usa.
+    """
+
+    def __init__(self, factory: Callable[[], Any], rebuild: Optional[Callable[[Any, Ledger], None]], name: str):
+        """
+        Args:
+            factory (Callable[[], Any]): Crea la instancia de un almacén
+            rebuild (Optional[Callable[[Any, Ledger], None]]): Reconstruye la
+                instancia a partir de la base cargada (None si no depende de ella)
+            name (str): Nombre del índice (para métricas y el informe de arranque)
+        """
+        self._factory = factory
+        self._rebuild = rebuild
+        self._name = name
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(current_store().local(self), attribute)
+
+    def __repr__(self) -> str:
+        return f"<TenantLocal {self._name}>"
+
+
+def tenant_local(
+    factory: Callable[[], Any],
+    rebuild: Optional[Callable[[Any, Ledger], None]] = None,
+    name: Optional[str] = None
+) -> Any:
+    """
+    Registrar un objeto derivado de la base de datos, con una instancia por almacén
+
+    Si se indica rebuild, se invoca (bajo el lock del almacén) cada vez que
+    los datos se cargan del archivo, por ejemplo tras una escritura de otro
+    worker. Las mutaciones hechas por este proceso deben mantener el índice
+    de forma incremental.
+
+    Args:
+        factory (Callable[[], Any]): Crea la instancia de un almacén
+        rebuild (Optional[Callable[[Any, Ledger], None]]): Función que recibe
+            la instancia y la base cargada
+        name (Optional[str]): Nombre del índice (por defecto, el de factory)
+
     Returns:
-        Database: Instancia de la base de datos cargada
+        Any: Objeto que delega en la instancia del almacén de la petición en curso
     """
+    local = TenantLocal(factory, rebuild, name or getattr(factory, "__name__", repr(factory)))
+    _tenant_locals.append(local)
+    return local
+
+
+class LedgerStore:
+    """Base de datos de un consorcio: archivo JSON, copia en memoria, escrituras e índices"""
+
+    def __init__(self, tenant_id: Optional[str], database_file: str, upload_dir: str):
+        """
+        Args:
+            tenant_id (Optional[str]): ID del consorcio (None para el almacén por defecto)
+            database_file (str): Ruta del archivo JSON
+            upload_dir (str): Directorio de los comprobantes
+        """
+        self.tenant_id = tenant_id
+        self.database_file = database_file
+        self.comprobantes = ComprobanteStore(Path(upload_dir))
+        # Peticiones que usan el almacén (lo administra database.tenants)
+        self.pins = 0
+
+        # Estado en memoria compartido por todas las peticiones
+        self._lock = threading.RLock()
+        self._cache: Optional[Ledger] = None
+        self._cache_generation = -1
+        self._file_bytes = 0
+        self._file_format = "json"
+        # IDs de participantes de los registros de este almacén (ver records.participant_ids):
+        # se liberan con el almacén cuando database.tenants lo desaloja
+        self.participant_ids = Interner()
+        self._locals: Dict[TenantLocal, Any] = {}
+
+        # Versión de los datos en memoria: cambia con cada mutación o recarga
+        self._data_version = next(_versions)
+
+        # Última escritura completa: (momento en que terminó, duración en segundos)
+        self._last_flush: Optional[Tuple[float, float]] = None
+
+        # Duración de cada etapa de la última carga del archivo (lectura e índices)
+        self._last_load_breakdown: Dict[str, float] = {}
+
+        # Coherencia entre procesos (workers)
+        self.generation = SharedGeneration(database_file + ".gen")
+        self._process_lock = ProcessLock(database_file + ".lock")
+
+        self._coalescer = WriteCoalescer(
+            self._flush,
+            window=config.WRITE_COALESCE_WINDOW_MS / 1000
+        )
+
+    def read_file(self) -> Ledger:
+        """
+        Leer el archivo completo (JSON o snapshot binario, según su contenido)
+
+        Returns:
+            Ledger: Base de datos leída, en su representación en memoria
+        """
+        try:
+            with STORAGE_DURATION.time("read"):
+                if os.path.exists(self.database_file):
+                    ledger, self._file_bytes = snapshot.read_ledger(self.database_file)
+                    self._file_format = "snapshot" if isinstance(ledger, snapshot.SnapshotLedger) else "json"
+                    # Los índices recorren todos los registros al recargar: decodificar
+                    # acá deja el tiempo en "read" y libera el mapeo del archivo
+                    return snapshot.materialize(ledger)
+                else:
+                    self._file_bytes = 0
+                    return Ledger()
+        except Exception as e:
+            print(f"Error cargando base de datos: {e}")
+            return Ledger()
+
+    def _refresh_cache(self) -> None:
+        """
+        Recargar la copia en memoria si otro proceso escribió (requiere _lock)
+        """
+        generation = self.generation.read()
+        if self._cache is None or generation != self._cache_generation:
+            # Los registros y los índices se arman con los IDs de este almacén, aunque
+            # la recarga ocurra desde otro contexto (el hilo de escritura, otro consorcio)
+            with use_store(self):
+                start = time.perf_counter()
+                self._cache = self.read_file()
+                self._cache_generation = generation
+                breakdown = {"read": time.perf_counter() - start}
+                self._notify_reload(breakdown)
+            self._last_load_breakdown = breakdown
+
+    def _notify_reload(self, breakdown: Optional[Dict[str, float]] = None) -> None:
+        """
+        Avisar a los índices derivados que la copia en memoria cambió por completo (requiere _lock)
+
+        Args:
+            breakdown (Optional[Dict[str, float]]): Si se indica, se agrega la
+                duración de la reconstrucción de cada índice
+        """
+        self._data_version = next(_versions)
+        for local in _tenant_locals:
+            if local._rebuild is None:
+                continue
+            instance = self._locals.get(local)
+            if instance is None:
+                instance = self._locals[local] = local._factory()
+            start = time.perf_counter()
+            with INDEX_REBUILD_DURATION.time(local._name):
+                local._rebuild(instance, self._cache)
+            if breakdown is not None:
+                breakdown[local._name] = time.perf_counter() - start
+
+    def local(self, local: TenantLocal) -> Any:
+        """
+        Instancia de un objeto derivado en este almacén
+
+        Args:
+            local (TenantLocal): Objeto registrado con tenant_local()
+
+        Returns:
+            Any: Instancia del almacén (construida a partir de la base si ya está cargada)
+        """
+        instance = self._locals.get(local)
+        if instance is None:
+            with self._lock:
+                instance = self._locals.get(local)
+                if instance is None:
+                    instance = local._factory()
+                    if local._rebuild is not None and self._cache is not None:
+                        with INDEX_REBUILD_DURATION.time(local._name):
+                            local._rebuild(instance, self._cache)
+                    self._locals[local] = instance
+        return instance
+
+    def _acquire_process_lock(self) -> None:
+        """
+        Tomar el lock entre procesos y sincronizar la copia en memoria (requiere _lock)
+
+        El lock se conserva hasta que el lote que contiene la mutación esté en
+        disco, para que ningún otro proceso escriba sobre un estado desactualizado.
+        """
+        if not self._process_lock.held:
+            self._process_lock.acquire()
+            self._refresh_cache()
+
+    def _release_process_lock_if_idle(self) -> None:
+        """
+        Liberar el lock entre procesos si no quedan mutaciones sin persistir (requiere _lock)
+        """
+        if not self._coalescer.pending() and not self._coalescer.flushing():
+            self._process_lock.release()
+
+    def _flush(self) -> None:
+        """
+        Persistir el estado en memoria (llamado desde el hilo de escritura)
+
+        Raises:
+            Exception: Si hay error al guardar los datos
+        """
+        # La foto del estado se toma bajo el lock; la serialización y la E/S no
+        with self._lock, use_store(self):
+            if self._cache is None:
+                return
+            self._acquire_process_lock()
+            file_format = config.STORAGE_FORMAT
+            if file_format == "snapshot":
+                data = snapshot.sections(self._cache)
+            else:
+                data = self._cache.to_dict()
+        start = time.perf_counter()
+        try:
+            with STORAGE_DURATION.time("flush"):
+                if file_format == "snapshot":
+                    payload = snapshot.encode(data)
+                else:
+                    payload = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+                atomic_write_bytes(self.database_file, payload)
+        except Exception as e:
+            print(f"Error guardando base de datos: {e}")
+            error = Exception("Error guardando datos")
+            with self._lock:
+                # Descartar las mutaciones fallidas y volver al estado en disco. Las del
+                # lote abierto se aplicaron sobre la misma copia: ese lote también falla
+                # (si no, la próxima escritura persistiría cambios ya informados como error)
+                self._coalescer.fail_pending(error)
+                self._cache = None
+                self._process_lock.release()
+            raise error
+        self._last_flush = (time.time(), time.perf_counter() - start)
+        self._file_bytes = len(payload)
+        self._file_format = file_format
+        with self._lock:
+            self._cache_generation = self.generation.increment()
+            if not self._coalescer.pending():
+                self._process_lock.release()
+
+    def load(self) -> Ledger:
+        """
+        Obtener la base de datos en memoria, cargándola del archivo JSON la primera vez
+
+        Returns:
+            Ledger: Base de datos en memoria (ver load_database)
+        """
+        start = time.perf_counter()
+        db = self._cache
+        # Mientras este proceso tiene el lock de escritura su copia es la vigente
+        if db is None or (not self._process_lock.held and self.generation.read() != self._cache_generation):
+            with self._lock:
+                if not self._process_lock.held:
+                    self._refresh_cache()
+                db = self._cache
+        STORAGE_DURATION.observe(time.perf_counter() - start, "load")
+        return db
+
+    @contextmanager
+    def transaction(self) -> Iterator[Ledger]:
+        """
+        Modificar la base de datos y esperar a que el cambio sea durable (ver transaction)
+
+        Yields:
+            Ledger: Base de datos en memoria a modificar
+
+        Raises:
+            Exception: Si hay error al guardar los datos
+        """
+        with self._lock:
+            self._acquire_process_lock()
+            try:
+                yield self._cache
+            except BaseException:
+                self._release_process_lock_if_idle()
+                raise
+            self._data_version = next(_versions)
+            batch = self._coalescer.mark_dirty()
+        self._coalescer.wait(batch)
+
+    @contextmanager
+    def exclusive(self) -> Iterator[Ledger]:
+        """
+        Leer la base con el lock de escritura tomado (ver exclusive)
+
+        Yields:
+            Ledger: Base de datos en memoria, al día con los demás procesos
+        """
+        with self._lock:
+            self._acquire_process_lock()
+            try:
+                yield self._cache
+            finally:
+                self._release_process_lock_if_idle()
+
+    def save(self, db: Database) -> None:
+        """
+        Reemplazar la base de datos en memoria y guardarla en el archivo JSON
+
+        Args:
+            db (Database): Instancia de la base de datos a guardar
+
+        Raises:
+            Exception: Si hay error al guardar los datos
+        """
+        with STORAGE_DURATION.time("save"):
+            with self._lock, use_store(self):
+                self._acquire_process_lock()
+                self._cache = Ledger.from_database(db)
+                self._notify_reload()
+                batch = self._coalescer.mark_dirty()
+            self._coalescer.wait(batch)
+
+    def data_version(self) -> int:
+        """
+        Obtener la versión de los datos en memoria (ver data_version)
+
+        Returns:
+            int: Versión actual
+        """
+        return self._data_version
+
+    def loaded(self) -> bool:
+        """
+        Indicar si la base está en memoria
+
+        Returns:
+            bool: True si ya se cargó del archivo
+        """
+        return self._cache is not None
+
+    def resident_bytes(self) -> int:
+        """
+        Memoria estimada de la base cargada y sus índices
+
+        Returns:
+            int: Bytes estimados a partir del tamaño del archivo (0 si no está cargada)
+        """
+        if self._cache is None:
+            return 0
+        if self._file_format == "snapshot":
+            return self._file_bytes * snapshot.MEMORY_PER_FILE_BYTE
+        return self._file_bytes * MEMORY_PER_FILE_BYTE
+
+    def storage_stats(self) -> dict:
+        """
+        Estado del almacenamiento (ver storage_stats)
+
+        Returns:
+            dict: Si la base está en memoria, mutaciones sin persistir y la
+                duración y el momento de la última escritura completa
+        """
+        last_flush = self._last_flush
+        return {
+            "loaded": self._cache is not None,
+            "pending_writes": self._coalescer.depth(),
+            "last_flush_seconds": last_flush[1] if last_flush else None,
+            "last_flush_at": last_flush[0] if last_flush else None
+        }
+
+    def last_load_breakdown(self) -> Dict[str, float]:
+        """
+        Duración de cada etapa de la última carga del archivo (ver last_load_breakdown)
+
+        Returns:
+            Dict[str, float]: Segundos de la lectura y de cada índice
+        """
+        return dict(self._last_load_breakdown)
+
+    def close(self) -> None:
+        """
+        Persistir las mutaciones pendientes y liberar la memoria y los archivos abiertos
+
+        Se usa al desalojar un consorcio: no debe quedar ninguna petición
+        usando el almacén. Una escritura de otro worker no se pierde, porque
+        el próximo almacén del consorcio vuelve a leer el archivo.
+        """
+        self._coalescer.close()
+        with self._lock:
+            self._cache = None
+            self._cache_generation = -1
+            self._locals.clear()
+            self._process_lock.close()
+            self.generation.close()
+        self.comprobantes.close()
+
+
+# Almacén de una instalación de un solo consorcio (peticiones sin consorcio)
+default_store = LedgerStore(None, DATABASE_FILE, config.UPLOAD_DIR)
+
+# Almacén de la petición en curso (None para el almacén por defecto)
+_current_store: ContextVar[Optional[LedgerStore]] = ContextVar("current_store", default=None)
+
+
+def current_store() -> LedgerStore:
+    """
+    Obtener el almacén de la petición en curso
+
+    Returns:
+        LedgerStore: Almacén elegido con use_store, o el almacén por defecto
+    """
+    return _current_store.get() or default_store
+
+
+def _current_participant_ids() -> Interner:
+    return (_current_store.get() or default_store).participant_ids
+
+
+# Los registros codifican a los participantes con los IDs del almacén en curso
+participant_ids.set_resolver(_current_participant_ids)
+
+
+@contextmanager
+def use_store(store: LedgerStore) -> Iterator[LedgerStore]:
+    """
+    Operar sobre un almacén dentro de un bloque
+
+    La selección se guarda en una variable de contexto: alcanza a las tareas
+    y a las funciones del pool de hilos lanzadas desde el bloque.
+
+    Args:
+        store (LedgerStore): Almacén a usar
+
+    Yields:
+        LedgerStore: El mismo almacén
+    """
+    token = _current_store.set(store)
     try:
-        if os.path.exists(DATABASE_FILE):
-            with open(DATABASE_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return Database(**data)
-        else:
-            return Database()
-    except Exception as e:
-        print(f"Error cargando base de datos: {e}")
-        return Database()
+        yield store
+    finally:
+        _current_store.reset(token)
+
+
+def load_database() -> Ledger:
+    """
+    Obtener la base de datos en memoria, cargándola del archivo JSON la primera vez
+
+    La instancia devuelta es compartida: las modificaciones deben hacerse
+    dentro de transaction(). Sus colecciones contienen registros de
+    database.records, que se convierten a los modelos de la API al responder.
+
+    Returns:
+        Ledger: Base de datos en memoria
+    """
+    return current_store().load()
+
+
+def transaction():
+    """
+    Modificar la base de datos y esperar a que el cambio sea durable
+
+    La mutación en memoria se hace bajo un lock breve; la espera de la
+    escritura a disco ocurre fuera de él, de modo que las mutaciones
+    concurrentes se agrupan en una sola escritura. Si el bloque lanza una
+    excepción no se registra ninguna escritura.
+
+    Returns:
+        ContextManager[Ledger]: Base de datos en memoria a modificar
+
+    Raises:
+        Exception: Si hay error al guardar los datos
+    """
+    return current_store().transaction()
+
+
+def exclusive():
+    """
+    Leer la base sin que nadie pueda modificarla mientras tanto
+
+    Toma el lock de escritura de este proceso y el lock entre procesos, y
+    recarga la copia en memoria (y sus índices) si otro worker escribió. Es
+    para verificaciones que deben seguir valiendo al actuar, como que un
+    comprobante no esté referenciado antes de eliminarlo; no registra escrituras.
+
+    Returns:
+        ContextManager[Ledger]: Base de datos en memoria (solo lectura)
+    """
+    return current_store().exclusive()
 
 
 def save_database(db: Database) -> None:
     """
-    Guardar datos en el archivo JSON
-    
+    Reemplazar la base de datos en memoria y guardarla en el archivo JSON
+
     Args:
         db (Database): Instancia de la base de datos a guardar
-        
+
     Raises:
         Exception: Si hay error al guardar los datos
     """
-    try:
-        os.makedirs(os.path.dirname(DATABASE_FILE), exist_ok=True)
-        with open(DATABASE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(db.model_dump(), f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error guardando base de datos: {e}")
-        raise Exception("Error guardando datos")
+    current_store().save(db)
+
+
+def data_version() -> int:
+    """
+    Obtener la versión de los datos en memoria
+
+    Cambia con cada transacción de este proceso y cada vez que los datos se
+    recargan del archivo (por ejemplo tras una escritura de otro worker), de
+    modo que sirve como clave para cachear respuestas derivadas. Llamar
+    antes a load_database() para detectar escrituras de otros workers.
+
+    Returns:
+        int: Versión actual
+    """
+    return current_store().data_version()
+
+
+def storage_stats() -> dict:
+    """
+    Estado del almacenamiento para los chequeos de salud
+
+    No carga la base si todavía no se cargó.
+
+    Returns:
+        dict: Si la base está en memoria, mutaciones sin persistir y la
+            duración y el momento de la última escritura completa
+    """
+    return current_store().storage_stats()
+
+
+def last_load_breakdown() -> Dict[str, float]:
+    """
+    Duración de cada etapa de la última carga del archivo
+
+    Returns:
+        Dict[str, float]: Segundos de la lectura ("read") y de la
+            reconstrucción de cada índice derivado, en orden
+    """
+    return current_store().last_load_breakdown()
 
 
 def get_database_file_path() -> str:
     """
     Obtener la ruta del archivo de base de datos
-    
+
     Returns:
         str: Ruta absoluta del archivo de base de datos
     """
-    return DATABASE_FILE
+    return current_store().database_file
 
 
 def database_exists() -> bool:
     """
     Verificar si el archivo de base de datos existe
-    
+
     Returns:
         bool: True si existe, False si no
     """
-    return os.path.exists(DATABASE_FILE)
+    return os.path.exists(current_store().database_file)
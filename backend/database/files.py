@@ -0,0 +1,51 @@
+"""
+Utilidades de escritura durable de archivos
+"""
+import os
+
+
+def fsync_directory(directory: str) -> None:
+    """
+    Forzar a disco la entrada de directorio (necesario tras un rename)
+
+    Args:
+        directory (str): Directorio a sincronizar
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Algunas plataformas (Windows) no permiten abrir directorios
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """
+    Escribir un archivo de forma atómica y durable: archivo temporal, fsync y rename
+
+    Args:
+        path (str): Ruta final del archivo
+        data (bytes): Contenido a escribir
+
+    Raises:
+        OSError: Si falla alguna operación de E/S
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    fsync_directory(directory)
@@ -0,0 +1,63 @@
+"""
+Marca de agua de IDs por colección
+
+Como los ULID crecen con el tiempo, un ID generado mayor que el mayor ULID
+existente en la colección no puede estar repetido: la verificación de
+existencia se resuelve sin recorrer la colección. Los IDs con el formato
+anterior no son ULID y siguen verificándose con un recorrido.
+"""
+from typing import Dict
+from database.records import Ledger
+from database.connection import tenant_local
+from utils.helpers import is_ulid
+
+
+class IdWatermark:
+    """Mayor ULID conocido de cada colección"""
+
+    COLLECTIONS = ("gastos", "pagos", "participantes")
+
+    def __init__(self):
+        self._max: Dict[str, str] = {}
+
+    def rebuild(self, db: Ledger) -> None:
+        """
+        Recalcular las marcas a partir de la base
+
+        Args:
+            db (Ledger): Base de datos cargada
+        """
+        marks = {}
+        for collection in self.COLLECTIONS:
+            ulids = [e.id for e in getattr(db, collection) if is_ulid(e.id)]
+            marks[collection] = max(ulids) if ulids else ""
+        self._max = marks
+
+    def is_new(self, collection: str, entity_id: str) -> bool:
+        """
+        Indicar si un ID seguro no existe en la colección
+
+        Args:
+            collection (str): Nombre de la colección
+            entity_id (str): ID a verificar
+
+        Returns:
+            bool: True si es un ULID posterior a todos los existentes;
+                False si hay que verificarlo recorriendo la colección
+        """
+        return is_ulid(entity_id) and entity_id > self._max.get(collection, "")
+
+    def advance(self, collection: str, entity_id: str) -> None:
+        """
+        Registrar un ID incorporado a la colección
+
+        Args:
+            collection (str): Nombre de la colección
+            entity_id (str): ID incorporado
+        """
+        if is_ulid(entity_id) and entity_id > self._max.get(collection, ""):
+            self._max[collection] = entity_id
+
+
+# Marcas de cada consorcio, sincronizadas con su copia en memoria de la base
+id_watermark = tenant_local(IdWatermark, IdWatermark.rebuild)
@@ -0,0 +1,259 @@
+"""
+Índice mensual de gastos y pagos para los estados de cuenta
+
+Agrupa los registros por mes y lleva, por mes y participante, lo pagado en
+gastos, la parte que le corresponde de los gastos que comparte y los pagos
+hechos y recibidos, en centavos enteros (las altas y bajas sucesivas no
+acumulan error de redondeo); el saldo al inicio de un mes se obtiene sumando los
+meses anteriores sin recorrer la base. Cada mes tiene una versión que
+cambia solo cuando cambia alguno de sus registros, de modo que los estados
+de cuenta de los demás meses siguen siendo válidos.
+
+Se reconstruye cada vez que la base se carga del archivo y se mantiene de
+forma incremental en las altas, modificaciones y bajas de GastoService y
+PagoService.
+"""
+import itertools
+import threading
+from typing import Dict, List, Tuple
+from database.columnar import MES_DESCONOCIDO, a_centavos, fecha_a_ordinal
+from database.connection import tenant_local
+from database.records import GastoRecord, Ledger, PagoRecord
+
+
+# Versiones de los meses: únicas en el proceso, también entre reconstrucciones
+_versions = itertools.count(1)
+
+# Posiciones de los totales de un participante en un mes
+GASTOS_PAGADOS, PARTE_GASTOS, PAGOS_REALIZADOS, PAGOS_RECIBIDOS = range(4)
+
+
+def mes_de(fecha: str) -> int:
+    """
+    Mes de una fecha "YYYY-MM-DD"
+
+    Args:
+        fecha (str): Fecha del gasto o pago
+
+    Returns:
+        int: Mes como año*12+mes-1 (MES_DESCONOCIDO si la fecha no es válida)
+    """
+    return fecha_a_ordinal(fecha)[1]
+
+
+def repartir(centavos: int, cantidad: int) -> List[int]:
+    """
+    Repartir un monto en partes iguales sin perder centavos
+
+    Los centavos que sobran de la división se asignan de a uno a las
+    primeras partes, de modo que las partes suman exactamente el monto.
+
+    Args:
+        centavos (int): Monto en centavos
+        cantidad (int): Cantidad de partes (mayor que cero)
+
+    Returns:
+        List[int]: Parte de cada posición, en centavos
+    """
+    base, resto = divmod(centavos, cantidad)
+    return [base + 1 if i < resto else base for i in range(cantidad)]
+
+
+def parte_de(gasto: GastoRecord, code: int) -> int:
+    """
+    Parte de un gasto que le corresponde a un participante
+
+    Args:
+        gasto (GastoRecord): Gasto
+        code (int): Código del participante en participant_ids
+
+    Returns:
+        int: Parte en centavos (0 si no participa)
+    """
+    if not gasto.participante_codes:
+        return 0
+    partes = repartir(a_centavos(gasto.monto), len(gasto.participante_codes))
+    return sum(parte for c, parte in zip(gasto.participante_codes, partes) if c == code)
+
+
+def saldo(totales: List[int]) -> int:
+    """
+    Saldo de un participante a partir de sus totales (positivo: debe recibir)
+
+    Args:
+        totales (List[int]): Totales en centavos en el orden de GASTOS_PAGADOS..PAGOS_RECIBIDOS
+
+    Returns:
+        int: Lo pagado en gastos menos su parte, más los pagos hechos y menos los recibidos
+    """
+    return (totales[GASTOS_PAGADOS] - totales[PARTE_GASTOS]
+            + totales[PAGOS_REALIZADOS] - totales[PAGOS_RECIBIDOS])
+
+
+class MonthlyIndex:
+    """Registros, totales por participante y versión de cada mes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._gastos: Dict[int, Dict[str, GastoRecord]] = {}
+        self._pagos: Dict[int, Dict[str, PagoRecord]] = {}
+        self._totales: Dict[int, Dict[int, List[int]]] = {}
+        self._versions: Dict[int, int] = {}
+
+    def rebuild(self, db: Ledger) -> None:
+        """
+        Reconstruir el índice completo a partir de la base
+
+        Args:
+            db (Ledger): Base de datos cargada
+        """
+        with self.lock:
+            self._gastos = {}
+            self._pagos = {}
+            self._totales = {}
+            self._versions = {}
+            for gasto in db.gastos:
+                self._apply_gasto(gasto, 1)
+            for pago in db.pagos:
+                self._apply_pago(pago, 1)
+
+    def _touch(self, mes: int) -> None:
+        self._versions[mes] = next(_versions)
+
+    def _sumar(self, mes: int, code: int, posicion: int, centavos: int) -> None:
+        totales = self._totales.setdefault(mes, {})
+        fila = totales.get(code)
+        if fila is None:
+            fila = totales[code] = [0, 0, 0, 0]
+        fila[posicion] += centavos
+
+    def _apply_gasto(self, gasto: GastoRecord, signo: int) -> None:
+        mes = mes_de(gasto.fecha)
+        if mes == MES_DESCONOCIDO:
+            return
+        registros = self._gastos.setdefault(mes, {})
+        if signo > 0:
+            registros[gasto.id] = gasto
+        else:
+            registros.pop(gasto.id, None)
+        centavos = a_centavos(gasto.monto)
+        self._sumar(mes, gasto.pagado_por_code, GASTOS_PAGADOS, signo * centavos)
+        if gasto.participante_codes:
+            partes = repartir(centavos, len(gasto.participante_codes))
+            for code, parte in zip(gasto.participante_codes, partes):
+                self._sumar(mes, code, PARTE_GASTOS, signo * parte)
+        self._touch(mes)
+
+    def _apply_pago(self, pago: PagoRecord, signo: int) -> None:
+        mes = mes_de(pago.fecha)
+        if mes == MES_DESCONOCIDO:
+            return
+        registros = self._pagos.setdefault(mes, {})
+        if signo > 0:
+            registros[pago.id] = pago
+        else:
+            registros.pop(pago.id, None)
+        centavos = a_centavos(pago.monto)
+        self._sumar(mes, pago.deudor_code, PAGOS_REALIZADOS, signo * centavos)
+        self._sumar(mes, pago.acreedor_code, PAGOS_RECIBIDOS, signo * centavos)
+        self._touch(mes)
+
+    def add_gasto(self, gasto: GastoRecord) -> None:
+        """
+        Registrar un gasto
+
+        Args:
+            gasto (GastoRecord): Gasto incorporado
+        """
+        with self.lock:
+            self._apply_gasto(gasto, 1)
+
+    def remove_gasto(self, gasto: GastoRecord) -> None:
+        """
+        Quitar un gasto (el registro tal como estaba indexado)
+
+        Args:
+            gasto (GastoRecord): Gasto eliminado o reemplazado
+        """
+        with self.lock:
+            self._apply_gasto(gasto, -1)
+
+    def add_pago(self, pago: PagoRecord) -> None:
+        """
+        Registrar un pago
+
+        Args:
+            pago (PagoRecord): Pago incorporado
+        """
+        with self.lock:
+            self._apply_pago(pago, 1)
+
+    def remove_pago(self, pago: PagoRecord) -> None:
+        """
+        Quitar un pago (el registro tal como estaba indexado)
+
+        Args:
+            pago (PagoRecord): Pago eliminado o reemplazado
+        """
+        with self.lock:
+            self._apply_pago(pago, -1)
+
+    def version_hasta(self, mes: int) -> int:
+        """
+        Versión de los datos de un mes y los anteriores (requiere lock)
+
+        El saldo inicial depende de los meses anteriores: un cambio en
+        cualquiera de ellos también cambia la versión.
+
+        Args:
+            mes (int): Mes como año*12+mes-1
+
+        Returns:
+            int: Mayor versión de los meses hasta el indicado (0 si no hay datos)
+        """
+        return max((version for m, version in self._versions.items() if m <= mes), default=0)
+
+    def registros(self, mes: int) -> Tuple[List[GastoRecord], List[PagoRecord]]:
+        """
+        Gastos y pagos de un mes (requiere lock)
+
+        Args:
+            mes (int): Mes como año*12+mes-1
+
+        Returns:
+            Tuple[List[GastoRecord], List[PagoRecord]]: Copias de las listas del mes
+        """
+        return list(self._gastos.get(mes, {}).values()), list(self._pagos.get(mes, {}).values())
+
+    def totales(self, mes: int) -> Dict[int, List[int]]:
+        """
+        Totales de cada participante en un mes (requiere lock)
+
+        Args:
+            mes (int): Mes como año*12+mes-1
+
+        Returns:
+            Dict[int, List[int]]: Copia de los totales en centavos por código de participante
+        """
+        return {code: list(fila) for code, fila in self._totales.get(mes, {}).items()}
+
+    def saldos_iniciales(self, mes: int) -> Dict[int, int]:
+        """
+        Saldo de cada participante al comenzar un mes (requiere lock)
+
+        Args:
+            mes (int): Mes como año*12+mes-1
+
+        Returns:
+            Dict[int, int]: Saldo acumulado en centavos de los meses anteriores por código de participante
+        """
+        saldos: Dict[int, int] = {}
+        for m, totales in self._totales.items():
+            if m < mes:
+                for code, fila in totales.items():
+                    saldos[code] = saldos.get(code, 0) + saldo(fila)
+        return saldos
+
+
+# Índice de cada consorcio, sincronizado con su copia en memoria de la base
+monthly_index = tenant_local(MonthlyIndex, MonthlyIndex.rebuild)
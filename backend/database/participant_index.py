@@ -0,0 +1,97 @@
+"""
+Índice de participantes por código para embeber sus datos en los listados
+
+Asocia el código de participant_ids de cada participante con un resumen
+(nombre y unidad), de modo que los gastos y pagos, que guardan a sus
+participantes como códigos, se resuelven sin recorrer la colección.
+
+Se reconstruye cada vez que la base se carga del archivo y se mantiene de
+forma incremental en las altas, modificaciones y bajas de ParticipanteService.
+"""
+from typing import Dict, Iterable, Optional
+from database.connection import tenant_local
+from database.records import Ledger, ParticipanteRecord, participant_ids
+
+
+class ParticipantIndex:
+    """Resumen de cada participante por código"""
+
+    def __init__(self):
+        self._summaries: Dict[int, dict] = {}
+
+    @staticmethod
+    def summary(participante: ParticipanteRecord) -> dict:
+        """
+        Datos de un participante que se embeben en los listados
+
+        Args:
+            participante (ParticipanteRecord): Participante
+
+        Returns:
+            dict: Nombre y unidad
+        """
+        return {"nombre": participante.nombre, "unidad": participante.unidad}
+
+    def rebuild(self, db: Ledger) -> None:
+        """
+        Reconstruir el índice completo a partir de la base
+
+        Args:
+            db (Ledger): Base de datos cargada
+        """
+        self._summaries = {
+            participant_ids.code(p.id): self.summary(p) for p in db.participantes
+        }
+
+    def put(self, participante: ParticipanteRecord) -> None:
+        """
+        Registrar o reemplazar un participante
+
+        Args:
+            participante (ParticipanteRecord): Participante incorporado o actualizado
+        """
+        self._summaries[participant_ids.code(participante.id)] = self.summary(participante)
+
+    def remove(self, participante_id: str) -> None:
+        """
+        Quitar un participante
+
+        Args:
+            participante_id (str): ID del participante eliminado o renombrado
+        """
+        code = participant_ids.lookup(participante_id)
+        if code is not None:
+            self._summaries.pop(code, None)
+
+    def get(self, code: int) -> Optional[dict]:
+        """
+        Resumen de un participante
+
+        Args:
+            code (int): Código del participante en participant_ids
+
+        Returns:
+            Optional[dict]: Nombre y unidad, o None si no existe
+        """
+        return self._summaries.get(code)
+
+    def embed(self, codes: Iterable[int]) -> Dict[str, dict]:
+        """
+        Resúmenes de un conjunto de participantes, por ID
+
+        Args:
+            codes (Iterable[int]): Códigos referenciados por los registros del listado
+
+        Returns:
+            Dict[str, dict]: Resumen de cada participante existente
+        """
+        embedded = {}
+        for code in codes:
+            summary = self._summaries.get(code)
+            if summary is not None:
+                embedded[participant_ids.value(code)] = summary
+        return embedded
+
+
+# Índice de cada consorcio, sincronizado con su copia en memoria de la base
+participant_index = tenant_local(ParticipantIndex, ParticipantIndex.rebuild)
@@ -0,0 +1,485 @@
+"""
+Representación interna compacta de los datos en memoria
+
+Los modelos de models/schemas.py se usan para validar la entrada y para
+las respuestas de la API; en memoria cada entidad se guarda como un
+registro con __slots__ (sin diccionario por instancia). Las referencias a
+participantes (pagador, participantes, deudor y acreedor) se guardan como
+enteros de un diccionario propio de cada almacén (participant_ids) y los
+textos repetidos (fechas, categorías, creador) se internan.
+
+La conversión a los modelos de la API se hace solo al responder
+(to_model) y al persistir (to_dict).
+"""
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+from models.schemas import Database, Gasto, Pago, Participante, Usuario, UsuarioActual
+
+
+class Interner:
+    """Diccionario de strings a enteros consecutivos (solo crece)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def code(self, value: str) -> int:
+        """
+        Obtener el entero de un string, asignándole uno nuevo si no tenía
+
+        Args:
+            value (str): String a codificar
+
+        Returns:
+            int: Código del string
+        """
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(sys.intern(value))
+                    self._codes[value] = code
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        """
+        Obtener el entero de un string sin asignar uno nuevo
+
+        Args:
+            value (str): String a buscar
+
+        Returns:
+            Optional[int]: Código, o None si el string nunca se codificó
+        """
+        return self._codes.get(value)
+
+    def value(self, code: int) -> str:
+        """
+        Obtener el string de un entero
+
+        Args:
+            code (int): Código asignado por code()
+
+        Returns:
+            str: String original
+        """
+        return self._values[code]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class StoreInterner:
+    """
+    IDs de participantes del almacén en curso
+
+    Cada almacén (LedgerStore) tiene su propio Interner, de modo que los
+    códigos de un consorcio se liberan junto con su almacén cuando se lo
+    desaloja. database.connection registra cómo obtener el del almacén en
+    curso; sin él (herramientas que no cargan la aplicación) se usa un
+    Interner del proceso. Dentro de isolated() se usa uno descartable.
+    """
+
+    def __init__(self):
+        fallback = Interner()
+        self._resolve: Callable[[], Interner] = lambda: fallback
+        self._isolated: ContextVar[Optional[Interner]] = ContextVar("isolated_participant_ids", default=None)
+
+    def set_resolver(self, resolve: Callable[[], Interner]) -> None:
+        """
+        Registrar cómo obtener el Interner del almacén en curso
+
+        Args:
+            resolve (Callable[[], Interner]): Devuelve el Interner a usar
+        """
+        self._resolve = resolve
+
+    @contextmanager
+    def isolated(self) -> Iterator[Interner]:
+        """
+        Usar un Interner descartable dentro del bloque
+
+        Para decodificar bases que no son las del almacén (respaldos) sin
+        agregar sus IDs al diccionario del almacén en curso. Los registros
+        decodificados no deben salir del bloque.
+
+        Yields:
+            Interner: Diccionario de IDs del bloque
+        """
+        token = self._isolated.set(Interner())
+        try:
+            yield self._isolated.get()
+        finally:
+            self._isolated.reset(token)
+
+    def current(self) -> Interner:
+        """
+        Interner del almacén en curso (para resolverlo una sola vez en un recorrido)
+
+        Returns:
+            Interner: Diccionario de IDs del almacén
+        """
+        isolated = self._isolated.get()
+        return isolated if isolated is not None else self._resolve()
+
+    def code(self, value: str) -> int:
+        return self.current().code(value)
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self.current().lookup(value)
+
+    def value(self, code: int) -> str:
+        # Sin pasar por Interner.value: se llama por cada referencia al serializar
+        isolated = self._isolated.get()
+        return (isolated if isolated is not None else self._resolve())._values[code]
+
+    def __len__(self) -> int:
+        return len(self.current())
+
+
+# IDs de participantes referenciados desde gastos y pagos (del almacén en curso)
+participant_ids = StoreInterner()
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _consume(items: Optional[list]) -> Iterator[dict]:
+    """Recorrer una lista liberando cada elemento a medida que se entrega"""
+    if not items:
+        return
+    for i, item in enumerate(items):
+        items[i] = None
+        yield item
+
+
+class ParticipanteRecord:
+    """Participante en memoria"""
+
+    __slots__ = ("id", "nombre", "email", "telefono", "unidad", "activo", "version")
+
+    @classmethod
+    def from_model(cls, participante: Participante) -> "ParticipanteRecord":
+        record = cls()
+        record.id = participante.id
+        record.nombre = participante.nombre
+        record.email = participante.email
+        record.telefono = participante.telefono
+        record.unidad = _intern(participante.unidad)
+        record.activo = participante.activo
+        record.version = participante.version
+        return record
+
+    def to_model(self) -> Participante:
+        return Participante.model_construct(
+            id=self.id,
+            nombre=self.nombre,
+            email=self.email,
+            telefono=self.telefono,
+            unidad=self.unidad,
+            activo=self.activo,
+            version=self.version
+        )
+
+    @classmethod
+    def from_row(cls, row: list) -> "ParticipanteRecord":
+        """Construir desde una fila de to_row (datos ya validados: ver database.snapshot)"""
+        record = cls()
+        record.id, record.nombre, record.email, record.telefono, unidad, record.activo, record.version = row
+        record.unidad = _intern(unidad)
+        return record
+
+    def to_row(self) -> list:
+        return [self.id, self.nombre, self.email, self.telefono, self.unidad, self.activo, self.version]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "nombre": self.nombre,
+            "email": self.email,
+            "telefono": self.telefono,
+            "unidad": self.unidad,
+            "activo": self.activo,
+            "version": self.version
+        }
+
+
+class GastoRecord:
+    """Gasto en memoria; pagador y participantes codificados con participant_ids"""
+
+    __slots__ = (
+        "id", "descripcion", "monto", "fecha", "categoria", "comprobante",
+        "pagado_por_code", "participante_codes", "creado_por", "version"
+    )
+
+    # Campos de la API, en el orden de to_dict
+    FIELDS = (
+        "id", "descripcion", "monto", "fecha", "categoria", "comprobante",
+        "pagado_por", "participantes", "creado_por", "version"
+    )
+
+    @classmethod
+    def from_model(cls, gasto: Gasto) -> "GastoRecord":
+        record = cls()
+        record.id = gasto.id
+        record.descripcion = gasto.descripcion
+        record.monto = gasto.monto
+        record.fecha = _intern(gasto.fecha)
+        record.categoria = _intern(gasto.categoria)
+        record.comprobante = gasto.comprobante
+        record.pagado_por_code = participant_ids.code(gasto.pagado_por)
+        record.participante_codes = array("I", [participant_ids.code(p) for p in gasto.participantes])
+        record.creado_por = _intern(gasto.creado_por)
+        record.version = gasto.version
+        return record
+
+    @property
+    def pagado_por(self) -> str:
+        return participant_ids.value(self.pagado_por_code)
+
+    @property
+    def participantes(self) -> List[str]:
+        return [participant_ids.value(code) for code in self.participante_codes]
+
+    def involves(self, code: int) -> bool:
+        """
+        Indicar si un participante pagó o comparte el gasto
+
+        Args:
+            code (int): Código del participante en participant_ids
+
+        Returns:
+            bool: True si es el pagador o uno de los participantes
+        """
+        return self.pagado_por_code == code or code in self.participante_codes
+
+    @classmethod
+    def from_row(cls, row: list) -> "GastoRecord":
+        """Construir desde una fila de to_row (datos ya validados: ver database.snapshot)"""
+        record = cls()
+        (record.id, record.descripcion, record.monto, fecha, categoria, record.comprobante,
+         pagado_por, participantes, creado_por, record.version) = row
+        record.fecha = _intern(fecha)
+        record.categoria = _intern(categoria)
+        record.pagado_por_code = participant_ids.code(pagado_por)
+        record.participante_codes = array("I", [participant_ids.code(p) for p in participantes])
+        record.creado_por = _intern(creado_por)
+        return record
+
+    def to_row(self) -> list:
+        return [
+            self.id, self.descripcion, self.monto, self.fecha, self.categoria, self.comprobante,
+            self.pagado_por, self.participantes, self.creado_por, self.version
+        ]
+
+    def to_model(self) -> Gasto:
+        return Gasto.model_construct(
+            id=self.id,
+            descripcion=self.descripcion,
+            monto=self.monto,
+            fecha=self.fecha,
+            categoria=self.categoria,
+            comprobante=self.comprobante,
+            pagado_por=self.pagado_por,
+            participantes=self.participantes,
+            creado_por=self.creado_por,
+            version=self.version
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "descripcion": self.descripcion,
+            "monto": self.monto,
+            "fecha": self.fecha,
+            "categoria": self.categoria,
+            "comprobante": self.comprobante,
+            "pagado_por": self.pagado_por,
+            "participantes": self.participantes,
+            "creado_por": self.creado_por,
+            "version": self.version
+        }
+
+    def to_partial_dict(self, fields: Sequence[str]) -> dict:
+        return {field: getattr(self, field) for field in fields}
+
+
+class PagoRecord:
+    """Pago en memoria; deudor y acreedor codificados con participant_ids"""
+
+    __slots__ = (
+        "id", "descripcion", "monto", "fecha", "deudor_code", "acreedor_code",
+        "comprobante", "creado_por", "version"
+    )
+
+    # Campos de la API, en el orden de to_dict
+    FIELDS = (
+        "id", "descripcion", "monto", "fecha", "deudor_id", "acreedor_id",
+        "comprobante", "creado_por", "version"
+    )
+
+    @classmethod
+    def from_model(cls, pago: Pago) -> "PagoRecord":
+        record = cls()
+        record.id = pago.id
+        record.descripcion = pago.descripcion
+        record.monto = pago.monto
+        record.fecha = _intern(pago.fecha)
+        record.deudor_code = participant_ids.code(pago.deudor_id)
+        record.acreedor_code = participant_ids.code(pago.acreedor_id)
+        record.comprobante = pago.comprobante
+        record.creado_por = _intern(pago.creado_por)
+        record.version = pago.version
+        return record
+
+    @classmethod
+    def from_row(cls, row: list) -> "PagoRecord":
+        """Construir desde una fila de to_row (datos ya validados: ver database.snapshot)"""
+        record = cls()
+        (record.id, record.descripcion, record.monto, fecha, deudor_id, acreedor_id,
+         record.comprobante, creado_por, record.version) = row
+        record.fecha = _intern(fecha)
+        record.deudor_code = participant_ids.code(deudor_id)
+        record.acreedor_code = participant_ids.code(acreedor_id)
+        record.creado_por = _intern(creado_por)
+        return record
+
+    def to_row(self) -> list:
+        return [
+            self.id, self.descripcion, self.monto, self.fecha, self.deudor_id, self.acreedor_id,
+            self.comprobante, self.creado_por, self.version
+        ]
+
+    @property
+    def deudor_id(self) -> str:
+        return participant_ids.value(self.deudor_code)
+
+    @property
+    def acreedor_id(self) -> str:
+        return participant_ids.value(self.acreedor_code)
+
+    def involves(self, code: int) -> bool:
+        """
+        Indicar si un participante es deudor o acreedor del pago
+
+        Args:
+            code (int): Código del participante en participant_ids
+
+        Returns:
+            bool: True si participa del pago
+        """
+        return self.deudor_code == code or self.acreedor_code == code
+
+    def to_model(self) -> Pago:
+        return Pago.model_construct(
+            id=self.id,
+            descripcion=self.descripcion,
+            monto=self.monto,
+            fecha=self.fecha,
+            deudor_id=self.deudor_id,
+            acreedor_id=self.acreedor_id,
+            comprobante=self.comprobante,
+            creado_por=self.creado_por,
+            version=self.version
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "descripcion": self.descripcion,
+            "monto": self.monto,
+            "fecha": self.fecha,
+            "deudor_id": self.deudor_id,
+            "acreedor_id": self.acreedor_id,
+            "comprobante": self.comprobante,
+            "creado_por": self.creado_por,
+            "version": self.version
+        }
+
+    def to_partial_dict(self, fields: Sequence[str]) -> dict:
+        return {field: getattr(self, field) for field in fields}
+
+
+class Ledger:
+    """Base de datos en memoria (registros compactos en lugar de modelos)"""
+
+    __slots__ = ("gastos", "pagos", "participantes", "usuarios", "usuarioActual")
+
+    def __init__(self):
+        self.gastos: List[GastoRecord] = []
+        self.pagos: List[PagoRecord] = []
+        self.participantes: List[ParticipanteRecord] = []
+        self.usuarios: List[Usuario] = []
+        self.usuarioActual: Optional[UsuarioActual] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Ledger":
+        """
+        Construir la base validando cada entidad con su modelo de la API
+
+        Cada modelo se descarta apenas se convierte y cada entrada del JSON
+        se libera al procesarla, de modo que nunca conviven en memoria todos
+        los modelos ni el JSON completo junto con todos los registros.
+
+        Args:
+            data (dict): Contenido del archivo JSON
+
+        Returns:
+            Ledger: Base de datos en memoria
+
+        Raises:
+            ValidationError: Si alguna entidad no es válida
+        """
+        ledger = cls()
+        ledger.participantes = [
+            ParticipanteRecord.from_model(Participante.model_validate(p))
+            for p in _consume(data.get("participantes"))
+        ]
+        ledger.gastos = [GastoRecord.from_model(Gasto.model_validate(g)) for g in _consume(data.get("gastos"))]
+        ledger.pagos = [PagoRecord.from_model(Pago.model_validate(p)) for p in _consume(data.get("pagos"))]
+        ledger.usuarios = [Usuario.model_validate(u) for u in data.get("usuarios") or []]
+        actual = data.get("usuarioActual")
+        ledger.usuarioActual = UsuarioActual.model_validate(actual) if actual else None
+        return ledger
+
+    @classmethod
+    def from_database(cls, db: Database) -> "Ledger":
+        """
+        Construir la base a partir del modelo completo de la API
+
+        Args:
+            db (Database): Base de datos validada
+
+        Returns:
+            Ledger: Base de datos en memoria
+        """
+        ledger = cls()
+        ledger.participantes = [ParticipanteRecord.from_model(p) for p in db.participantes]
+        ledger.gastos = [GastoRecord.from_model(g) for g in db.gastos]
+        ledger.pagos = [PagoRecord.from_model(p) for p in db.pagos]
+        ledger.usuarios = list(db.usuarios)
+        ledger.usuarioActual = db.usuarioActual
+        return ledger
+
+    def to_dict(self) -> dict:
+        """
+        Convertir la base al formato del archivo JSON
+
+        Returns:
+            dict: Mismo contenido que Database.model_dump()
+        """
+        return {
+            "gastos": [g.to_dict() for g in self.gastos],
+            "pagos": [p.to_dict() for p in self.pagos],
+            "participantes": [p.to_dict() for p in self.participantes],
+            "usuarios": [u.model_dump() for u in self.usuarios],
+            "usuarioActual": self.usuarioActual.model_dump() if self.usuarioActual else None
+        }
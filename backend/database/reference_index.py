@@ -0,0 +1,122 @@
+"""
+Índice de referencias desde comprobantes hacia los gastos y pagos que los usan
+
+Se reconstruye cada vez que la base se carga del archivo y se mantiene de
+forma incremental en las altas, modificaciones y bajas de GastoService y
+PagoService. Lo consulta el recolector de comprobantes huérfanos.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+from database.records import Ledger
+from database.comprobante_store import ComprobanteStore
+from database.connection import tenant_local
+
+
+# Referencia a una entidad: ("gasto" | "pago", id)
+Referencia = Tuple[str, str]
+
+
+class ReferenceIndex:
+    """Mapa de comprobante a entidades que lo referencian"""
+
+    def __init__(self):
+        self._refs: Dict[str, Set[Referencia]] = {}
+
+    @staticmethod
+    def key(comprobante: Optional[str]) -> Optional[str]:
+        """
+        Clave de índice de un comprobante
+
+        Los nombres direccionados por contenido se indexan por su hash, de
+        modo que distintas extensiones del mismo contenido cuentan juntas.
+
+        Args:
+            comprobante (Optional[str]): Valor del campo comprobante
+
+        Returns:
+            Optional[str]: Hash, nombre del esquema anterior, o None si está vacío
+        """
+        if not comprobante:
+            return None
+        return ComprobanteStore.parse_name(comprobante) or comprobante
+
+    def rebuild(self, db: Ledger) -> None:
+        """
+        Reconstruir el índice completo a partir de la base
+
+        Args:
+            db (Ledger): Base de datos cargada
+        """
+        refs: Dict[str, Set[Referencia]] = {}
+        for gasto in db.gastos:
+            key = self.key(gasto.comprobante)
+            if key:
+                refs.setdefault(key, set()).add(("gasto", gasto.id))
+        for pago in db.pagos:
+            key = self.key(pago.comprobante)
+            if key:
+                refs.setdefault(key, set()).add(("pago", pago.id))
+        self._refs = refs
+
+    def add(self, comprobante: Optional[str], referencia: Referencia) -> None:
+        """
+        Registrar que una entidad usa un comprobante
+
+        Args:
+            comprobante (Optional[str]): Valor del campo comprobante
+            referencia (Referencia): Entidad que lo usa
+        """
+        key = self.key(comprobante)
+        if key:
+            self._refs.setdefault(key, set()).add(referencia)
+
+    def remove(self, comprobante: Optional[str], referencia: Referencia) -> None:
+        """
+        Registrar que una entidad dejó de usar un comprobante
+
+        Args:
+            comprobante (Optional[str]): Valor anterior del campo comprobante
+            referencia (Referencia): Entidad que lo usaba
+        """
+        key = self.key(comprobante)
+        refs = self._refs.get(key) if key else None
+        if refs is not None:
+            refs.discard(referencia)
+            if not refs:
+                del self._refs[key]
+
+    def references(self, key: str) -> Set[Referencia]:
+        """
+        Entidades que referencian una clave
+
+        Args:
+            key (str): Hash o nombre del esquema anterior
+
+        Returns:
+            Set[Referencia]: Copia del conjunto de referencias
+        """
+        return set(self._refs.get(key, ()))
+
+    def is_referenced(self, key: str) -> bool:
+        """
+        Indicar si alguna entidad usa una clave
+
+        Args:
+            key (str): Hash o nombre del esquema anterior
+
+        Returns:
+            bool: True si hay al menos una referencia
+        """
+        return key in self._refs
+
+    def keys(self) -> List[str]:
+        """
+        Claves con al menos una referencia
+
+        Returns:
+            List[str]: Hashes y nombres del esquema anterior, ordenados
+        """
+        return sorted(self._refs)
+
+
+# Índice de cada consorcio, sincronizado con su copia en memoria de la base
+reference_index = tenant_local(ReferenceIndex, ReferenceIndex.rebuild)
@@ -0,0 +1,215 @@
+"""
+Índice invertido en memoria para la búsqueda de gastos
+
+Indexa la descripción y la categoría de cada gasto. Los términos se
+normalizan sin acentos ni mayúsculas ("Pintura Ñandú" -> "pintura", "nandu")
+y la búsqueda admite prefijos ("asc" encuentra "ascensor"). Se reconstruye
+cada vez que la base se carga del archivo y se mantiene de forma
+incremental en las altas, modificaciones y bajas de GastoService.
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Set, Tuple
+from database.records import GastoRecord, Ledger
+from database.connection import tenant_local
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Peso de un término según el campo en que aparece
+CATEGORIA_WEIGHT = 2
+DESCRIPCION_WEIGHT = 1
+
+# Un término que solo coincide por prefijo vale menos que uno exacto
+PREFIX_FACTOR = 0.5
+
+# Longitud mínima para expandir un término por prefijo
+MIN_PREFIX_LENGTH = 2
+
+
+def normalize(text: str) -> str:
+    """
+    Pasar a minúsculas y quitar acentos (á -> a, ñ -> n, ü -> u)
+
+    Args:
+        text (str): Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Separar un texto en términos normalizados
+
+    Args:
+        text (str): Texto original
+
+    Returns:
+        List[str]: Términos
+    """
+    return _TOKEN.findall(normalize(text or ""))
+
+
+class SearchIndex:
+    """Índice invertido de gastos por descripción y categoría"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._docs: Dict[str, GastoRecord] = {}
+        self._vocabulary: List[str] = []
+
+    @staticmethod
+    def _terms(gasto: GastoRecord) -> Dict[str, int]:
+        terms: Dict[str, int] = {}
+        for term in tokenize(gasto.descripcion):
+            terms[term] = terms.get(term, 0) + DESCRIPCION_WEIGHT
+        for term in tokenize(gasto.categoria):
+            terms[term] = terms.get(term, 0) + CATEGORIA_WEIGHT
+        return terms
+
+    def rebuild(self, db: Ledger) -> None:
+        """
+        Reconstruir el índice completo a partir de la base
+
+        Args:
+            db (Ledger): Base de datos cargada
+        """
+        postings: Dict[str, Dict[str, int]] = {}
+        docs: Dict[str, GastoRecord] = {}
+        for gasto in db.gastos:
+            docs[gasto.id] = gasto
+            for term, weight in self._terms(gasto).items():
+                postings.setdefault(term, {})[gasto.id] = weight
+        with self._lock:
+            self._postings = postings
+            self._docs = docs
+            self._vocabulary = sorted(postings)
+
+    def add(self, gasto: GastoRecord) -> None:
+        """
+        Indexar un gasto nuevo o reemplazar su versión anterior
+
+        Args:
+            gasto (GastoRecord): Gasto a indexar
+        """
+        terms = self._terms(gasto)
+        with self._lock:
+            self._remove_locked(gasto.id)
+            self._docs[gasto.id] = gasto
+            for term, weight in terms.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = {}
+                    bisect.insort(self._vocabulary, term)
+                posting[gasto.id] = weight
+
+    def remove(self, gasto_id: str) -> None:
+        """
+        Quitar un gasto del índice
+
+        Args:
+            gasto_id (str): ID del gasto
+        """
+        with self._lock:
+            self._remove_locked(gasto_id)
+
+    def _remove_locked(self, gasto_id: str) -> None:
+        # Los registros no se modifican en el lugar: los términos se recalculan
+        anterior = self._docs.pop(gasto_id, None)
+        if anterior is None:
+            return
+        for term in self._terms(anterior):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(gasto_id, None)
+            if not posting:
+                del self._postings[term]
+                position = bisect.bisect_left(self._vocabulary, term)
+                if position < len(self._vocabulary) and self._vocabulary[position] == term:
+                    del self._vocabulary[position]
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """Términos del vocabulario que coinciden con un término de búsqueda"""
+        if len(term) < MIN_PREFIX_LENGTH:
+            return [(term, 1.0)] if term in self._postings else []
+        matches = []
+        position = bisect.bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            candidate = self._vocabulary[position]
+            matches.append((candidate, 1.0 if candidate == term else PREFIX_FACTOR))
+            position += 1
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[GastoRecord]:
+        """
+        Buscar gastos que contengan todos los términos de la consulta
+
+        Cada término coincide de forma exacta o por prefijo. Los resultados se
+        ordenan por relevancia (TF-IDF, con más peso para la categoría y para
+        las coincidencias exactas) y, a igual relevancia, los más nuevos primero.
+
+        Args:
+            query (str): Texto a buscar
+            limit (int): Cantidad máxima de resultados
+
+        Returns:
+            List[GastoRecord]: Gastos encontrados, del más relevante al menos relevante
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            total = len(self._docs) or 1
+            # Por término: listas de (posting, factor) de cada término del vocabulario que coincide
+            expanded: List[List[Tuple[Dict[str, int], float]]] = []
+            candidates: List[Set[str]] = []
+            for term in terms:
+                matches = [
+                    (self._postings[candidate], factor * math.log(1 + total / len(self._postings[candidate])))
+                    for candidate, factor in self._expand(term)
+                ]
+                if not matches:
+                    return []
+                expanded.append(matches)
+                if len(matches) == 1:
+                    candidates.append(matches[0][0].keys())
+                else:
+                    candidates.append(set().union(*(posting for posting, _ in matches)))
+
+            # Intersección empezando por el término más selectivo
+            candidates.sort(key=len)
+            found: Set[str] = set(candidates[0])
+            for other in candidates[1:]:
+                found &= other
+                if not found:
+                    return []
+
+            scores = dict.fromkeys(found, 0.0)
+            for matches in expanded:
+                if len(matches) == 1:
+                    posting, factor = matches[0]
+                    scores = {doc_id: score + posting[doc_id] * factor for doc_id, score in scores.items()}
+                else:
+                    scores = {
+                        doc_id: score + max(posting.get(doc_id, 0.0) * factor for posting, factor in matches)
+                        for doc_id, score in scores.items()
+                    }
+
+            # A igual relevancia, primero los IDs mayores (los ULID crecen con el tiempo)
+            ranked = heapq.nlargest(limit, zip(scores.values(), scores.keys()))
+            return [self._docs[doc_id] for _, doc_id in ranked]
+
+
+# Índice de cada consorcio, sincronizado con su copia en memoria de la base
+search_index = tenant_local(SearchIndex, SearchIndex.rebuild)
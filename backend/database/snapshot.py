@@ -0,0 +1,383 @@
+"""
+Formato binario de la base con índice de secciones y carga diferida
+
+Alternativa a database.json para bases grandes. El archivo es:
+
+    MAGIC (8 bytes) | largo del índice (uint32 LE) | índice (JSON) | secciones
+
+El índice indica, para cada colección (participantes, gastos, pagos,
+usuarios y usuarioActual), la cantidad de registros, las columnas y la
+posición, largo y CRC32 de cada bloque. Cada bloque guarda hasta
+CHUNK_ROWS filas como arrays JSON sin nombres de campo (ver to_row de
+database.records).
+
+El archivo se mapea en memoria (mmap) y cada colección se decodifica recién
+cuando se accede a ella (SnapshotLedger). Los datos se validaron con los
+modelos de la API al escribirse, así que las filas se convierten directo a
+registros sin volver a validarlas: la carga evita tanto el parseo de las
+colecciones que no se usan como la validación de cada entidad.
+
+Con MICONSORCIO_STORAGE_FORMAT=snapshot las escrituras usan este formato;
+la lectura reconoce los dos formatos por su contenido, de modo que se puede
+cambiar en cualquier momento.
+
+Uso:
+    python -m database.snapshot to-snapshot data/database.json data/database.json
+    python -m database.snapshot to-json data/database.json /tmp/database.json
+    python -m database.snapshot info data/database.json
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from database.files import atomic_write_bytes
+from database.records import GastoRecord, Ledger, PagoRecord, ParticipanteRecord, _consume
+from models.schemas import Usuario, UsuarioActual
+
+
+MAGIC = b"MCSNAP\x00\x01"
+FORMAT = 1
+
+_HEADER = struct.Struct("<8sI")
+
+# Secciones en el orden en que se escriben
+COLLECTIONS = ("participantes", "gastos", "pagos", "usuarios", "usuarioActual")
+
+# Clase de registro y columnas de las filas de cada colección de registros
+_RECORDS = {"participantes": ParticipanteRecord, "gastos": GastoRecord, "pagos": PagoRecord}
+_COLUMNS = {
+    "participantes": ("id", "nombre", "email", "telefono", "unidad", "activo", "version"),
+    "gastos": GastoRecord.FIELDS,
+    "pagos": PagoRecord.FIELDS,
+}
+
+# Filas por bloque: al decodificar, solo un bloque convive con los registros ya
+# construidos (en lugar de la sección completa)
+CHUNK_ROWS = 10000
+
+# Memoria estimada de una base cargada (registros e índices) por byte del
+# archivo; medido con benchmarks.coldload (~2.7, sobre un archivo que ocupa
+# ~55% del JSON equivalente)
+MEMORY_PER_FILE_BYTE = 3
+
+
+class SnapshotError(ValueError):
+    """Archivo que no es un snapshot válido"""
+
+
+def is_snapshot(path: str) -> bool:
+    """
+    Indicar si un archivo está en el formato binario
+
+    Args:
+        path (str): Ruta del archivo
+
+    Returns:
+        bool: True si empieza con MAGIC
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def sections(ledger: Ledger) -> Dict[str, Any]:
+    """
+    Foto de la base como datos simples, lista para encode()
+
+    Es la parte que se hace bajo el lock de la base (como Ledger.to_dict).
+
+    Args:
+        ledger (Ledger): Base en memoria
+
+    Returns:
+        Dict[str, Any]: Filas de cada colección de registros y usuarios como diccionarios
+    """
+    return {
+        "participantes": [p.to_row() for p in ledger.participantes],
+        "gastos": [g.to_row() for g in ledger.gastos],
+        "pagos": [p.to_row() for p in ledger.pagos],
+        "usuarios": [u.model_dump() for u in ledger.usuarios],
+        "usuarioActual": ledger.usuarioActual.model_dump() if ledger.usuarioActual else None
+    }
+
+
+def encode(data: Dict[str, Any]) -> bytes:
+    """
+    Serializar una foto de sections() al formato binario
+
+    Args:
+        data (Dict[str, Any]): Resultado de sections()
+
+    Returns:
+        bytes: Contenido completo del archivo
+    """
+    payloads: Dict[str, List[bytes]] = {}
+    for name in COLLECTIONS:
+        value = data[name]
+        parts = [value[i:i + CHUNK_ROWS] for i in range(0, len(value), CHUNK_ROWS)] if isinstance(value, list) else [value]
+        payloads[name] = [
+            json.dumps(part, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for part in parts
+        ]
+    # Las posiciones dependen del largo del índice y viceversa: se recalcula
+    # hasta que el largo no cambia (en la práctica, dos o tres vueltas)
+    toc_bytes = b""
+    while True:
+        offset = _HEADER.size + len(toc_bytes)
+        entries = {}
+        for name in COLLECTIONS:
+            value = data[name]
+            chunks = []
+            for payload in payloads[name]:
+                chunks.append([offset, len(payload), zlib.crc32(payload)])
+                offset += len(payload)
+            entries[name] = {
+                "count": len(value) if isinstance(value, list) else int(value is not None),
+                "columns": list(_COLUMNS.get(name, ())),
+                "chunks": chunks
+            }
+        toc = {"format": FORMAT, "encoding": "json-rows", "sections": entries}
+        encoded = json.dumps(toc, separators=(",", ":")).encode("utf-8")
+        stable = len(encoded) == len(toc_bytes)
+        toc_bytes = encoded
+        if stable:
+            break
+    return b"".join([
+        _HEADER.pack(MAGIC, len(toc_bytes)), toc_bytes,
+        *(payload for name in COLLECTIONS for payload in payloads[name])
+    ])
+
+
+class Snapshot:
+    """Índice y secciones de un archivo en formato binario"""
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        """
+        Args:
+            buffer (Union[bytes, mmap.mmap]): Contenido del archivo (mapeado o en memoria)
+
+        Raises:
+            SnapshotError: Si el encabezado o el índice no son válidos
+        """
+        if len(buffer) < _HEADER.size:
+            raise SnapshotError("Archivo demasiado corto")
+        magic, toc_length = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotError("No es un snapshot de MiConsorcio")
+        try:
+            self.toc = json.loads(buffer[_HEADER.size:_HEADER.size + toc_length])
+        except ValueError as e:
+            raise SnapshotError(f"Índice ilegible: {e}")
+        if self.toc.get("format") != FORMAT or self.toc.get("encoding") != "json-rows":
+            raise SnapshotError(f"Formato no soportado: {self.toc.get('format')}")
+        for name in COLLECTIONS:
+            entry = self.toc["sections"].get(name)
+            if entry is None or any(offset + length > len(buffer) for offset, length, _ in entry["chunks"]):
+                raise SnapshotError(f"Sección {name} ausente o truncada")
+            if entry["columns"] != list(_COLUMNS.get(name, ())):
+                raise SnapshotError(f"Columnas de {name} no soportadas")
+        self._buffer = buffer
+        self._pending = set(COLLECTIONS)
+
+    def chunks(self, name: str) -> Iterator[Any]:
+        """
+        Decodificar los bloques de una sección a datos simples, verificando su CRC32
+
+        Args:
+            name (str): Colección
+
+        Yields:
+            Any: Filas (o diccionarios) de cada bloque
+
+        Raises:
+            SnapshotError: Si algún bloque está corrupto
+        """
+        for offset, length, crc in self.toc["sections"][name]["chunks"]:
+            payload = self._buffer[offset:offset + length]
+            if zlib.crc32(payload) != crc:
+                raise SnapshotError(f"Sección {name} corrupta")
+            if isinstance(self._buffer, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+                # Las páginas ya leídas no se vuelven a usar: que no cuenten como memoria residente
+                start = offset - offset % mmap.PAGESIZE
+                self._buffer.madvise(mmap.MADV_DONTNEED, start, offset + length - start)
+            yield json.loads(payload)
+
+    def decode(self, name: str) -> Any:
+        """
+        Decodificar una colección a su representación en memoria
+
+        Cuando ya se decodificaron todas, se libera el mapeo del archivo.
+
+        Args:
+            name (str): Colección
+
+        Returns:
+            Any: Lista de registros, de usuarios, o el usuario actual
+        """
+        chunks = self.chunks(name)
+        if name in _RECORDS:
+            from_row = _RECORDS[name].from_row
+            value = [from_row(row) for rows in chunks for row in _consume(rows)]
+        elif name == "usuarios":
+            value = [Usuario.model_validate(u) for rows in chunks for u in rows]
+        else:
+            actual = next(chunks)
+            value = UsuarioActual.model_validate(actual) if actual else None
+        self._pending.discard(name)
+        if not self._pending:
+            self.close()
+        return value
+
+    def close(self) -> None:
+        """Liberar el mapeo del archivo"""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._buffer = b""
+
+
+class SnapshotLedger(Ledger):
+    """Base leída de un snapshot: cada colección se decodifica en su primer acceso"""
+
+    __slots__ = ("_snapshot", "_decode_lock")
+
+    def __init__(self, snapshot: Snapshot):
+        # Sin Ledger.__init__: las colecciones quedan sin asignar hasta que se usan
+        self._snapshot = snapshot
+        self._decode_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Solo se llama si el atributo todavía no tiene valor
+        if name not in COLLECTIONS:
+            raise AttributeError(name)
+        with self._decode_lock:
+            try:
+                return object.__getattribute__(self, name)
+            except AttributeError:
+                value = self._snapshot.decode(name)
+                setattr(self, name, value)
+                return value
+
+    def decoded(self) -> List[str]:
+        """
+        Colecciones ya decodificadas
+
+        Returns:
+            List[str]: Nombres de las colecciones en memoria
+        """
+        return [name for name in COLLECTIONS if name not in self._snapshot._pending]
+
+
+def open_snapshot(path: str) -> SnapshotLedger:
+    """
+    Abrir un snapshot mapeándolo en memoria, sin decodificar ninguna colección
+
+    Args:
+        path (str): Ruta del archivo
+
+    Returns:
+        SnapshotLedger: Base con carga diferida
+
+    Raises:
+        SnapshotError: Si el archivo no es un snapshot válido
+    """
+    with open(path, "rb") as f:
+        # El mapeo sigue siendo válido aunque un rename reemplace el archivo
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return SnapshotLedger(Snapshot(buffer))
+    except BaseException:
+        buffer.close()
+        raise
+
+
+def read_ledger(path: str) -> Tuple[Ledger, int]:
+    """
+    Leer una base en cualquiera de los dos formatos (se reconoce por el contenido)
+
+    Args:
+        path (str): Ruta del archivo
+
+    Returns:
+        Tuple[Ledger, int]: Base leída y tamaño del archivo en bytes
+    """
+    if is_snapshot(path):
+        return open_snapshot(path), os.path.getsize(path)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+        size = f.tell()
+    return Ledger.from_dict(data), size
+
+
+def materialize(ledger: Ledger) -> Ledger:
+    """
+    Decodificar todas las colecciones de una base (verifica cada sección de un snapshot)
+
+    Args:
+        ledger (Ledger): Base en cualquiera de los dos formatos
+
+    Returns:
+        Ledger: La misma base, con todas sus colecciones en memoria
+    """
+    for name in COLLECTIONS:
+        getattr(ledger, name)
+    return ledger
+
+
+def ledger_from_bytes(data: bytes) -> Ledger:
+    """
+    Construir la base a partir del contenido de un archivo en cualquiera de los dos formatos
+
+    Args:
+        data (bytes): Contenido completo del archivo (vacío: base vacía)
+
+    Returns:
+        Ledger: Base leída
+    """
+    if not data:
+        return Ledger()
+    if data.startswith(MAGIC):
+        return SnapshotLedger(Snapshot(data))
+    return Ledger.from_dict(json.loads(data))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convertir la base entre JSON y el formato binario")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, description in (("to-snapshot", "JSON (o snapshot) a snapshot"), ("to-json", "Snapshot (o JSON) a JSON")):
+        command = commands.add_parser(name, help=description)
+        command.add_argument("source")
+        command.add_argument("target")
+    info = commands.add_parser("info", help="Mostrar el índice de un snapshot")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "info":
+            toc = open_snapshot(args.path)._snapshot.toc
+            for name in COLLECTIONS:
+                entry = toc["sections"][name]
+                length = sum(chunk[1] for chunk in entry["chunks"])
+                print(f"{name:<15} {entry['count']:>10} registros {len(entry['chunks']):>5} bloques {length:>12} bytes")
+            return 0
+        with open(args.source, "rb") as f:
+            ledger = ledger_from_bytes(f.read())
+        if args.command == "to-snapshot":
+            payload = encode(sections(ledger))
+        else:
+            payload = json.dumps(ledger.to_dict(), ensure_ascii=False, indent=2).encode("utf-8")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    atomic_write_bytes(os.path.abspath(args.target), payload)
+    print(f"✅ {args.target}: {len(payload)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Consorcios alojados en un mismo proceso
+
+Cada consorcio tiene su subdirectorio en TENANTS_DIR (database.json y
+uploads/) y su propio almacén (database.connection.LedgerStore). Los
+almacenes se abren a pedido y la base se carga recién con la primera
+lectura; los residentes se mantienen en un LRU acotado por cantidad y por
+memoria estimada. Al superar el límite se desalojan los menos usados que no
+estén atendiendo peticiones, persistiendo antes sus escrituras pendientes;
+un consorcio desalojado se vuelve a cargar del archivo en su próxima petición.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from database.connection import LedgerStore, default_store, use_store
+from utils.metrics import TENANT_EVICTIONS, TENANTS_RESIDENT, TENANTS_RESIDENT_BYTES
+import config
+
+
+# IDs válidos: se usan como nombre de directorio y en las rutas
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class TenantRegistry:
+    """LRU de almacenes de consorcios con límite de cantidad y de memoria"""
+
+    def __init__(self, root: str, max_tenants: int, max_bytes: int):
+        """
+        Args:
+            root (str): Directorio con un subdirectorio por consorcio
+            max_tenants (int): Cantidad máxima de almacenes abiertos
+            max_bytes (int): Memoria estimada máxima de las bases cargadas
+        """
+        self.root = root
+        self.max_tenants = max_tenants
+        self.max_bytes = max_bytes
+        self._stores: "OrderedDict[str, LedgerStore]" = OrderedDict()
+        # Memoria estimada de cada almacén al liberarlo por última vez
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_valid_id(tenant_id: str) -> bool:
+        """
+        Verificar el formato de un ID de consorcio
+
+        Args:
+            tenant_id (str): ID a verificar
+
+        Returns:
+            bool: True si son minúsculas, dígitos, "-" o "_" (hasta 64 caracteres)
+        """
+        return TENANT_ID_PATTERN.match(tenant_id) is not None
+
+    def path(self, tenant_id: str) -> str:
+        """
+        Directorio de un consorcio
+
+        Args:
+            tenant_id (str): ID del consorcio (ya validado)
+
+        Returns:
+            str: Ruta del directorio
+        """
+        return os.path.join(self.root, tenant_id)
+
+    def exists(self, tenant_id: str) -> bool:
+        """
+        Verificar si un consorcio existe
+
+        Args:
+            tenant_id (str): ID del consorcio
+
+        Returns:
+            bool: True si el ID es válido y su directorio existe
+        """
+        return self.is_valid_id(tenant_id) and os.path.isdir(self.path(tenant_id))
+
+    def create(self, tenant_id: str) -> bool:
+        """
+        Crear el directorio de un consorcio (su base empieza vacía)
+
+        Args:
+            tenant_id (str): ID del consorcio
+
+        Returns:
+            bool: True si se creó, False si ya existía
+
+        Raises:
+            ValueError: Si el ID no es válido
+        """
+        if not self.is_valid_id(tenant_id):
+            raise ValueError(f"ID de consorcio inválido: {tenant_id}")
+        try:
+            os.makedirs(self.path(tenant_id))
+        except FileExistsError:
+            return False
+        return True
+
+    def acquire(self, tenant_id: str) -> Optional[LedgerStore]:
+        """
+        Obtener el almacén de un consorcio y marcarlo en uso
+
+        No carga la base: eso ocurre con la primera lectura. Cada llamada
+        debe terminar con release().
+
+        Args:
+            tenant_id (str): ID del consorcio
+
+        Returns:
+            Optional[LedgerStore]: Almacén del consorcio, o None si no existe
+        """
+        with self._lock:
+            store = self._stores.get(tenant_id)
+            if store is None:
+                if not self.exists(tenant_id):
+                    return None
+                tenant_dir = self.path(tenant_id)
+                store = LedgerStore(
+                    tenant_id,
+                    os.path.join(tenant_dir, "database.json"),
+                    os.path.join(tenant_dir, "uploads")
+                )
+                self._stores[tenant_id] = store
+                self._sizes[tenant_id] = 0
+                TENANTS_RESIDENT.set(len(self._stores))
+            self._stores.move_to_end(tenant_id)
+            store.pins += 1
+            victims = self._select_victims()
+        self._close_later(victims)
+        return store
+
+    def release(self, store: LedgerStore) -> None:
+        """
+        Marcar que una petición terminó de usar un almacén
+
+        Actualiza la memoria estimada del consorcio (su base puede haberse
+        cargado o crecido) y desaloja los almacenes que excedan los límites.
+
+        Args:
+            store (LedgerStore): Almacén devuelto por acquire()
+        """
+        with self._lock:
+            store.pins -= 1
+            if self._stores.get(store.tenant_id) is store:
+                size = store.resident_bytes()
+                self._total_bytes += size - self._sizes[store.tenant_id]
+                self._sizes[store.tenant_id] = size
+                TENANTS_RESIDENT_BYTES.set(self._total_bytes)
+            victims = self._select_victims()
+        self._close_later(victims)
+
+    def acquire_resident(self) -> List[LedgerStore]:
+        """
+        Marcar en uso los almacenes con la base en memoria (sin cargar ninguno)
+
+        Returns:
+            List[LedgerStore]: Almacenes cargados; liberar cada uno con release()
+        """
+        with self._lock:
+            stores = [store for store in self._stores.values() if store.loaded()]
+            for store in stores:
+                store.pins += 1
+        return stores
+
+    def _select_victims(self) -> List[LedgerStore]:
+        """Quitar del LRU los almacenes que exceden los límites, empezando por el menos usado (requiere _lock)"""
+        victims = []
+        for tenant_id in list(self._stores):
+            if len(self._stores) <= self.max_tenants and self._total_bytes <= self.max_bytes:
+                break
+            store = self._stores[tenant_id]
+            if store.pins:
+                continue
+            del self._stores[tenant_id]
+            self._total_bytes -= self._sizes.pop(tenant_id)
+            victims.append(store)
+        if victims:
+            TENANTS_RESIDENT.set(len(self._stores))
+            TENANTS_RESIDENT_BYTES.set(self._total_bytes)
+            TENANT_EVICTIONS.inc(amount=len(victims))
+        return victims
+
+    def _close_later(self, victims: List[LedgerStore]) -> None:
+        """Cerrar almacenes desalojados sin demorar la petición (pueden tener escrituras pendientes)"""
+        if victims:
+            threading.Thread(
+                target=self._close, args=(victims,), name="tenant-evict", daemon=True
+            ).start()
+
+    @staticmethod
+    def _close(victims: List[LedgerStore]) -> None:
+        for store in victims:
+            try:
+                store.close()
+            except Exception as e:
+                print(f"Error desalojando el consorcio {store.tenant_id}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Estado del LRU de consorcios
+
+        Returns:
+            dict: Almacenes abiertos y cargados, memoria estimada y límites
+        """
+        with self._lock:
+            return {
+                "resident": len(self._stores),
+                "loaded": sum(1 for store in self._stores.values() if store.loaded()),
+                "in_use": sum(1 for store in self._stores.values() if store.pins),
+                "estimated_bytes": self._total_bytes,
+                "max_tenants": self.max_tenants,
+                "max_bytes": self.max_bytes
+            }
+
+
+tenant_registry = TenantRegistry(
+    config.TENANTS_DIR,
+    max_tenants=config.TENANT_CACHE_MAX,
+    max_bytes=config.TENANT_CACHE_MAX_BYTES
+)
+
+
+@contextmanager
+def tenant_scope(tenant_id: Optional[str]) -> Iterator[LedgerStore]:
+    """
+    Operar sobre la base de un consorcio dentro de un bloque
+
+    Args:
+        tenant_id (Optional[str]): ID del consorcio (None para el almacén por defecto)
+
+    Yields:
+        LedgerStore: Almacén del consorcio, en uso hasta salir del bloque
+
+    Raises:
+        LookupError: Si el consorcio no existe
+    """
+    if tenant_id is None:
+        with use_store(default_store) as store:
+            yield store
+        return
+    store = tenant_registry.acquire(tenant_id)
+    if store is None:
+        raise LookupError(f"Consorcio no encontrado: {tenant_id}")
+    try:
+        with use_store(store):
+            yield store
+    finally:
+        tenant_registry.release(store)
@@ -0,0 +1,174 @@
+"""
+Agrupamiento de escrituras concurrentes (group commit)
+
+Las mutaciones que llegan dentro de una ventana corta se persisten con una
+única escritura durable. Cada llamador espera hasta que el lote que contiene
+su cambio esté en disco.
+"""
+import atexit
+import threading
+import time
+from typing import Callable, Optional
+
+
+class _Batch:
+    """Lote de mutaciones pendientes de persistir"""
+
+    __slots__ = ("done", "error", "mutations")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.mutations = 0
+
+
+class WriteCoalescer:
+    """Agrupa escrituras en lotes y las persiste desde un hilo dedicado"""
+
+    def __init__(self, flush: Callable[[], None], window: float):
+        """
+        Args:
+            flush (Callable): Función que persiste el estado actual completo
+            window (float): Segundos a esperar para acumular mutaciones en un lote
+        """
+        self._flush = flush
+        self._window = window
+        self._cond = threading.Condition()
+        self._pending: Optional[_Batch] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._flushing = 0
+        self._flushing_mutations = 0
+        self._flush_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def mark_dirty(self) -> _Batch:
+        """
+        Registrar una mutación en el lote abierto
+
+        Debe llamarse después de aplicar la mutación en memoria.
+
+        Returns:
+            _Batch: Lote que persistirá la mutación
+        """
+        with self._cond:
+            if self._pending is None:
+                self._pending = _Batch()
+            self._pending.mutations += 1
+            if not self._closed:
+                self._ensure_thread()
+                self._cond.notify()
+            return self._pending
+
+    def wait(self, batch: _Batch) -> None:
+        """
+        Esperar a que un lote esté persistido
+
+        Args:
+            batch (_Batch): Lote devuelto por mark_dirty
+
+        Raises:
+            Exception: Si la escritura del lote falló
+        """
+        if self._closed and not batch.done.is_set():
+            # Tras el cierre (fin del proceso) el llamador persiste el lote
+            self._take_and_run()
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+
+    def pending(self) -> bool:
+        """
+        Indicar si hay mutaciones sin persistir
+
+        Returns:
+            bool: True si hay un lote abierto
+        """
+        return self._pending is not None
+
+    def flushing(self) -> bool:
+        """
+        Indicar si hay una escritura en curso
+
+        Returns:
+            bool: True si un lote se está persistiendo
+        """
+        return self._flushing > 0
+
+    def depth(self) -> int:
+        """
+        Cantidad de mutaciones que todavía no están en disco
+
+        Returns:
+            int: Mutaciones del lote abierto más las de los lotes que se están escribiendo
+        """
+        with self._cond:
+            pending = self._pending.mutations if self._pending is not None else 0
+            return pending + self._flushing_mutations
+
+    def fail_pending(self, error: BaseException) -> None:
+        """
+        Descartar el lote abierto: sus llamadores reciben el error y sus mutaciones no se persisten
+
+        Args:
+            error (BaseException): Error con que termina el lote
+        """
+        with self._cond:
+            batch = self._pending
+            self._pending = None
+        if batch is not None:
+            batch.error = error
+            batch.done.set()
+
+    def close(self) -> None:
+        """Persistir el lote pendiente, esperar la escritura en curso y detener el hilo de escritura"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._take_and_run()
+        with self._flush_lock:
+            pass
+        # Sin la referencia de atexit el coalescer (y el estado que persiste) puede liberarse
+        atexit.unregister(self.close)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._loop, name="write-coalescer", daemon=True
+            )
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            if self._window > 0:
+                time.sleep(self._window)
+            self._take_and_run()
+
+    def _take_and_run(self) -> None:
+        with self._cond:
+            batch = self._pending
+            self._pending = None
+            if batch is None:
+                return
+            self._flushing += 1
+            self._flushing_mutations += batch.mutations
+        try:
+            self._run_batch(batch)
+        finally:
+            with self._cond:
+                self._flushing -= 1
+                self._flushing_mutations -= batch.mutations
+
+    def _run_batch(self, batch: _Batch) -> None:
+        try:
+            with self._flush_lock:
+                self._flush()
+        except BaseException as e:
+            batch.error = e
+        finally:
+            batch.done.set()
@@ -2,8 +2,11 @@
 MiConsorcio Backend API
 Punto de entrada principal de la aplicación FastAPI
 """
-from pathlib import Path
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 # Importar rutas
@@ -14,6 +17,67 @@ from routes.usuario import router as usuario_router
 from routes.health import router as health_router
 from routes.auth import router as auth_router
 from routes.upload import router as upload_router
+from routes.resumen import router as resumen_router
+from routes.admin import router as admin_router
+from routes.estados_cuenta import router as estados_cuenta_router
+from database.connection import last_load_breakdown, load_database
+from services.comprobante_gc_service import ComprobanteGCService
+from services.estado_cuenta_service import EstadoCuentaService
+from services.health_service import HealthService, event_loop_monitor
+from services.image_pipeline import ImagePipeline
+from services.upload_service import UploadService
+from utils.compression_middleware import CompressionMiddleware
+from utils.metrics_middleware import MetricsMiddleware
+from utils.profiling_middleware import ProfilingMiddleware
+from utils.tenant_middleware import TenantMiddleware
+
+
+def _prepare_worker() -> Dict[str, float]:
+    """
+    Preparar el directorio de uploads, cargar la base y construir los índices
+
+    Returns:
+        Dict[str, float]: Segundos de cada etapa
+    """
+    breakdown = {}
+    start = time.perf_counter()
+    try:
+        UploadService.prepare_storage()
+        print(f"✅ Directorio de uploads configurado correctamente: {UploadService.store().root}")
+    except OSError as e:
+        print(f"❌ Error con directorio de uploads: {e}")
+    breakdown["uploads"] = time.perf_counter() - start
+
+    # La primera carga lee el JSON y reconstruye todos los índices y acumulados
+    db = load_database()
+    breakdown.update(last_load_breakdown())
+    print(
+        f"✅ Base de datos cargada: {len(db.gastos)} gastos, {len(db.pagos)} pagos, "
+        f"{len(db.participantes)} participantes"
+    )
+    return breakdown
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Preparar el worker antes de atender peticiones y liberar sus recursos al apagarlo"""
+    start = time.perf_counter()
+    # En el pool de hilos: el event loop sigue atendiendo señales mientras se carga
+    breakdown = await run_in_threadpool(_prepare_worker)
+    ComprobanteGCService.start()
+    event_loop_monitor.start()
+    total = time.perf_counter() - start
+    HealthService.mark_started(total)
+    detail = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in breakdown.items())
+    print(f"🚀 Worker listo en {total:.3f}s ({detail})")
+    try:
+        yield
+    finally:
+        ComprobanteGCService.stop()
+        event_loop_monitor.stop()
+        ImagePipeline.shutdown()
+        EstadoCuentaService.shutdown()
+
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -21,9 +85,13 @@ app = FastAPI(
     description="API REST para gestión de gastos compartidos en consorcios",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Consorcio de cada petición (prefijo /consorcios/<id> o header X-Consorcio)
+app.add_middleware(TenantMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,17 +101,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-upload_dir = Path("backend/data/uploads")
-upload_dir.mkdir(parents=True, exist_ok=True)
+# Perfilado a pedido de un administrador (X-Profile: 1 + X-Admin-Token)
+app.add_middleware(ProfilingMiddleware)
 
-# Verificar permisos de escritura
-try:
-    test_file = upload_dir / "test.txt"
-    test_file.write_text("test")
-    test_file.unlink()
-    print(f"✅ Directorio de uploads configurado correctamente: {upload_dir.absolute()}")
-except Exception as e:
-    print(f"❌ Error con directorio de uploads: {e}")
+# Compresión gzip/brotli negociada con Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
+# Métricas por petición (expuestas en /metrics)
+app.add_middleware(MetricsMiddleware)
 
 # Registrar rutas
 app.include_router(participantes_router)
@@ -53,6 +118,10 @@ app.include_router(usuario_router)
 app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(upload_router)
+app.include_router(resumen_router)
+app.include_router(admin_router)
+app.include_router(estados_cuenta_router)
+
 
 @app.get("/")
 async def root():
@@ -13,6 +13,7 @@ class Participante(BaseModel):
     telefono: str
     unidad: str
     activo: bool = True
+    version: int = 1  # Versión para control de concurrencia optimista
 
 
 class Gasto(BaseModel):
@@ -26,6 +27,7 @@ class Gasto(BaseModel):
     pagado_por: str  # ID del participante
     participantes: List[str]  # Lista de IDs de participantes que deben pagar
     creado_por: str  # ID del usuario que creó el gasto
+    version: int = 1  # Versión para control de concurrencia optimista
 
 
 class Pago(BaseModel):
@@ -38,6 +40,7 @@ class Pago(BaseModel):
     acreedor_id: str  # ID del participante que recibe
     comprobante: str  # Comprobante del pago
     creado_por: str  # ID del usuario que creó el pago
+    version: int = 1  # Versión para control de concurrencia optimista
 
 
 class UsuarioActual(BaseModel):
@@ -0,0 +1,70 @@
+"""
+Rutas de administración (requieren el header X-Admin-Token)
+"""
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from database.backup import repository_for
+from database.connection import current_store
+from database.tenants import tenant_registry
+import config
+from services.profile_service import ProfileService
+from services.profile_service import ProfiledRoute
+
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=ProfiledRoute)
+
+
+@router.get("/profiles")
+def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Listar los perfiles de peticiones guardados"""
+    ProfileService.require_admin(x_admin_token)
+    return ProfileService.list_profiles()
+
+
+@router.get("/profiles/{name}")
+def get_profile(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Descargar un perfil (.html de pyinstrument o .prof de cProfile)"""
+    ProfileService.require_admin(x_admin_token)
+    path = ProfileService.get_path(name)
+    media_type = "text/html" if name.endswith(".html") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+
+@router.get("/consorcios")
+def tenants_status(x_admin_token: Optional[str] = Header(None)):
+    """Consorcios con su almacén abierto en este worker y límites del LRU"""
+    ProfileService.require_admin(x_admin_token)
+    return tenant_registry.stats()
+
+
+@router.post("/consorcios/{tenant_id}")
+def create_tenant(tenant_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Dar de alta un consorcio (con la base vacía) en /consorcios/{tenant_id}/"""
+    ProfileService.require_admin(x_admin_token)
+    try:
+        created = tenant_registry.create(tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"id": tenant_id, "created": created}
+
+
+@router.get("/backups")
+def list_backups(x_admin_token: Optional[str] = Header(None)):
+    """Listar los respaldos del consorcio de la petición"""
+    ProfileService.require_admin(x_admin_token)
+    return repository_for(current_store().tenant_id).list()
+
+
+@router.post("/backups")
+def create_backup(x_admin_token: Optional[str] = Header(None)):
+    """Respaldar la base persistida y sus comprobantes sin detener las escrituras, aplicando la retención"""
+    ProfileService.require_admin(x_admin_token)
+    manifest = repository_for(current_store().tenant_id).create(keep=config.BACKUP_KEEP)
+    return {
+        "id": manifest["id"],
+        "comprobantes": len(manifest["comprobantes"]),
+        "missing": manifest["missing"],
+        "new_objects": manifest["new_objects"],
+        "new_bytes": manifest["new_bytes"],
+        "backups_removed": manifest["pruned"]["backups_removed"]
+    }
@@ -4,10 +4,11 @@ Rutas para autenticación
 from fastapi import APIRouter
 from models.schemas import LoginRequest, LoginResponse
 from services.auth_service import AuthService
+from services.profile_service import ProfiledRoute
 
-router = APIRouter(prefix="/auth", tags=["autenticación"])
+router = APIRouter(prefix="/auth", tags=["autenticación"], route_class=ProfiledRoute)
 
 @router.post("/login", response_model=LoginResponse)
-async def login(login_data: LoginRequest):
+def login(login_data: LoginRequest):
     """Autenticar usuario"""
     return AuthService.login(login_data)
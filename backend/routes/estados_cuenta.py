@@ -0,0 +1,20 @@
+"""
+Rutas para los estados de cuenta mensuales
+"""
+from fastapi import APIRouter
+from services.estado_cuenta_service import EstadoCuentaService
+from services.profile_service import ProfiledRoute
+
+router = APIRouter(prefix="/estados-cuenta", tags=["estados de cuenta"], route_class=ProfiledRoute)
+
+
+@router.get("/{mes}")
+async def get_resumen_mensual(mes: str, formato: str = "json"):
+    """Obtener los saldos de todas las unidades en un mes (formato json o csv)"""
+    return await EstadoCuentaService.resumen_mensual(mes, formato)
+
+
+@router.get("/{mes}/{participante_id}")
+async def get_estado_de_cuenta(mes: str, participante_id: str, formato: str = "json"):
+    """Obtener el estado de cuenta de una unidad en un mes (formato json, csv o pdf)"""
+    return await EstadoCuentaService.estado_de_cuenta(participante_id, mes, formato)
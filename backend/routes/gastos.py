@@ -1,41 +1,70 @@
 """
 Rutas para la gestión de gastos
 """
-from typing import List
-from fastapi import APIRouter
+from typing import Any, Dict, List, Optional, Union
+from fastapi import APIRouter, Header, Query, Response
 from models.schemas import Gasto, GastoCreate
 from services.gasto_service import GastoService
-from utils.helpers import generate_id
+from utils.response_cache import cached_json_response
+from utils.helpers import generate_id, format_etag, parse_embed, parse_fields, parse_if_match
+from services.profile_service import ProfiledRoute
 
-router = APIRouter(prefix="/gastos", tags=["gastos"])
+router = APIRouter(prefix="/gastos", tags=["gastos"], route_class=ProfiledRoute)
 
 
-@router.get("/", response_model=List[Gasto])
-async def get_gastos():
-    """Obtener todos los gastos"""
-    return GastoService.get_all()
+@router.get("/", response_model=Union[List[Dict[str, Any]], Dict[str, Any]])
+async def get_gastos(fields: Optional[str] = None, embed: Optional[str] = None):
+    """Obtener todos los gastos (fields= elige los campos; embed=participantes agrega nombre y unidad)"""
+    campos = parse_fields(fields, GastoService.FIELDS)
+    relaciones = parse_embed(embed, GastoService.EMBEDS)
+    if campos is None and not relaciones:
+        return await cached_json_response("gastos", GastoService.get_all_dicts)
+    return await cached_json_response(
+        ("gastos", campos, relaciones),
+        lambda: GastoService.get_list(campos, relaciones)
+    )
+
+
+@router.get("/search", response_model=List[Gasto])
+async def search_gastos(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Buscar gastos por descripción y categoría (sin acentos, admite prefijos)"""
+    return GastoService.search(q, limit)
 
 
 @router.post("/", response_model=Gasto)
-async def create_gasto(gasto: GastoCreate):
+def create_gasto(gasto: GastoCreate, response: Response):
     """Crear un nuevo gasto"""
     gasto_id = generate_id()
-    return GastoService.create(gasto, gasto_id)
+    creado = GastoService.create(gasto, gasto_id)
+    response.headers["ETag"] = format_etag(creado.version)
+    return creado
 
 
 @router.get("/{gasto_id}", response_model=Gasto)
-async def get_gasto(gasto_id: str):
+async def get_gasto(gasto_id: str, response: Response):
     """Obtener un gasto por ID"""
-    return GastoService.get_by_id(gasto_id)
+    encontrado = GastoService.get_by_id(gasto_id)
+    response.headers["ETag"] = format_etag(encontrado.version)
+    return encontrado
 
 
 @router.put("/{gasto_id}", response_model=Gasto)
-async def update_gasto(gasto_id: str, gasto: Gasto):
-    """Actualizar un gasto"""
-    return GastoService.update(gasto_id, gasto)
+def update_gasto(
+    gasto_id: str,
+    gasto: Gasto,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """Actualizar un gasto (If-Match con el ETag para evitar sobrescribir cambios ajenos)"""
+    actualizado = GastoService.update(gasto_id, gasto, parse_if_match(if_match))
+    response.headers["ETag"] = format_etag(actualizado.version)
+    return actualizado
 
 
 @router.delete("/{gasto_id}")
-async def delete_gasto(gasto_id: str):
-    """Eliminar un gasto"""
-    return GastoService.delete(gasto_id)
+def delete_gasto(gasto_id: str, if_match: Optional[str] = Header(None)):
+    """Eliminar un gasto (If-Match con el ETag para evitar borrar cambios ajenos)"""
+    return GastoService.delete(gasto_id, parse_if_match(if_match))
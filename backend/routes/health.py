@@ -2,11 +2,34 @@
 Rutas para utilidades y estado del sistema
 """
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from services.health_service import HealthService
+from utils.metrics import render_metrics
+from services.profile_service import ProfiledRoute
 
-router = APIRouter(tags=["health"])
+router = APIRouter(tags=["health"], route_class=ProfiledRoute)
 
 
 @router.get("/health")
 async def health_check():
     """Verificar que el servidor esté funcionando"""
     return {"status": "ok", "message": "Servidor funcionando correctamente"}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """
+    Verificar que el worker puede atender peticiones
+
+    Informa el atraso del event loop, la latencia del almacenamiento, el
+    tamaño de la base, la cola de escrituras y el directorio de
+    comprobantes. Responde 503 si algún chequeo supera su umbral.
+    """
+    report = await HealthService.readiness()
+    return JSONResponse(report, status_code=200 if report["status"] == "ok" else 503)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas del worker en formato de texto de Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
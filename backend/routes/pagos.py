@@ -1,41 +1,61 @@
 """
 Rutas para la gestión de pagos
 """
-from typing import List
-from fastapi import APIRouter
+from typing import Any, Dict, List, Optional, Union
+from fastapi import APIRouter, Header, Response
 from models.schemas import Pago, PagoCreate
 from services.pago_service import PagoService
-from utils.helpers import generate_id
+from utils.response_cache import cached_json_response
+from utils.helpers import generate_id, format_etag, parse_embed, parse_fields, parse_if_match
+from services.profile_service import ProfiledRoute
 
-router = APIRouter(prefix="/pagos", tags=["pagos"])
+router = APIRouter(prefix="/pagos", tags=["pagos"], route_class=ProfiledRoute)
 
 
-@router.get("/", response_model=List[Pago])
-async def get_pagos():
-    """Obtener todos los pagos"""
-    return PagoService.get_all()
+@router.get("/", response_model=Union[List[Dict[str, Any]], Dict[str, Any]])
+async def get_pagos(fields: Optional[str] = None, embed: Optional[str] = None):
+    """Obtener todos los pagos (fields= elige los campos; embed=participantes agrega nombre y unidad)"""
+    campos = parse_fields(fields, PagoService.FIELDS)
+    relaciones = parse_embed(embed, PagoService.EMBEDS)
+    if campos is None and not relaciones:
+        return await cached_json_response("pagos", PagoService.get_all_dicts)
+    return await cached_json_response(
+        ("pagos", campos, relaciones),
+        lambda: PagoService.get_list(campos, relaciones)
+    )
 
 
 @router.post("/", response_model=Pago)
-async def create_pago(pago: PagoCreate):
+def create_pago(pago: PagoCreate, response: Response):
     """Crear un nuevo pago"""
     pago_id = generate_id()
-    return PagoService.create(pago, pago_id)
+    creado = PagoService.create(pago, pago_id)
+    response.headers["ETag"] = format_etag(creado.version)
+    return creado
 
 
 @router.get("/{pago_id}", response_model=Pago)
-async def get_pago(pago_id: str):
+async def get_pago(pago_id: str, response: Response):
     """Obtener un pago por ID"""
-    return PagoService.get_by_id(pago_id)
+    encontrado = PagoService.get_by_id(pago_id)
+    response.headers["ETag"] = format_etag(encontrado.version)
+    return encontrado
 
 
 @router.put("/{pago_id}", response_model=Pago)
-async def update_pago(pago_id: str, pago: Pago):
-    """Actualizar un pago"""
-    return PagoService.update(pago_id, pago)
+def update_pago(
+    pago_id: str,
+    pago: Pago,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """Actualizar un pago (If-Match con el ETag para evitar sobrescribir cambios ajenos)"""
+    actualizado = PagoService.update(pago_id, pago, parse_if_match(if_match))
+    response.headers["ETag"] = format_etag(actualizado.version)
+    return actualizado
 
 
 @router.delete("/{pago_id}")
-async def delete_pago(pago_id: str):
-    """Eliminar un pago"""
-    return PagoService.delete(pago_id)
+def delete_pago(pago_id: str, if_match: Optional[str] = Header(None)):
+    """Eliminar un pago (If-Match con el ETag para evitar borrar cambios ajenos)"""
+    return PagoService.delete(pago_id, parse_if_match(if_match))
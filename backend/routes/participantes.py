@@ -1,41 +1,54 @@
 """
 Rutas para la gestión de participantes
 """
-from typing import List
-from fastapi import APIRouter
+from typing import List, Optional
+from fastapi import APIRouter, Header, Response
 from models.schemas import Participante, ParticipanteCreate
 from services.participante_service import ParticipanteService
-from utils.helpers import generate_id
+from utils.response_cache import cached_json_response
+from utils.helpers import generate_id, format_etag, parse_if_match
+from services.profile_service import ProfiledRoute
 
-router = APIRouter(prefix="/participantes", tags=["participantes"])
+router = APIRouter(prefix="/participantes", tags=["participantes"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=List[Participante])
 async def get_participantes():
     """Obtener todos los participantes"""
-    return ParticipanteService.get_all()
+    return await cached_json_response("participantes", ParticipanteService.get_all_dicts)
 
 
 @router.post("/", response_model=Participante)
-async def create_participante(participante: ParticipanteCreate):
+def create_participante(participante: ParticipanteCreate, response: Response):
     """Crear un nuevo participante"""
     participante_id = generate_id()
-    return ParticipanteService.create(participante, participante_id)
+    creado = ParticipanteService.create(participante, participante_id)
+    response.headers["ETag"] = format_etag(creado.version)
+    return creado
 
 
 @router.get("/{participante_id}", response_model=Participante)
-async def get_participante(participante_id: str):
+async def get_participante(participante_id: str, response: Response):
     """Obtener un participante por ID"""
-    return ParticipanteService.get_by_id(participante_id)
+    encontrado = ParticipanteService.get_by_id(participante_id)
+    response.headers["ETag"] = format_etag(encontrado.version)
+    return encontrado
 
 
 @router.put("/{participante_id}", response_model=Participante)
-async def update_participante(participante_id: str, participante: Participante):
-    """Actualizar un participante"""
-    return ParticipanteService.update(participante_id, participante)
+def update_participante(
+    participante_id: str,
+    participante: Participante,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """Actualizar un participante (If-Match con el ETag para evitar sobrescribir cambios ajenos)"""
+    actualizado = ParticipanteService.update(participante_id, participante, parse_if_match(if_match))
+    response.headers["ETag"] = format_etag(actualizado.version)
+    return actualizado
 
 
 @router.delete("/{participante_id}")
-async def delete_participante(participante_id: str):
-    """Eliminar un participante"""
-    return ParticipanteService.delete(participante_id)
+def delete_participante(participante_id: str, if_match: Optional[str] = Header(None)):
+    """Eliminar un participante (If-Match con el ETag para evitar borrar cambios ajenos)"""
+    return ParticipanteService.delete(participante_id, parse_if_match(if_match))
@@ -0,0 +1,21 @@
+"""
+Rutas para los resúmenes de gastos y pagos
+"""
+from typing import Optional
+from fastapi import APIRouter
+from services.resumen_service import ResumenService
+from services.profile_service import ProfiledRoute
+
+router = APIRouter(prefix="/resumen", tags=["resumen"], route_class=ProfiledRoute)
+
+
+@router.get("/gastos")
+def get_resumen_gastos(desde: Optional[str] = None, hasta: Optional[str] = None):
+    """Totales de gastos por mes, categoría y pagador (fechas YYYY-MM-DD inclusive)"""
+    return ResumenService.gastos(desde, hasta)
+
+
+@router.get("/pagos")
+def get_resumen_pagos(desde: Optional[str] = None, hasta: Optional[str] = None):
+    """Totales de pagos por mes, deudor y acreedor (fechas YYYY-MM-DD inclusive)"""
+    return ResumenService.pagos(desde, hasta)
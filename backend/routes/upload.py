@@ -1,26 +1,84 @@
 """
 Rutas para subir archivos
 """
-from fastapi import APIRouter, File, UploadFile
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, Header, Request
+from database.comprobante_store import ComprobanteStore
+from services.comprobante_gc_service import ComprobanteGCService
 from services.upload_service import UploadService
+from utils.file_response import RangeFileResponse
+from services.profile_service import ProfiledRoute, ProfileService
 
-router = APIRouter(prefix="/upload", tags=["archivos"])
+router = APIRouter(prefix="/upload", tags=["archivos"], route_class=ProfiledRoute)
 
 
-@router.post("/comprobante")
-async def upload_comprobante(file: UploadFile = File(...)):
+# El cuerpo se lee en streaming en el servicio (sin File(...), que haría que
+# Starlette bufferice el formulario completo antes de llamar al handler)
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "properties": {"file": {"type": "string", "format": "binary"}},
+                "required": ["file"]
+            }
+        }
+    }
+}
+
+
+@router.post("/comprobante", openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_comprobante(request: Request):
     """Subir archivo de comprobante"""
-    return await UploadService.save_comprobante(file)
+    return await UploadService.save_comprobante(request)
+
+
+@router.post("/gc")
+def collect_comprobantes(dry_run: bool = True, x_admin_token: Optional[str] = Header(None)):
+    """
+    Eliminar comprobantes que ningún gasto ni pago referencia
+
+    Por defecto solo informa los candidatos (dry_run=true); para eliminar
+    se requiere el token de administración (X-Admin-Token).
+    """
+    if not dry_run:
+        ProfileService.require_admin(x_admin_token)
+    return ComprobanteGCService.sweep(dry_run=dry_run)
 
 
 @router.get("/comprobante/{filename}")
-async def get_comprobante(filename: str):
-    """Descargar archivo de comprobante"""
+@router.head("/comprobante/{filename}")
+async def get_comprobante(filename: str, variant: Optional[str] = None):
+    """
+    Descargar archivo de comprobante (admite Range y validación con ETag)
+
+    Con variant=thumb|display se sirve la versión reducida de una imagen;
+    mientras no se haya generado se sirve el original.
+    """
+    # Los nombres direccionados por contenido identifican bytes inmutables
+    digest = ComprobanteStore.parse_name(filename)
+
+    if variant is not None:
+        variant_file = UploadService.get_variant_path(filename, variant)
+        if variant_file is not None:
+            return RangeFileResponse(
+                variant_file,
+                filename=f"{digest}.{variant}.jpg",
+                media_type="image/jpeg",
+                etag=f"{digest}.{variant}",
+                immutable=True
+            )
+        # El original se sirve sin "immutable": la URL cambiará de contenido
+        immutable = False
+    else:
+        immutable = digest is not None
+
     file_path = UploadService.get_comprobante_path(filename)
 
-    return FileResponse(
+    return RangeFileResponse(
         file_path,
         filename=filename,
-        headers={"Content-Disposition": f"inline; filename={filename}"}
+        etag=digest,
+        immutable=immutable
     )
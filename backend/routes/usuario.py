@@ -4,8 +4,9 @@ Rutas para la gestión del usuario actual
 from fastapi import APIRouter
 from models.schemas import UsuarioActual, UsuarioActualUpdate
 from services.usuario_service import UsuarioService
+from services.profile_service import ProfiledRoute
 
-router = APIRouter(prefix="/usuario-actual", tags=["usuario"])
+router = APIRouter(prefix="/usuario-actual", tags=["usuario"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=UsuarioActual)
@@ -15,6 +16,6 @@ async def get_usuario_actual():
 
 
 @router.put("/", response_model=UsuarioActual)
-async def update_usuario_actual(usuario: UsuarioActualUpdate):
+def update_usuario_actual(usuario: UsuarioActualUpdate):
     """Actualizar el usuario actual"""
     return UsuarioService.update(usuario)
@@ -1,14 +1,43 @@
 #!/usr/bin/env python3
 """
 Script para ejecutar el servidor FastAPI
+
+Desarrollo (un proceso, recarga automática):
+    python run.py
+
+Producción (varios workers, sin recarga):
+    python run.py --workers 4
 """
+import argparse
+import os
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,  # Recarga automática en desarrollo
-        log_level="info"
+    parser = argparse.ArgumentParser(description="Ejecutar el servidor de MiConsorcio")
+    parser.add_argument("--host", default="0.0.0.0", help="Dirección de escucha")
+    parser.add_argument("--port", type=int, default=8000, help="Puerto de escucha")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("MICONSORCIO_WORKERS", "0")),
+        help="Cantidad de procesos worker (modo producción, sin recarga)"
     )
+    args = parser.parse_args()
+
+    if args.workers > 0:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            reload=False,
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,  # Recarga automática en desarrollo
+            log_level="info"
+        )
@@ -6,8 +6,9 @@ from typing import Optional
 from datetime import datetime
 from fastapi import HTTPException
 from models.schemas import Usuario, LoginRequest, LoginResponse
-from database.connection import load_database, save_database
+from database.connection import load_database, transaction
 from services.participante_service import ParticipanteService
+from utils.metrics import PASSWORD_VERIFY_DURATION
 
 
 class AuthService:
@@ -25,7 +26,8 @@ class AuthService:
         Returns:
             bool: True si la contraseña es correcta
         """
-        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        with PASSWORD_VERIFY_DURATION.time():
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
     @staticmethod
     def login(login_data: LoginRequest) -> LoginResponse:
@@ -73,10 +75,10 @@ class AuthService:
             )
 
         # Buscar índice del usuario para actualizar
-        usuario_index = next((i for i, u in enumerate(db.usuarios) if u.id == usuario.id), None)
-        if usuario_index is not None:
-            db.usuarios[usuario_index] = usuario
-            save_database(db)
+        with transaction() as db:
+            usuario_index = next((i for i, u in enumerate(db.usuarios) if u.id == usuario.id), None)
+            if usuario_index is not None:
+                db.usuarios[usuario_index] = usuario
 
         return LoginResponse(
             success=True,
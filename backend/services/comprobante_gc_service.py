@@ -0,0 +1,181 @@
+"""
+Servicio de recolección de comprobantes huérfanos
+
+Elimina los archivos subidos que ningún gasto ni pago referencia, una vez
+transcurrido un período de gracia desde su última subida (para no borrar
+un comprobante recién subido cuyo gasto todavía no se creó). El barrido
+es incremental: cada pasada recorre unas pocas particiones del almacén.
+El barrido en segundo plano recorre el almacén por defecto y los de los
+consorcios con la base en memoria; los demás se barren cuando se cargan.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from database.connection import LedgerStore, current_store, default_store, exclusive, load_database, use_store
+from database.reference_index import reference_index
+from database.tenants import tenant_registry
+from services.upload_service import UploadService
+import config
+
+
+class ComprobanteGCService:
+    """Servicio para eliminar comprobantes sin referencias"""
+
+    # Próxima partición a barrer de cada consorcio (None para el almacén por defecto)
+    _cursors: Dict[Optional[str], int] = {}
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _sweep_lock = threading.Lock()
+
+    @staticmethod
+    def sweep(dry_run: bool = True, max_shards: Optional[int] = None) -> dict:
+        """
+        Barrer el almacén de comprobantes del consorcio en curso
+
+        Args:
+            dry_run (bool): Solo informar los candidatos, sin eliminar
+            max_shards (Optional[int]): Particiones a recorrer desde el cursor
+                (None para recorrer todo el almacén)
+
+        Returns:
+            dict: Reporte con candidatos, eliminados y bytes liberados
+        """
+        store = UploadService.store()
+        prefixes = store.shard_prefixes()
+        tenant_id = current_store().tenant_id
+
+        with ComprobanteGCService._sweep_lock:
+            if max_shards is None:
+                selected = prefixes
+                include_root = True
+            else:
+                start = ComprobanteGCService._cursors.get(tenant_id, 0)
+                selected = [prefixes[(start + i) % len(prefixes)] for i in range(max_shards)]
+                include_root = start == 0
+                ComprobanteGCService._cursors[tenant_id] = (start + max_shards) % len(prefixes)
+
+            return ComprobanteGCService._sweep(selected, include_root, dry_run)
+
+    @staticmethod
+    def _sweep(prefixes: List[str], include_root: bool, dry_run: bool) -> dict:
+        store = UploadService.store()
+        grace = config.GC_GRACE_SECONDS
+        now = time.time()
+
+        # Sincronizar el índice de referencias con escrituras de otros workers (para
+        # elegir candidatos; cada eliminación se vuelve a verificar bajo el lock)
+        load_database()
+
+        report = {
+            "dry_run": dry_run,
+            "grace_seconds": grace,
+            "scanned": 0,
+            "candidates": [],
+            "deleted": 0,
+            "bytes_freed": 0
+        }
+
+        def candidate(filename: str, size: int, age: float) -> None:
+            report["candidates"].append({
+                "filename": filename,
+                "size": size,
+                "age_seconds": int(age)
+            })
+
+        for prefix in prefixes:
+            for digest in store.iter_shard(prefix):
+                report["scanned"] += 1
+                if reference_index.is_referenced(digest):
+                    continue
+                age = now - store.last_used(digest)
+                if age < grace:
+                    continue
+                metadata = store.get_metadata(digest) or {}
+                size = metadata.get("size", 0)
+                candidate(store.public_name(digest, metadata.get("original_name", "")), size, age)
+                if not dry_run:
+                    # Otro worker pudo haberlo referenciado después de la sincronización:
+                    # se vuelve a verificar con el lock de escritura tomado
+                    with exclusive():
+                        freed = store.remove(
+                            digest,
+                            lambda: (not reference_index.is_referenced(digest)
+                                     and time.time() - store.last_used(digest) >= grace)
+                        )
+                    if freed:
+                        report["deleted"] += 1
+                        report["bytes_freed"] += freed
+
+        if include_root:
+            # Archivos del esquema anterior y temporales de uploads abandonados
+            for path in list(store.iter_legacy()) + list(store.iter_temp()):
+                report["scanned"] += 1
+                is_temp = path.parent == store.tmp_dir
+                if not is_temp and reference_index.is_referenced(path.name):
+                    continue
+                try:
+                    stat_result = path.stat()
+                except FileNotFoundError:
+                    continue
+                age = now - stat_result.st_mtime
+                if age < grace:
+                    continue
+                candidate(path.name, stat_result.st_size, age)
+                if not dry_run:
+                    with exclusive():
+                        if not is_temp and reference_index.is_referenced(path.name):
+                            continue
+                        try:
+                            os.unlink(path)
+                        except FileNotFoundError:
+                            continue
+                    report["deleted"] += 1
+                    report["bytes_freed"] += stat_result.st_size
+
+        return report
+
+    @staticmethod
+    def start() -> None:
+        """Iniciar el barrido incremental en segundo plano"""
+        if config.GC_INTERVAL_SECONDS <= 0:
+            return
+        if ComprobanteGCService._thread is not None and ComprobanteGCService._thread.is_alive():
+            return
+        ComprobanteGCService._stop.clear()
+        ComprobanteGCService._thread = threading.Thread(
+            target=ComprobanteGCService._run, name="comprobante-gc", daemon=True
+        )
+        ComprobanteGCService._thread.start()
+
+    @staticmethod
+    def stop() -> None:
+        """Detener el barrido en segundo plano"""
+        ComprobanteGCService._stop.set()
+
+    @staticmethod
+    def _run() -> None:
+        while not ComprobanteGCService._stop.wait(config.GC_INTERVAL_SECONDS):
+            ComprobanteGCService._tick(default_store)
+            for store in tenant_registry.acquire_resident():
+                try:
+                    ComprobanteGCService._tick(store)
+                finally:
+                    tenant_registry.release(store)
+
+    @staticmethod
+    def _tick(store: LedgerStore) -> None:
+        """Barrer unas pocas particiones del almacén de un consorcio"""
+        try:
+            with use_store(store):
+                report = ComprobanteGCService.sweep(
+                    dry_run=False, max_shards=config.GC_SHARDS_PER_TICK
+                )
+            if report["deleted"]:
+                consorcio = f" del consorcio {store.tenant_id}" if store.tenant_id else ""
+                print(
+                    f"🧹 Comprobantes huérfanos eliminados{consorcio}: {report['deleted']} "
+                    f"({report['bytes_freed']} bytes)"
+                )
+        except Exception as e:
+            print(f"Error en el recolector de comprobantes: {e}")
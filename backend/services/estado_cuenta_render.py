@@ -0,0 +1,206 @@
+"""
+Armado y formato de los estados de cuenta (se ejecuta en un pool de procesos)
+
+Las funciones reciben solo datos simples (los movimientos del mes ya
+filtrados y los saldos iniciales, con montos en centavos enteros) y
+devuelven el documento serializado, de
+modo que el trabajo de CPU no ocupa el event loop ni el GIL del worker.
+Este módulo no importa la aplicación: los procesos del pool lo cargan sin
+inicializar la base ni FastAPI.
+
+El PDF requiere reportlab (opcional).
+"""
+import csv
+import importlib.util
+import io
+import json
+from typing import List
+
+
+# Formatos de salida y su tipo MIME
+FORMATOS = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+_COLUMNAS_MOVIMIENTOS = ("fecha", "tipo", "id", "descripcion", "categoria", "monto_total", "debe", "haber", "saldo")
+_COLUMNAS_RESUMEN = (
+    "unidad", "nombre", "participante_id", "saldo_inicial", "gastos_pagados",
+    "parte_gastos", "pagos_realizados", "pagos_recibidos", "saldo_final"
+)
+
+
+def pdf_disponible() -> bool:
+    """
+    Indicar si se pueden generar PDF
+
+    Returns:
+        bool: True si reportlab está instalado
+    """
+    return importlib.util.find_spec("reportlab") is not None
+
+
+def _dinero(centavos: int) -> float:
+    # Los montos se acumulan en centavos: se convierten solo al armar el documento
+    return centavos / 100
+
+
+def armar_estado(entrada: dict) -> dict:
+    """
+    Calcular el estado de cuenta de una unidad en un mes
+
+    Args:
+        entrada (dict): "participante", "mes", "saldo_inicial" y los
+            movimientos: "gastos" como (fecha, id, descripcion, categoria,
+            monto, pagado por la unidad, parte de la unidad) y "pagos" como
+            (fecha, id, descripcion, monto, realizado), todo en centavos
+
+    Returns:
+        dict: Saldo inicial, movimientos con saldo parcial, totales y saldo final
+    """
+    movimientos = []
+    totales = {"gastos_pagados": 0, "parte_gastos": 0, "pagos_realizados": 0, "pagos_recibidos": 0}
+    for fecha, gasto_id, descripcion, categoria, monto, haber, debe in entrada["gastos"]:
+        totales["gastos_pagados"] += haber
+        totales["parte_gastos"] += debe
+        movimientos.append((fecha, "gasto", gasto_id, descripcion, categoria, monto, debe, haber))
+    for fecha, pago_id, descripcion, monto, realizado in entrada["pagos"]:
+        if realizado:
+            totales["pagos_realizados"] += monto
+            movimientos.append((fecha, "pago_realizado", pago_id, descripcion, "", monto, 0, monto))
+        else:
+            totales["pagos_recibidos"] += monto
+            movimientos.append((fecha, "pago_recibido", pago_id, descripcion, "", monto, monto, 0))
+    movimientos.sort(key=lambda m: (m[0], m[2]))
+
+    saldo = entrada["saldo_inicial"]
+    filas = []
+    for fecha, tipo, entidad_id, descripcion, categoria, monto, debe, haber in movimientos:
+        saldo += haber - debe
+        filas.append({
+            "fecha": fecha,
+            "tipo": tipo,
+            "id": entidad_id,
+            "descripcion": descripcion,
+            "categoria": categoria,
+            "monto_total": _dinero(monto),
+            "debe": _dinero(debe),
+            "haber": _dinero(haber),
+            "saldo": _dinero(saldo)
+        })
+    return {
+        "participante": entrada["participante"],
+        "mes": entrada["mes"],
+        "saldo_inicial": _dinero(entrada["saldo_inicial"]),
+        "movimientos": filas,
+        "totales": {nombre: _dinero(valor) for nombre, valor in totales.items()},
+        "saldo_final": _dinero(saldo)
+    }
+
+
+def _json(datos) -> bytes:
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _csv(columnas, filas: List[dict]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columnas, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(filas)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _pdf_estado(estado: dict) -> bytes:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    estilos = getSampleStyleSheet()
+    participante = estado["participante"]
+    tabla = [["Fecha", "Concepto", "Debe", "Haber", "Saldo"]]
+    tabla.append(["", "Saldo inicial", "", "", f"{estado['saldo_inicial']:.2f}"])
+    for fila in estado["movimientos"]:
+        tabla.append([
+            fila["fecha"],
+            Paragraph(fila["descripcion"] or fila["tipo"], estilos["BodyText"]),
+            f"{fila['debe']:.2f}" if fila["debe"] else "",
+            f"{fila['haber']:.2f}" if fila["haber"] else "",
+            f"{fila['saldo']:.2f}"
+        ])
+    tabla.append(["", "Saldo final", "", "", f"{estado['saldo_final']:.2f}"])
+
+    grilla = Table(tabla, colWidths=(70, 245, 60, 60, 65), repeatRows=1)
+    grilla.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.black),
+        ("ALIGN", (2, 0), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+    ]))
+    buffer = io.BytesIO()
+    documento = SimpleDocTemplate(buffer, pagesize=A4, title=f"Estado de cuenta {estado['mes']}")
+    documento.build([
+        Paragraph(f"Estado de cuenta {estado['mes']}", estilos["Title"]),
+        Paragraph(f"Unidad {participante['unidad']} - {participante['nombre']}", estilos["Heading2"]),
+        Spacer(1, 12),
+        grilla
+    ])
+    return buffer.getvalue()
+
+
+def generar_estado(entrada: dict, formato: str) -> bytes:
+    """
+    Armar y serializar el estado de cuenta de una unidad
+
+    Args:
+        entrada (dict): Datos del mes (ver armar_estado)
+        formato (str): "json", "csv" o "pdf"
+
+    Returns:
+        bytes: Documento en el formato pedido
+    """
+    estado = armar_estado(entrada)
+    if formato == "csv":
+        filas = [{"fecha": "", "tipo": "saldo_inicial", "saldo": estado["saldo_inicial"]}]
+        filas.extend(estado["movimientos"])
+        filas.append({"fecha": "", "tipo": "saldo_final", "saldo": estado["saldo_final"]})
+        return _csv(_COLUMNAS_MOVIMIENTOS, filas)
+    if formato == "pdf":
+        return _pdf_estado(estado)
+    return _json(estado)
+
+
+def generar_resumen(entrada: dict, formato: str) -> bytes:
+    """
+    Armar y serializar los saldos de todas las unidades en un mes
+
+    Args:
+        entrada (dict): "mes" y "unidades", cada una con "participante",
+            "saldo_inicial" y sus cuatro totales del mes (en centavos)
+        formato (str): "json" o "csv"
+
+    Returns:
+        bytes: Documento en el formato pedido
+    """
+    filas = []
+    for unidad in entrada["unidades"]:
+        participante = unidad["participante"]
+        saldo_final = (unidad["saldo_inicial"] + unidad["gastos_pagados"] - unidad["parte_gastos"]
+                       + unidad["pagos_realizados"] - unidad["pagos_recibidos"])
+        filas.append({
+            "unidad": participante["unidad"],
+            "nombre": participante["nombre"],
+            "participante_id": participante["id"],
+            "saldo_inicial": _dinero(unidad["saldo_inicial"]),
+            "gastos_pagados": _dinero(unidad["gastos_pagados"]),
+            "parte_gastos": _dinero(unidad["parte_gastos"]),
+            "pagos_realizados": _dinero(unidad["pagos_realizados"]),
+            "pagos_recibidos": _dinero(unidad["pagos_recibidos"]),
+            "saldo_final": _dinero(saldo_final)
+        })
+    filas.sort(key=lambda fila: (fila["unidad"], fila["nombre"]))
+    if formato == "csv":
+        return _csv(_COLUMNAS_RESUMEN, filas)
+    return _json({"mes": entrada["mes"], "unidades": filas})
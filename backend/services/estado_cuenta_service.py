@@ -0,0 +1,210 @@
+"""
+Servicio de estados de cuenta mensuales por unidad
+
+Los movimientos del mes y los saldos iniciales salen del índice mensual
+(database.monthly_index) y el documento se arma en un pool de procesos
+(services.estado_cuenta_render). Los documentos generados quedan guardados
+por unidad, mes y formato con la versión de los meses hasta el pedido: una
+modificación en un mes posterior no invalida los estados ya generados.
+"""
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+from fastapi import HTTPException, Response
+from database.connection import load_database
+from database.monthly_index import (
+    GASTOS_PAGADOS, PAGOS_REALIZADOS, PAGOS_RECIBIDOS, PARTE_GASTOS, monthly_index, parte_de
+)
+from database.columnar import a_centavos
+from database.records import participant_ids
+from services.estado_cuenta_render import FORMATOS, generar_estado, generar_resumen, pdf_disponible
+from utils.response_cache import ResponseCache
+import config
+
+
+MES_PATTERN = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+
+statement_cache = ResponseCache(
+    max_entries=config.STATEMENT_CACHE_ENTRIES,
+    max_bytes=config.STATEMENT_CACHE_MAX_BYTES
+)
+
+
+def _participante_dict(participante) -> dict:
+    return {"id": participante.id, "nombre": participante.nombre, "unidad": participante.unidad}
+
+
+class EstadoCuentaService:
+    """Servicio para generar estados de cuenta"""
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def parse_mes(mes: str) -> int:
+        """
+        Validar y codificar un mes "YYYY-MM"
+
+        Args:
+            mes (str): Mes pedido
+
+        Returns:
+            int: Mes como año*12+mes-1
+
+        Raises:
+            HTTPException: Si el mes no tiene el formato esperado
+        """
+        match = MES_PATTERN.match(mes)
+        if not match:
+            raise HTTPException(status_code=400, detail="El mes debe tener el formato YYYY-MM")
+        return int(match.group(1)) * 12 + int(match.group(2)) - 1
+
+    @staticmethod
+    def _check_formato(formato: str, permitidos: tuple) -> None:
+        if formato not in permitidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Formato inválido. Formatos permitidos: {', '.join(permitidos)}"
+            )
+        if formato == "pdf" and not pdf_disponible():
+            raise HTTPException(status_code=501, detail="La generación de PDF no está disponible (falta reportlab)")
+
+    @staticmethod
+    def _render(funcion: Callable[[dict, str], bytes], entrada: dict, formato: str) -> bytes:
+        """Generar el documento en el pool de procesos (o en el hilo actual si no hay workers)"""
+        if config.STATEMENT_WORKERS <= 0:
+            return funcion(entrada, formato)
+        with EstadoCuentaService._lock:
+            if EstadoCuentaService._executor is None:
+                EstadoCuentaService._executor = ProcessPoolExecutor(
+                    max_workers=config.STATEMENT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            future = EstadoCuentaService._executor.submit(funcion, entrada, formato)
+        return future.result()
+
+    @staticmethod
+    def _version_hasta(mes: int) -> int:
+        with monthly_index.lock:
+            return monthly_index.version_hasta(mes)
+
+    @staticmethod
+    def _response(body: bytes, formato: str, nombre: str) -> Response:
+        headers = {}
+        if formato != "json":
+            headers["Content-Disposition"] = f'attachment; filename="{nombre}.{formato}"'
+        return Response(content=body, media_type=FORMATOS[formato], headers=headers)
+
+    @staticmethod
+    async def estado_de_cuenta(participante_id: str, mes: str, formato: str = "json") -> Response:
+        """
+        Estado de cuenta de una unidad en un mes
+
+        Args:
+            participante_id (str): ID del participante
+            mes (str): Mes "YYYY-MM"
+            formato (str): "json", "csv" o "pdf"
+
+        Returns:
+            Response: Documento con saldo inicial, movimientos del mes y saldo final
+
+        Raises:
+            HTTPException: Si el mes o el formato no son válidos, o no existe el participante
+        """
+        codigo_mes = EstadoCuentaService.parse_mes(mes)
+        EstadoCuentaService._check_formato(formato, ("json", "csv", "pdf"))
+        db = load_database()
+        participante = next((p for p in db.participantes if p.id == participante_id), None)
+        if participante is None:
+            raise HTTPException(status_code=404, detail="Participante no encontrado")
+        datos = _participante_dict(participante)
+
+        def compute() -> bytes:
+            code = participant_ids.lookup(participante_id)
+            with monthly_index.lock:
+                gastos, pagos = monthly_index.registros(codigo_mes)
+                saldo_inicial = monthly_index.saldos_iniciales(codigo_mes).get(code, 0)
+            # Solo los movimientos de la unidad viajan al proceso que arma el documento
+            # (montos en centavos, como en el índice mensual)
+            entrada = {
+                "participante": datos,
+                "mes": mes,
+                "saldo_inicial": saldo_inicial,
+                "gastos": [
+                    (g.fecha, g.id, g.descripcion, g.categoria, a_centavos(g.monto),
+                     a_centavos(g.monto) if g.pagado_por_code == code else 0, parte_de(g, code))
+                    for g in gastos
+                    if g.pagado_por_code == code or code in g.participante_codes
+                ],
+                "pagos": [
+                    (p.fecha, p.id, p.descripcion, a_centavos(p.monto), p.deudor_code == code)
+                    for p in pagos
+                    if p.deudor_code == code or p.acreedor_code == code
+                ]
+            }
+            return EstadoCuentaService._render(generar_estado, entrada, formato)
+
+        body = await statement_cache.get_or_compute(
+            ("estado", participante_id, participante.version, mes, formato),
+            compute,
+            version_of=lambda: EstadoCuentaService._version_hasta(codigo_mes)
+        )
+        return EstadoCuentaService._response(body, formato, f"estado-{mes}-{participante_id}")
+
+    @staticmethod
+    async def resumen_mensual(mes: str, formato: str = "json") -> Response:
+        """
+        Saldos de todas las unidades en un mes
+
+        Args:
+            mes (str): Mes "YYYY-MM"
+            formato (str): "json" o "csv"
+
+        Returns:
+            Response: Saldo inicial, totales del mes y saldo final de cada unidad
+
+        Raises:
+            HTTPException: Si el mes o el formato no son válidos
+        """
+        codigo_mes = EstadoCuentaService.parse_mes(mes)
+        EstadoCuentaService._check_formato(formato, ("json", "csv"))
+        db = load_database()
+        participantes = [_participante_dict(p) for p in db.participantes]
+        # Los datos de los participantes forman parte del documento
+        firma = hash(tuple((p.id, p.version) for p in db.participantes))
+
+        def compute() -> bytes:
+            with monthly_index.lock:
+                totales = monthly_index.totales(codigo_mes)
+                saldos = monthly_index.saldos_iniciales(codigo_mes)
+            unidades = []
+            for participante in participantes:
+                code = participant_ids.lookup(participante["id"])
+                fila = totales.get(code, (0, 0, 0, 0))
+                unidades.append({
+                    "participante": participante,
+                    "saldo_inicial": saldos.get(code, 0),
+                    "gastos_pagados": fila[GASTOS_PAGADOS],
+                    "parte_gastos": fila[PARTE_GASTOS],
+                    "pagos_realizados": fila[PAGOS_REALIZADOS],
+                    "pagos_recibidos": fila[PAGOS_RECIBIDOS]
+                })
+            return EstadoCuentaService._render(generar_resumen, {"mes": mes, "unidades": unidades}, formato)
+
+        body = await statement_cache.get_or_compute(
+            ("resumen", firma, mes, formato),
+            compute,
+            version_of=lambda: EstadoCuentaService._version_hasta(codigo_mes)
+        )
+        return EstadoCuentaService._response(body, formato, f"resumen-{mes}")
+
+    @staticmethod
+    def shutdown() -> None:
+        """Detener el pool de procesos (al apagar el servidor)"""
+        with EstadoCuentaService._lock:
+            executor = EstadoCuentaService._executor
+            EstadoCuentaService._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -1,16 +1,28 @@
 """
 Servicio para la lógica de negocio de gastos
 """
-from typing import List
+from typing import List, Optional, Tuple, Union
 from models.schemas import Gasto, GastoCreate
-from database.connection import load_database, save_database
+from database.connection import load_database, transaction
+from database.columnar import columnar_store
+from database.id_watermark import id_watermark
+from database.monthly_index import monthly_index
+from database.participant_index import participant_index
+from database.records import GastoRecord, participant_ids
+from database.reference_index import reference_index
+from database.search_index import search_index
 from services.participante_service import ParticipanteService
+from utils.helpers import check_version
 from fastapi import HTTPException
 
 
 class GastoService:
     """Servicio para gestionar gastos"""
     
+    # Campos que admite fields= y relaciones que admite embed= en el listado
+    FIELDS = GastoRecord.FIELDS
+    EMBEDS = ("participantes",)
+    
     @staticmethod
     def get_all() -> List[Gasto]:
         """
@@ -20,7 +32,45 @@ class GastoService:
             List[Gasto]: Lista de todos los gastos
         """
         db = load_database()
-        return db.gastos
+        return [g.to_model() for g in db.gastos]
+    
+    @staticmethod
+    def get_all_dicts() -> List[dict]:
+        """
+        Obtener todos los gastos listos para serializar a JSON
+        
+        Returns:
+            List[dict]: Lista de todos los gastos (mismo formato que Gasto)
+        """
+        db = load_database()
+        return [g.to_dict() for g in db.gastos]
+    
+    @staticmethod
+    def get_list(fields: Optional[Tuple[str, ...]] = None, embed: Tuple[str, ...] = ()) -> Union[List[dict], dict]:
+        """
+        Obtener los gastos con los campos pedidos y, opcionalmente, sus participantes
+        
+        Args:
+            fields (Optional[Tuple[str, ...]]): Campos a incluir (None para todos)
+            embed (Tuple[str, ...]): Relaciones a embeber ("participantes")
+        
+        Returns:
+            Union[List[dict], dict]: Lista de gastos; con embed=participantes,
+                {"gastos": [...], "participantes": {id: {"nombre", "unidad"}}}
+                con solo los participantes que aparecen en la lista
+        """
+        db = load_database()
+        if fields is None:
+            gastos = [g.to_dict() for g in db.gastos]
+        else:
+            gastos = [g.to_partial_dict(fields) for g in db.gastos]
+        if "participantes" not in embed:
+            return gastos
+        codes = set()
+        for gasto in db.gastos:
+            codes.add(gasto.pagado_por_code)
+            codes.update(gasto.participante_codes)
+        return {"gastos": gastos, "participantes": participant_index.embed(codes)}
     
     @staticmethod
     def get_by_id(gasto_id: str) -> Gasto:
@@ -42,7 +92,7 @@ class GastoService:
         if not gasto:
             raise HTTPException(status_code=404, detail="Gasto no encontrado")
         
-        return gasto
+        return gasto.to_model()
     
     @staticmethod
     def create(gasto_data: GastoCreate, gasto_id: str) -> Gasto:
@@ -59,23 +109,6 @@ class GastoService:
         Raises:
             HTTPException: Si ya existe un gasto con ese ID o participantes no existen
         """
-        db = load_database()
-        
-        # Verificar que el ID no exista
-        if any(g.id == gasto_id for g in db.gastos):
-            raise HTTPException(status_code=400, detail="Ya existe un gasto con este ID")
-        
-        # Verificar que los participantes existan
-        if not ParticipanteService.exists(gasto_data.pagado_por):
-            raise HTTPException(status_code=400, detail="El participante que pagó no existe")
-        
-        for participante_id in gasto_data.participantes:
-            if not ParticipanteService.exists(participante_id):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"El participante {participante_id} no existe"
-                )
-
         comprobante = gasto_data.comprobante
 
         # Convertir valores vacíos o None a None
@@ -95,80 +128,117 @@ class GastoService:
             creado_por=gasto_data.creado_por
         )
         
-        db.gastos.append(gasto)
-        save_database(db)
+        with transaction() as db:
+            # Verificar que el ID no exista (sin recorrer si es un ULID nuevo)
+            if not id_watermark.is_new("gastos", gasto_id) and any(g.id == gasto_id for g in db.gastos):
+                raise HTTPException(status_code=400, detail="Ya existe un gasto con este ID")
+            
+            GastoService._validar_participantes(gasto)
+            
+            record = GastoRecord.from_model(gasto)
+            db.gastos.append(record)
+            id_watermark.advance("gastos", gasto.id)
+            reference_index.add(gasto.comprobante, ("gasto", gasto.id))
+            search_index.add(record)
+            columnar_store.upsert_gasto(record)
+            monthly_index.add_gasto(record)
         
         return gasto
     
     @staticmethod
-    def update(gasto_id: str, gasto_data: Gasto) -> Gasto:
+    def update(gasto_id: str, gasto_data: Gasto, expected_version: Optional[int] = None) -> Gasto:
         """
         Actualizar un gasto existente
         
         Args:
             gasto_id (str): ID del gasto a actualizar
             gasto_data (Gasto): Nuevos datos del gasto
+            expected_version (Optional[int]): Versión esperada (If-Match); None para omitir
             
         Returns:
             Gasto: Gasto actualizado
             
         Raises:
-            HTTPException: Si no se encuentra el gasto o hay conflicto de ID
+            HTTPException: Si no se encuentra el gasto, hay conflicto de ID o de versión
         """
-        db = load_database()
-        
-        # Buscar el gasto
-        gasto_index = next((i for i, g in enumerate(db.gastos) if g.id == gasto_id), None)
-        if gasto_index is None:
-            raise HTTPException(status_code=404, detail="Gasto no encontrado")
-        
-        # Verificar que el ID no cambie o que no exista otro con el nuevo ID
-        if gasto_data.id != gasto_id:
-            if any(g.id == gasto_data.id for g in db.gastos):
-                raise HTTPException(status_code=400, detail="Ya existe un gasto con este ID")
-        
-        # Verificar que los participantes existan
-        if not ParticipanteService.exists(gasto_data.pagado_por):
-            raise HTTPException(status_code=400, detail="El participante que pagó no existe")
-        
-        for participante_id in gasto_data.participantes:
-            if not ParticipanteService.exists(participante_id):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"El participante {participante_id} no existe"
-                )
-        
-        db.gastos[gasto_index] = gasto_data
-        save_database(db)
+        with transaction() as db:
+            # Buscar el gasto
+            gasto_index = next((i for i, g in enumerate(db.gastos) if g.id == gasto_id), None)
+            if gasto_index is None:
+                raise HTTPException(status_code=404, detail="Gasto no encontrado")
+            
+            # Verificar que el ID no cambie o que no exista otro con el nuevo ID
+            if gasto_data.id != gasto_id:
+                if not id_watermark.is_new("gastos", gasto_data.id) and any(g.id == gasto_data.id for g in db.gastos):
+                    raise HTTPException(status_code=400, detail="Ya existe un gasto con este ID")
+            
+            actual = db.gastos[gasto_index]
+            check_version(actual.version, expected_version)
+            
+            GastoService._validar_participantes(gasto_data)
+            
+            gasto = gasto_data.model_copy(update={"version": actual.version + 1})
+            record = GastoRecord.from_model(gasto)
+            db.gastos[gasto_index] = record
+            id_watermark.advance("gastos", gasto.id)
+            reference_index.remove(actual.comprobante, ("gasto", actual.id))
+            reference_index.add(gasto.comprobante, ("gasto", gasto.id))
+            search_index.remove(actual.id)
+            search_index.add(record)
+            columnar_store.remove_gasto(actual.id)
+            columnar_store.upsert_gasto(record)
+            monthly_index.remove_gasto(actual)
+            monthly_index.add_gasto(record)
         
-        return gasto_data
+        return gasto
     
     @staticmethod
-    def delete(gasto_id: str) -> dict:
+    def delete(gasto_id: str, expected_version: Optional[int] = None) -> dict:
         """
         Eliminar un gasto
         
         Args:
             gasto_id (str): ID del gasto a eliminar
+            expected_version (Optional[int]): Versión esperada (If-Match); None para omitir
             
         Returns:
             dict: Mensaje de confirmación
             
         Raises:
-            HTTPException: Si no se encuentra el gasto
+            HTTPException: Si no se encuentra el gasto o hay conflicto de versión
         """
-        db = load_database()
-        
-        # Buscar el gasto
-        gasto_index = next((i for i, g in enumerate(db.gastos) if g.id == gasto_id), None)
-        if gasto_index is None:
-            raise HTTPException(status_code=404, detail="Gasto no encontrado")
-        
-        db.gastos.pop(gasto_index)
-        save_database(db)
+        with transaction() as db:
+            # Buscar el gasto
+            gasto_index = next((i for i, g in enumerate(db.gastos) if g.id == gasto_id), None)
+            if gasto_index is None:
+                raise HTTPException(status_code=404, detail="Gasto no encontrado")
+            
+            check_version(db.gastos[gasto_index].version, expected_version)
+            
+            eliminado = db.gastos.pop(gasto_index)
+            reference_index.remove(eliminado.comprobante, ("gasto", eliminado.id))
+            search_index.remove(eliminado.id)
+            columnar_store.remove_gasto(eliminado.id)
+            monthly_index.remove_gasto(eliminado)
         
         return {"message": "Gasto eliminado correctamente"}
     
+    @staticmethod
+    def search(query: str, limit: int = 20) -> List[Gasto]:
+        """
+        Buscar gastos por descripción y categoría
+        
+        Args:
+            query (str): Texto a buscar (sin distinguir acentos ni mayúsculas, admite prefijos)
+            limit (int): Cantidad máxima de resultados
+            
+        Returns:
+            List[Gasto]: Gastos encontrados, del más relevante al menos relevante
+        """
+        # Sincronizar el índice con escrituras de otros workers
+        load_database()
+        return [g.to_model() for g in search_index.search(query, limit)]
+    
     @staticmethod
     def get_by_participante(participante_id: str) -> List[Gasto]:
         """
@@ -181,7 +251,28 @@ class GastoService:
             List[Gasto]: Lista de gastos relacionados
         """
         db = load_database()
-        return [
-            g for g in db.gastos 
-            if participante_id in g.participantes or g.pagado_por == participante_id
-        ]
+        code = participant_ids.lookup(participante_id)
+        if code is None:
+            return []
+        return [g.to_model() for g in db.gastos if g.involves(code)]
+    
+    @staticmethod
+    def _validar_participantes(gasto: Gasto) -> None:
+        """
+        Verificar que existan el pagador y los participantes de un gasto
+        
+        Args:
+            gasto (Gasto): Gasto a validar
+            
+        Raises:
+            HTTPException: Si algún participante no existe
+        """
+        if not ParticipanteService.exists(gasto.pagado_por):
+            raise HTTPException(status_code=400, detail="El participante que pagó no existe")
+        
+        for participante_id in gasto.participantes:
+            if not ParticipanteService.exists(participante_id):
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"El participante {participante_id} no existe"
+                )
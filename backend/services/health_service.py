@@ -0,0 +1,312 @@
+"""
+Servicio para el chequeo de salud y disponibilidad del worker
+
+Un muestreador en el event loop mide cuánto se atrasa respecto del
+intervalo esperado: si algo bloquea el loop (bcrypt, una serialización
+grande) el atraso crece. /health/ready combina un percentil de ese atraso
+(una sola pausa no saca al worker de servicio) con pruebas de lectura y
+escritura del almacenamiento, el tamaño de la base, la cola de escrituras
+y el estado del directorio de comprobantes, y responde 503 si algún valor
+supera su umbral. Las pruebas de escritura (con fsync) se repiten como
+mucho una vez por ventana; entre tanto se informa el último resultado.
+"""
+import asyncio
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from database.connection import get_database_file_path, load_database, storage_stats
+from database.tenants import tenant_registry
+from services.upload_service import UploadService
+from utils.metrics import EVENT_LOOP_LAG
+import config
+
+
+# Ventana (segundos) sobre la que se informa el atraso máximo del event loop
+LAG_WINDOW_SECONDS = 10
+
+# Percentil del atraso de la ventana que se compara con el umbral
+LAG_PERCENTILE = 90
+
+# Segundos durante los que se reutiliza el resultado de una prueba de escritura
+WRITE_PROBE_INTERVAL_SECONDS = LAG_WINDOW_SECONDS
+
+# Bytes leídos de la base en la prueba de lectura
+_READ_PROBE_BYTES = 64 * 1024
+
+
+class EventLoopMonitor:
+    """Mide periódicamente el atraso del event loop"""
+
+    def __init__(self, interval: float, window: float = LAG_WINDOW_SECONDS):
+        """
+        Args:
+            interval (float): Segundos entre muestras
+            window (float): Segundos de historia para el atraso máximo
+        """
+        self.interval = interval
+        self.window = window
+        self._samples: Deque[Tuple[float, float]] = deque()
+        self._last_tick: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Iniciar el muestreo (debe llamarse desde el event loop)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._samples.clear()
+        self._last_tick = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Detener el muestreo"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def running(self) -> bool:
+        """
+        Indicar si el muestreo está activo
+
+        Returns:
+            bool: True si la tarea de muestreo está corriendo
+        """
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_tick = now
+            self._samples.append((now, lag))
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+            EVENT_LOOP_LAG.observe(lag)
+
+    def snapshot(self) -> dict:
+        """
+        Atraso actual, percentil y máximo recientes
+
+        El atraso en curso (tiempo desde la última muestra por encima del
+        intervalo) también cuenta: recién liberado el loop, la petición de
+        salud puede atenderse antes que la próxima muestra.
+
+        Returns:
+            dict: Último atraso, percentil LAG_PERCENTILE y máximo de la ventana
+                y si el muestreo está activo (segundos)
+        """
+        now = time.monotonic()
+        current = 0.0
+        if self._last_tick is not None and self.running():
+            current = max(0.0, now - self._last_tick - self.interval)
+        recent = [lag for at, lag in self._samples if at >= now - self.window]
+        lag = max(recent[-1] if recent else 0.0, current)
+        percentile = 0.0
+        if recent:
+            # Percentil por rango más cercano
+            ordered = sorted(recent)
+            percentile = ordered[max(0, -(-len(ordered) * LAG_PERCENTILE // 100) - 1)]
+        return {
+            "running": self.running(),
+            "lag_seconds": lag,
+            "p_lag_seconds": max(percentile, current),
+            "max_lag_seconds": max(recent + [current])
+        }
+
+
+event_loop_monitor = EventLoopMonitor(interval=config.HEALTH_LOOP_INTERVAL_MS / 1000)
+
+
+class HealthService:
+    """Servicio para verificar que el worker puede atender peticiones"""
+
+    # Duración del arranque (None mientras el worker no terminó de prepararse)
+    _startup_seconds: Optional[float] = None
+
+    # Último resultado de la prueba de escritura de cada directorio: (momento, ms, error)
+    _write_probes: Dict[str, Tuple[float, Optional[float], Optional[str]]] = {}
+    _write_probes_lock = threading.Lock()
+
+    @staticmethod
+    def mark_started(seconds: float) -> None:
+        """
+        Registrar que el worker terminó de arrancar (datos e índices cargados)
+
+        Args:
+            seconds (float): Duración del arranque
+        """
+        HealthService._startup_seconds = seconds
+
+    @staticmethod
+    async def readiness() -> dict:
+        """
+        Verificar arranque, event loop, almacenamiento, base de datos, cola de escrituras y uploads
+
+        Returns:
+            dict: "status" ("ok" o "unavailable") y el detalle de cada chequeo
+        """
+        loop = event_loop_monitor.snapshot()
+        max_lag_ms = config.HEALTH_MAX_LOOP_LAG_MS
+        startup_seconds = HealthService._startup_seconds
+        checks = {
+            "startup": {
+                "ok": startup_seconds is not None,
+                "seconds": round(startup_seconds, 3) if startup_seconds is not None else None
+            },
+            "event_loop": {
+                "ok": loop["p_lag_seconds"] * 1000 <= max_lag_ms,
+                "running": loop["running"],
+                "lag_ms": round(loop["lag_seconds"] * 1000, 3),
+                f"p{LAG_PERCENTILE}_lag_ms": round(loop["p_lag_seconds"] * 1000, 3),
+                "max_lag_ms": round(loop["max_lag_seconds"] * 1000, 3),
+                "threshold_ms": max_lag_ms
+            }
+        }
+        # Las pruebas de E/S corren en el pool de hilos: también esperan si está saturado
+        checks.update(await run_in_threadpool(HealthService._probe))
+        return {
+            "status": "ok" if all(check["ok"] for check in checks.values()) else "unavailable",
+            "checks": checks
+        }
+
+    @staticmethod
+    def _probe() -> dict:
+        """Chequeos que hacen E/S (se ejecutan fuera del event loop)"""
+        checks = {}
+        max_storage_ms = config.HEALTH_MAX_STORAGE_MS
+        database_file = get_database_file_path()
+
+        # Lectura: el comienzo del archivo de la base (si existe)
+        try:
+            read_ms = HealthService._timed_ms(lambda: HealthService._read_probe(database_file))
+            read_error = None
+        except OSError as e:
+            read_ms, read_error = None, str(e)
+        # Escritura: un archivo chico con fsync en el directorio de datos
+        data_dir = os.path.dirname(database_file)
+        try:
+            write_ms = HealthService._cached_write_ms(
+                data_dir, lambda: os.path.join(data_dir, f".health-{os.getpid()}")
+            )
+            write_error = None
+        except OSError as e:
+            write_ms, write_error = None, str(e)
+        stats = storage_stats()
+        checks["storage"] = {
+            "ok": (read_error is None and write_error is None
+                   and read_ms <= max_storage_ms and write_ms <= max_storage_ms),
+            "read_ms": read_ms,
+            "write_ms": write_ms,
+            "threshold_ms": max_storage_ms,
+            "last_flush_ms": (
+                round(stats["last_flush_seconds"] * 1000, 3) if stats["last_flush_seconds"] is not None else None
+            ),
+            "error": read_error or write_error
+        }
+
+        # Base de datos: se carga si todavía no está en memoria
+        try:
+            db = load_database()
+            checks["database"] = {
+                "ok": True,
+                "size_bytes": os.path.getsize(database_file) if os.path.exists(database_file) else 0,
+                "gastos": len(db.gastos),
+                "pagos": len(db.pagos),
+                "participantes": len(db.participantes),
+                "usuarios": len(db.usuarios)
+            }
+        except Exception as e:
+            checks["database"] = {"ok": False, "error": str(e)}
+
+        pending = stats["pending_writes"]
+        checks["write_queue"] = {
+            "ok": pending <= config.HEALTH_MAX_PENDING_WRITES,
+            "pending": pending,
+            "threshold": config.HEALTH_MAX_PENDING_WRITES
+        }
+
+        checks["uploads"] = HealthService._uploads_check()
+
+        # Consorcios residentes: informativo (el LRU desaloja para respetar sus límites)
+        checks["tenants"] = {"ok": True, **tenant_registry.stats()}
+        return checks
+
+    @staticmethod
+    def _uploads_check() -> dict:
+        """Directorio de comprobantes: escribible y con espacio libre"""
+        store = UploadService.store()
+        upload_dir = store.root
+        min_free = config.HEALTH_MIN_FREE_BYTES
+        try:
+            write_ms = HealthService._cached_write_ms(
+                str(upload_dir), lambda: str(store.new_temp_path())
+            )
+            free = shutil.disk_usage(upload_dir).free
+        except OSError as e:
+            return {"ok": False, "path": str(upload_dir.absolute()), "error": str(e)}
+        return {
+            "ok": free >= min_free and write_ms <= config.HEALTH_MAX_STORAGE_MS,
+            "path": str(upload_dir.absolute()),
+            "write_ms": write_ms,
+            "free_bytes": free,
+            "min_free_bytes": min_free
+        }
+
+    @staticmethod
+    def _cached_write_ms(directory: str, path: Callable[[], str]) -> float:
+        """
+        Prueba de escritura con fsync, repetida como mucho una vez por WRITE_PROBE_INTERVAL_SECONDS
+
+        Args:
+            directory (str): Directorio probado (clave del resultado guardado)
+            path (Callable[[], str]): Ruta del archivo de prueba
+
+        Returns:
+            float: Duración de la última prueba en milisegundos
+
+        Raises:
+            OSError: Si la última prueba falló
+        """
+        now = time.monotonic()
+        with HealthService._write_probes_lock:
+            cached = HealthService._write_probes.get(directory)
+            if cached is None or now - cached[0] >= WRITE_PROBE_INTERVAL_SECONDS:
+                try:
+                    cached = (now, HealthService._timed_ms(lambda: HealthService._write_probe(path())), None)
+                except OSError as e:
+                    cached = (now, None, str(e))
+                HealthService._write_probes[directory] = cached
+        _, write_ms, error = cached
+        if error is not None:
+            raise OSError(error)
+        return write_ms
+
+    @staticmethod
+    def _timed_ms(probe) -> float:
+        start = time.perf_counter()
+        probe()
+        return round((time.perf_counter() - start) * 1000, 3)
+
+    @staticmethod
+    def _read_probe(path: str) -> None:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                f.read(_READ_PROBE_BYTES)
+
+    @staticmethod
+    def _write_probe(path: str) -> None:
+        try:
+            with open(path, "wb") as f:
+                f.write(b"health")
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
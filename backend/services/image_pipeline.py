@@ -0,0 +1,140 @@
+"""
+Procesamiento en segundo plano de fotos de comprobantes
+
+Las imágenes subidas (JPG/PNG) se encolan en un pool de procesos que genera
+una miniatura y una versión recomprimida para mostrar en pantalla. La
+petición de upload no espera este trabajo; mientras la variante no exista
+se sirve el original.
+
+Requiere Pillow (opcional): sin Pillow las imágenes se sirven siempre en
+su versión original.
+"""
+import importlib.util
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set
+import config
+
+
+# Variantes disponibles: (ancho máximo, alto máximo, calidad JPEG)
+VARIANTS: Dict[str, tuple] = {
+    "thumb": (320, 320, 70),
+    "display": (1280, 1280, 80),
+}
+
+IMAGE_TYPES = ("image/jpeg", "image/jpg", "image/png")
+
+
+def variant_path(blob_path: Path, variant: str) -> Path:
+    """
+    Ruta de una variante junto al archivo original
+
+    Args:
+        blob_path (Path): Ruta del archivo original en el almacén
+        variant (str): Nombre de la variante
+
+    Returns:
+        Path: Ruta de la variante (JPEG)
+    """
+    return blob_path.parent / f"{blob_path.name}.{variant}.jpg"
+
+
+def render_variants(blob_path: str) -> Dict[str, int]:
+    """
+    Generar todas las variantes de una imagen (se ejecuta en un proceso del pool)
+
+    Args:
+        blob_path (str): Ruta del archivo original
+
+    Returns:
+        Dict[str, int]: Tamaño en bytes de cada variante generada
+    """
+    from PIL import Image, ImageOps
+
+    sizes = {}
+    source = Path(blob_path)
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "L"):
+            original = original.convert("RGB")
+        for name, (width, height, quality) in VARIANTS.items():
+            target = variant_path(source, name)
+            if target.exists():
+                continue
+            image = original.copy()
+            image.thumbnail((width, height))
+            tmp = target.parent / f".{target.name}.{os.getpid()}.tmp"
+            image.save(tmp, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp, target)
+            sizes[name] = target.stat().st_size
+    return sizes
+
+
+class ImagePipeline:
+    """Cola de procesamiento de imágenes sobre un pool de procesos"""
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _lock = threading.Lock()
+    _in_flight: Set[str] = set()
+
+    @staticmethod
+    def available() -> bool:
+        """
+        Indicar si el procesamiento de imágenes está habilitado
+
+        Returns:
+            bool: True si Pillow está instalado y hay workers configurados
+        """
+        return config.IMAGE_WORKERS > 0 and importlib.util.find_spec("PIL") is not None
+
+    @staticmethod
+    def submit(blob_path: Path, content_type: str) -> bool:
+        """
+        Encolar la generación de variantes sin esperar el resultado
+
+        Args:
+            blob_path (Path): Ruta del archivo original
+            content_type (str): Tipo MIME declarado en el upload
+
+        Returns:
+            bool: True si se encoló trabajo
+        """
+        if content_type not in IMAGE_TYPES or not ImagePipeline.available():
+            return False
+        if all(variant_path(blob_path, name).exists() for name in VARIANTS):
+            return False
+
+        key = str(blob_path)
+        with ImagePipeline._lock:
+            if key in ImagePipeline._in_flight:
+                return False
+            if ImagePipeline._executor is None:
+                ImagePipeline._executor = ProcessPoolExecutor(
+                    max_workers=config.IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            ImagePipeline._in_flight.add(key)
+            future = ImagePipeline._executor.submit(render_variants, key)
+
+        future.add_done_callback(lambda f: ImagePipeline._done(key, f))
+        return True
+
+    @staticmethod
+    def _done(key: str, future) -> None:
+        with ImagePipeline._lock:
+            ImagePipeline._in_flight.discard(key)
+        error = future.exception()
+        if error is not None:
+            print(f"Error procesando imagen {key}: {error}")
+
+    @staticmethod
+    def shutdown() -> None:
+        """Detener el pool de procesos (al apagar el servidor)"""
+        with ImagePipeline._lock:
+            executor = ImagePipeline._executor
+            ImagePipeline._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -1,16 +1,27 @@
 """
 Servicio para la lógica de negocio de pagos
 """
-from typing import List
+from typing import List, Optional, Tuple, Union
 from models.schemas import Pago, PagoCreate
-from database.connection import load_database, save_database
+from database.connection import load_database, transaction
+from database.columnar import columnar_store
+from database.id_watermark import id_watermark
+from database.monthly_index import monthly_index
+from database.participant_index import participant_index
+from database.records import PagoRecord, participant_ids
+from database.reference_index import reference_index
 from services.participante_service import ParticipanteService
+from utils.helpers import check_version
 from fastapi import HTTPException
 
 
 class PagoService:
     """Servicio para gestionar pagos"""
     
+    # Campos que admite fields= y relaciones que admite embed= en el listado
+    FIELDS = PagoRecord.FIELDS
+    EMBEDS = ("participantes",)
+    
     @staticmethod
     def get_all() -> List[Pago]:
         """
@@ -20,7 +31,45 @@ class PagoService:
             List[Pago]: Lista de todos los pagos
         """
         db = load_database()
-        return db.pagos
+        return [p.to_model() for p in db.pagos]
+    
+    @staticmethod
+    def get_all_dicts() -> List[dict]:
+        """
+        Obtener todos los pagos listos para serializar a JSON
+        
+        Returns:
+            List[dict]: Lista de todos los pagos (mismo formato que Pago)
+        """
+        db = load_database()
+        return [p.to_dict() for p in db.pagos]
+    
+    @staticmethod
+    def get_list(fields: Optional[Tuple[str, ...]] = None, embed: Tuple[str, ...] = ()) -> Union[List[dict], dict]:
+        """
+        Obtener los pagos con los campos pedidos y, opcionalmente, sus participantes
+        
+        Args:
+            fields (Optional[Tuple[str, ...]]): Campos a incluir (None para todos)
+            embed (Tuple[str, ...]): Relaciones a embeber ("participantes")
+        
+        Returns:
+            Union[List[dict], dict]: Lista de pagos; con embed=participantes,
+                {"pagos": [...], "participantes": {id: {"nombre", "unidad"}}}
+                con solo los participantes que aparecen en la lista
+        """
+        db = load_database()
+        if fields is None:
+            pagos = [p.to_dict() for p in db.pagos]
+        else:
+            pagos = [p.to_partial_dict(fields) for p in db.pagos]
+        if "participantes" not in embed:
+            return pagos
+        codes = set()
+        for pago in db.pagos:
+            codes.add(pago.deudor_code)
+            codes.add(pago.acreedor_code)
+        return {"pagos": pagos, "participantes": participant_index.embed(codes)}
     
     @staticmethod
     def get_by_id(pago_id: str) -> Pago:
@@ -42,7 +91,7 @@ class PagoService:
         if not pago:
             raise HTTPException(status_code=404, detail="Pago no encontrado")
         
-        return pago
+        return pago.to_model()
     
     @staticmethod
     def create(pago_data: PagoCreate, pago_id: str) -> Pago:
@@ -59,92 +108,110 @@ class PagoService:
         Raises:
             HTTPException: Si ya existe un pago con ese ID o participantes no existen
         """
-        db = load_database()
-        
-        # Verificar que el ID no exista
-        if any(p.id == pago_id for p in db.pagos):
-            raise HTTPException(status_code=400, detail="Ya existe un pago con este ID")
-        
-        # Verificar que los participantes existan
-        if not ParticipanteService.exists(pago_data.deudor_id):
-            raise HTTPException(status_code=400, detail="El deudor no existe")
-        
-        if not ParticipanteService.exists(pago_data.acreedor_id):
-            raise HTTPException(status_code=400, detail="El acreedor no existe")
-        
         # Crear el pago
         pago = Pago(
             id=pago_id,
             **pago_data.model_dump()
         )
         
-        db.pagos.append(pago)
-        save_database(db)
+        with transaction() as db:
+            # Verificar que el ID no exista (sin recorrer si es un ULID nuevo)
+            if not id_watermark.is_new("pagos", pago_id) and any(p.id == pago_id for p in db.pagos):
+                raise HTTPException(status_code=400, detail="Ya existe un pago con este ID")
+            
+            # Verificar que los participantes existan
+            if not ParticipanteService.exists(pago.deudor_id):
+                raise HTTPException(status_code=400, detail="El deudor no existe")
+            
+            if not ParticipanteService.exists(pago.acreedor_id):
+                raise HTTPException(status_code=400, detail="El acreedor no existe")
+            
+            record = PagoRecord.from_model(pago)
+            db.pagos.append(record)
+            id_watermark.advance("pagos", pago.id)
+            reference_index.add(pago.comprobante, ("pago", pago.id))
+            columnar_store.upsert_pago(record)
+            monthly_index.add_pago(record)
         
         return pago
     
     @staticmethod
-    def update(pago_id: str, pago_data: Pago) -> Pago:
+    def update(pago_id: str, pago_data: Pago, expected_version: Optional[int] = None) -> Pago:
         """
         Actualizar un pago existente
         
         Args:
             pago_id (str): ID del pago a actualizar
             pago_data (Pago): Nuevos datos del pago
+            expected_version (Optional[int]): Versión esperada (If-Match); None para omitir
             
         Returns:
             Pago: Pago actualizado
             
         Raises:
-            HTTPException: Si no se encuentra el pago o hay conflicto de ID
+            HTTPException: Si no se encuentra el pago, hay conflicto de ID o de versión
         """
-        db = load_database()
-        
-        # Buscar el pago
-        pago_index = next((i for i, p in enumerate(db.pagos) if p.id == pago_id), None)
-        if pago_index is None:
-            raise HTTPException(status_code=404, detail="Pago no encontrado")
-        
-        # Verificar que el ID no cambie o que no exista otro con el nuevo ID
-        if pago_data.id != pago_id:
-            if any(p.id == pago_data.id for p in db.pagos):
-                raise HTTPException(status_code=400, detail="Ya existe un pago con este ID")
-        
-        # Verificar que los participantes existan
-        if not ParticipanteService.exists(pago_data.deudor_id):
-            raise HTTPException(status_code=400, detail="El deudor no existe")
-        
-        if not ParticipanteService.exists(pago_data.acreedor_id):
-            raise HTTPException(status_code=400, detail="El acreedor no existe")
-        
-        db.pagos[pago_index] = pago_data
-        save_database(db)
+        with transaction() as db:
+            # Buscar el pago
+            pago_index = next((i for i, p in enumerate(db.pagos) if p.id == pago_id), None)
+            if pago_index is None:
+                raise HTTPException(status_code=404, detail="Pago no encontrado")
+            
+            # Verificar que el ID no cambie o que no exista otro con el nuevo ID
+            if pago_data.id != pago_id:
+                if not id_watermark.is_new("pagos", pago_data.id) and any(p.id == pago_data.id for p in db.pagos):
+                    raise HTTPException(status_code=400, detail="Ya existe un pago con este ID")
+            
+            actual = db.pagos[pago_index]
+            check_version(actual.version, expected_version)
+            
+            # Verificar que los participantes existan
+            if not ParticipanteService.exists(pago_data.deudor_id):
+                raise HTTPException(status_code=400, detail="El deudor no existe")
+            
+            if not ParticipanteService.exists(pago_data.acreedor_id):
+                raise HTTPException(status_code=400, detail="El acreedor no existe")
+            
+            pago = pago_data.model_copy(update={"version": actual.version + 1})
+            record = PagoRecord.from_model(pago)
+            db.pagos[pago_index] = record
+            id_watermark.advance("pagos", pago.id)
+            reference_index.remove(actual.comprobante, ("pago", actual.id))
+            reference_index.add(pago.comprobante, ("pago", pago.id))
+            columnar_store.remove_pago(actual.id)
+            columnar_store.upsert_pago(record)
+            monthly_index.remove_pago(actual)
+            monthly_index.add_pago(record)
         
-        return pago_data
+        return pago
     
     @staticmethod
-    def delete(pago_id: str) -> dict:
+    def delete(pago_id: str, expected_version: Optional[int] = None) -> dict:
         """
         Eliminar un pago
         
         Args:
             pago_id (str): ID del pago a eliminar
+            expected_version (Optional[int]): Versión esperada (If-Match); None para omitir
             
         Returns:
             dict: Mensaje de confirmación
             
         Raises:
-            HTTPException: Si no se encuentra el pago
+            HTTPException: Si no se encuentra el pago o hay conflicto de versión
         """
-        db = load_database()
-        
-        # Buscar el pago
-        pago_index = next((i for i, p in enumerate(db.pagos) if p.id == pago_id), None)
-        if pago_index is None:
-            raise HTTPException(status_code=404, detail="Pago no encontrado")
-        
-        db.pagos.pop(pago_index)
-        save_database(db)
+        with transaction() as db:
+            # Buscar el pago
+            pago_index = next((i for i, p in enumerate(db.pagos) if p.id == pago_id), None)
+            if pago_index is None:
+                raise HTTPException(status_code=404, detail="Pago no encontrado")
+            
+            check_version(db.pagos[pago_index].version, expected_version)
+            
+            eliminado = db.pagos.pop(pago_index)
+            reference_index.remove(eliminado.comprobante, ("pago", eliminado.id))
+            columnar_store.remove_pago(eliminado.id)
+            monthly_index.remove_pago(eliminado)
         
         return {"message": "Pago eliminado correctamente"}
     
@@ -160,7 +227,7 @@ class PagoService:
             List[Pago]: Lista de pagos relacionados
         """
         db = load_database()
-        return [
-            p for p in db.pagos 
-            if p.deudor_id == participante_id or p.acreedor_id == participante_id
-        ]
+        code = participant_ids.lookup(participante_id)
+        if code is None:
+            return []
+        return [p.to_model() for p in db.pagos if p.involves(code)]
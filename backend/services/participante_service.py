@@ -3,7 +3,11 @@ Servicio para la lógica de negocio de participantes
 """
 from typing import List, Optional
 from models.schemas import Participante, ParticipanteCreate
-from database.connection import load_database, save_database
+from database.connection import load_database, transaction
+from database.id_watermark import id_watermark
+from database.participant_index import participant_index
+from database.records import ParticipanteRecord, participant_ids
+from utils.helpers import check_version
 from fastapi import HTTPException
 
 
@@ -19,7 +23,18 @@ class ParticipanteService:
             List[Participante]: Lista de todos los participantes
         """
         db = load_database()
-        return db.participantes
+        return [p.to_model() for p in db.participantes]
+    
+    @staticmethod
+    def get_all_dicts() -> List[dict]:
+        """
+        Obtener todos los participantes listos para serializar a JSON
+        
+        Returns:
+            List[dict]: Lista de todos los participantes (mismo formato que Participante)
+        """
+        db = load_database()
+        return [p.to_dict() for p in db.participantes]
     
     @staticmethod
     def get_by_id(participante_id: str) -> Participante:
@@ -41,7 +56,7 @@ class ParticipanteService:
         if not participante:
             raise HTTPException(status_code=404, detail="Participante no encontrado")
         
-        return participante
+        return participante.to_model()
     
     @staticmethod
     def create(participante_data: ParticipanteCreate, participante_id: str) -> Participante:
@@ -58,89 +73,97 @@ class ParticipanteService:
         Raises:
             HTTPException: Si ya existe un participante con ese ID
         """
-        db = load_database()
-        
-        # Verificar que el ID no exista
-        if any(p.id == participante_id for p in db.participantes):
-            raise HTTPException(status_code=400, detail="Ya existe un participante con este ID")
-        
         # Crear el participante
         participante = Participante(
             id=participante_id,
             **participante_data.model_dump()
         )
         
-        db.participantes.append(participante)
-        save_database(db)
+        with transaction() as db:
+            # Verificar que el ID no exista (sin recorrer si es un ULID nuevo)
+            if not id_watermark.is_new("participantes", participante_id) and any(p.id == participante_id for p in db.participantes):
+                raise HTTPException(status_code=400, detail="Ya existe un participante con este ID")
+            
+            record = ParticipanteRecord.from_model(participante)
+            db.participantes.append(record)
+            id_watermark.advance("participantes", participante.id)
+            participant_index.put(record)
         
         return participante
     
     @staticmethod
-    def update(participante_id: str, participante_data: Participante) -> Participante:
+    def update(participante_id: str, participante_data: Participante, expected_version: Optional[int] = None) -> Participante:
         """
         Actualizar un participante existente
         
         Args:
             participante_id (str): ID del participante a actualizar
             participante_data (Participante): Nuevos datos del participante
+            expected_version (Optional[int]): Versión esperada (If-Match); None para omitir
             
         Returns:
             Participante: Participante actualizado
             
         Raises:
-            HTTPException: Si no se encuentra el participante o hay conflicto de ID
+            HTTPException: Si no se encuentra el participante, hay conflicto de ID o de versión
         """
-        db = load_database()
-        
-        # Buscar el participante
-        participante_index = next((i for i, p in enumerate(db.participantes) if p.id == participante_id), None)
-        if participante_index is None:
-            raise HTTPException(status_code=404, detail="Participante no encontrado")
-        
-        # Verificar que el ID no cambie o que no exista otro con el nuevo ID
-        if participante_data.id != participante_id:
-            if any(p.id == participante_data.id for p in db.participantes):
-                raise HTTPException(status_code=400, detail="Ya existe un participante con este ID")
-        
-        db.participantes[participante_index] = participante_data
-        save_database(db)
+        with transaction() as db:
+            # Buscar el participante
+            participante_index = next((i for i, p in enumerate(db.participantes) if p.id == participante_id), None)
+            if participante_index is None:
+                raise HTTPException(status_code=404, detail="Participante no encontrado")
+            
+            # Verificar que el ID no cambie o que no exista otro con el nuevo ID
+            if participante_data.id != participante_id:
+                if not id_watermark.is_new("participantes", participante_data.id) and any(p.id == participante_data.id for p in db.participantes):
+                    raise HTTPException(status_code=400, detail="Ya existe un participante con este ID")
+            
+            actual = db.participantes[participante_index]
+            check_version(actual.version, expected_version)
+            
+            participante = participante_data.model_copy(update={"version": actual.version + 1})
+            record = ParticipanteRecord.from_model(participante)
+            db.participantes[participante_index] = record
+            id_watermark.advance("participantes", participante.id)
+            if participante.id != participante_id:
+                participant_index.remove(participante_id)
+            participant_index.put(record)
         
-        return participante_data
+        return participante
     
     @staticmethod
-    def delete(participante_id: str) -> dict:
+    def delete(participante_id: str, expected_version: Optional[int] = None) -> dict:
         """
         Eliminar un participante
         
         Args:
             participante_id (str): ID del participante a eliminar
+            expected_version (Optional[int]): Versión esperada (If-Match); None para omitir
             
         Returns:
             dict: Mensaje de confirmación
             
         Raises:
-            HTTPException: Si no se encuentra el participante o tiene gastos asociados
+            HTTPException: Si no se encuentra el participante, hay conflicto de versión o tiene gastos asociados
         """
-        db = load_database()
-        
-        # Buscar el participante
-        participante_index = next((i for i, p in enumerate(db.participantes) if p.id == participante_id), None)
-        if participante_index is None:
-            raise HTTPException(status_code=404, detail="Participante no encontrado")
-        
-        # Verificar que no esté involucrado en gastos
-        gastos_con_participante = [
-            g for g in db.gastos 
-            if participante_id in g.participantes or g.pagado_por == participante_id
-        ]
-        if gastos_con_participante:
-            raise HTTPException(
-                status_code=400, 
-                detail="No se puede eliminar un participante que tiene gastos asociados"
-            )
-        
-        db.participantes.pop(participante_index)
-        save_database(db)
+        with transaction() as db:
+            # Buscar el participante
+            participante_index = next((i for i, p in enumerate(db.participantes) if p.id == participante_id), None)
+            if participante_index is None:
+                raise HTTPException(status_code=404, detail="Participante no encontrado")
+            
+            check_version(db.participantes[participante_index].version, expected_version)
+            
+            # Verificar que no esté involucrado en gastos
+            code = participant_ids.lookup(participante_id)
+            if code is not None and any(g.involves(code) for g in db.gastos):
+                raise HTTPException(
+                    status_code=400, 
+                    detail="No se puede eliminar un participante que tiene gastos asociados"
+                )
+            
+            db.participantes.pop(participante_index)
+            participant_index.remove(participante_id)
         
         return {"message": "Participante eliminado correctamente"}
     
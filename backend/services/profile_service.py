@@ -0,0 +1,311 @@
+"""
+Servicio para perfilar peticiones individuales
+
+Una petición marcada (header "X-Profile: 1" o "?_profile=1") y autorizada
+con el token de administración se ejecuta bajo un profiler. Con
+pyinstrument (opcional) se usa su profiler por muestreo, que sigue a la
+petición a través de los await, y se guarda un reporte HTML. Los endpoints
+sincrónicos corren en el pool de hilos: ProfiledRoute los perfila en ese
+hilo y el resultado se combina con el de la petición.
+
+Sin pyinstrument se usa cProfile solo en el hilo del pool de los endpoints
+sincrónicos (un archivo .prof para pstats o snakeviz): en el hilo del event
+loop registraría todas las peticiones que se intercalan. Los endpoints async
+no se pueden perfilar así, y desde Python 3.12 cProfile se activa para todo
+el proceso (sys.monitoring), por lo que ahí el perfilado requiere pyinstrument.
+"""
+import cProfile
+import functools
+import hmac
+import inspect
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+import config
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+    from pyinstrument.renderers import HTMLRenderer
+    from pyinstrument.session import Session
+except ImportError:  # pyinstrument es opcional
+    SamplingProfiler = None
+
+# cProfile se limita al hilo que lo activa solo antes de Python 3.12
+THREAD_CPROFILE = sys.version_info < (3, 12)
+
+
+_PROFILE_NAME = re.compile(r"^[0-9]{8}T[0-9]{6}-[A-Za-z0-9_.-]+-[0-9a-f]{8}\.(prof|html)$")
+
+
+# Perfil de la petición en curso (se propaga a los hilos del pool)
+_current_profile: ContextVar[Optional["ActiveProfile"]] = ContextVar("current_profile", default=None)
+
+
+class ActiveProfile:
+    """Profiler de una petición en curso"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._thread_results: list = []
+        self.context_token = None
+        self._profiler = None
+        if SamplingProfiler is not None:
+            self._profiler = SamplingProfiler(async_mode="enabled")
+            self._profiler.start()
+
+    def run_in_thread(self, func: Callable, *args, **kwargs):
+        """
+        Ejecutar una función perfilándola en el hilo actual
+
+        Args:
+            func (Callable): Función a ejecutar (un endpoint sincrónico)
+
+        Returns:
+            Any: Resultado de la función
+        """
+        if SamplingProfiler is not None:
+            profiler = SamplingProfiler(async_mode="disabled")
+            profiler.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                result = profiler.stop()
+                with self._lock:
+                    self._thread_results.append(result)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._thread_results.append(profiler)
+
+    def stop(self) -> Optional[str]:
+        """
+        Detener el profiler y guardar el resultado
+
+        Returns:
+            Optional[str]: Nombre del perfil guardado, o None si se usa cProfile
+                y la petición no ejecutó ningún endpoint sincrónico
+        """
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.started_at))
+        prefix = f"{stamp}-{self.label}-{uuid.uuid4().hex[:8]}"
+        if self._profiler is not None:
+            session = self._profiler.stop()
+            for thread_session in self._thread_results:
+                session = Session.combine(session, thread_session)
+            name = f"{prefix}.html"
+            ProfileService.directory().joinpath(name).write_text(HTMLRenderer().render(session), encoding="utf-8")
+        else:
+            if not self._thread_results:
+                return None
+            stats = pstats.Stats(self._thread_results[0])
+            for thread_profiler in self._thread_results[1:]:
+                stats.add(thread_profiler)
+            name = f"{prefix}.prof"
+            stats.dump_stats(str(ProfileService.directory() / name))
+        ProfileService.prune()
+        return name
+
+
+class ProfileService:
+    """Servicio para iniciar, guardar y consultar perfiles de peticiones"""
+
+    _lock = threading.Lock()
+    _active = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        """
+        Indicar si el perfilado está habilitado
+
+        Returns:
+            bool: True si hay un token de administración configurado
+        """
+        return bool(config.ADMIN_TOKEN)
+
+    @staticmethod
+    def available() -> bool:
+        """
+        Indicar si se pueden perfilar peticiones
+
+        Returns:
+            bool: True si pyinstrument está instalado o, sin él, si cProfile
+                se puede limitar a un hilo
+        """
+        return SamplingProfiler is not None or THREAD_CPROFILE
+
+    @staticmethod
+    def is_admin(token: Optional[str]) -> bool:
+        """
+        Verificar el token de administración
+
+        Args:
+            token (Optional[str]): Token recibido
+
+        Returns:
+            bool: True si coincide con el configurado
+        """
+        if not config.ADMIN_TOKEN or not token:
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), config.ADMIN_TOKEN.encode("utf-8"))
+
+    @staticmethod
+    def require_admin(token: Optional[str]) -> None:
+        """
+        Exigir el token de administración
+
+        Args:
+            token (Optional[str]): Token recibido
+
+        Raises:
+            HTTPException: Si no está configurado o no coincide
+        """
+        if not ProfileService.enabled():
+            raise HTTPException(status_code=404, detail="Administración deshabilitada")
+        if not ProfileService.is_admin(token):
+            raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+    @staticmethod
+    def directory() -> Path:
+        """
+        Directorio de los perfiles (se crea si no existe)
+
+        Returns:
+            Path: Ruta del directorio
+        """
+        directory = Path(config.PROFILES_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @staticmethod
+    def start(method: str, path: str) -> Optional[ActiveProfile]:
+        """
+        Iniciar el perfilado de una petición si no se alcanzó el límite
+
+        Args:
+            method (str): Método HTTP
+            path (str): Ruta de la petición
+
+        Returns:
+            Optional[ActiveProfile]: Profiler activo, o None si hay demasiadas
+                peticiones perfilándose
+        """
+        with ProfileService._lock:
+            if ProfileService._active >= config.PROFILE_MAX_CONCURRENT:
+                return None
+            ProfileService._active += 1
+        label = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{method}{path}").strip("_")[:80] or "root"
+        try:
+            profile = ActiveProfile(label)
+        except Exception:
+            ProfileService._release()
+            raise
+        profile.context_token = _current_profile.set(profile)
+        return profile
+
+    @staticmethod
+    def finish(profile: ActiveProfile) -> Optional[str]:
+        """
+        Terminar el perfilado de una petición y guardar el resultado
+
+        Args:
+            profile (ActiveProfile): Profiler devuelto por start()
+
+        Returns:
+            Optional[str]: Nombre del perfil guardado (None si no hubo nada que perfilar)
+        """
+        try:
+            return profile.stop()
+        finally:
+            _current_profile.reset(profile.context_token)
+            ProfileService._release()
+
+    @staticmethod
+    def _release() -> None:
+        with ProfileService._lock:
+            ProfileService._active -= 1
+
+    @staticmethod
+    def list_profiles() -> List[dict]:
+        """
+        Listar los perfiles guardados, del más reciente al más antiguo
+
+        Returns:
+            List[dict]: Nombre, tamaño y fecha de cada perfil
+        """
+        profiles = []
+        for entry in os.scandir(ProfileService.directory()):
+            if entry.is_file() and _PROFILE_NAME.match(entry.name):
+                stat_result = entry.stat()
+                profiles.append({
+                    "name": entry.name,
+                    "size": stat_result.st_size,
+                    "created_at": int(stat_result.st_mtime)
+                })
+        profiles.sort(key=lambda p: p["name"], reverse=True)
+        return profiles
+
+    @staticmethod
+    def get_path(name: str) -> Path:
+        """
+        Obtener la ruta de un perfil guardado
+
+        Args:
+            name (str): Nombre del perfil
+
+        Returns:
+            Path: Ruta del archivo
+
+        Raises:
+            HTTPException: Si el nombre no es válido o el perfil no existe
+        """
+        if not _PROFILE_NAME.match(name):
+            raise HTTPException(status_code=400, detail="Nombre de perfil inválido")
+        path = ProfileService.directory() / name
+        if not path.is_file():
+            raise HTTPException(status_code=404, detail="Perfil no encontrado")
+        return path
+
+    @staticmethod
+    def prune() -> None:
+        """Eliminar los perfiles más antiguos por encima de PROFILE_KEEP"""
+        for profile in ProfileService.list_profiles()[config.PROFILE_KEEP:]:
+            try:
+                os.unlink(ProfileService.directory() / profile["name"])
+            except FileNotFoundError:
+                pass
+
+
+def _profiled_endpoint(endpoint: Callable) -> Callable:
+    """Envolver un endpoint sincrónico para perfilarlo en el hilo del pool"""
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        return profile.run_in_thread(endpoint, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Ruta cuyos endpoints sincrónicos se pueden perfilar en el pool de hilos"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled_endpoint(endpoint), **kwargs)
@@ -0,0 +1,114 @@
+"""
+Servicio para los resúmenes de gastos y pagos
+
+Las agregaciones recorren la copia columnar de database.columnar en lugar
+de los registros de la base.
+"""
+from datetime import date
+from typing import Dict, Optional, Tuple
+from database.columnar import ColumnarStore, ColumnTable, columnar_store, mes_a_texto
+from database.connection import load_database
+from database.records import participant_ids
+from fastapi import HTTPException
+
+
+class ResumenService:
+    """Servicio para calcular totales de gastos y pagos"""
+    
+    @staticmethod
+    def gastos(desde: Optional[str] = None, hasta: Optional[str] = None) -> dict:
+        """
+        Totales de gastos por mes, por categoría y por pagador
+        
+        Args:
+            desde (Optional[str]): Fecha mínima "YYYY-MM-DD" (inclusive)
+            hasta (Optional[str]): Fecha máxima "YYYY-MM-DD" (inclusive)
+            
+        Returns:
+            dict: Total general, cantidad y totales agrupados
+            
+        Raises:
+            HTTPException: Si alguna fecha no es válida
+        """
+        rango = ResumenService._rango(desde, hasta)
+        store = ResumenService._store()
+        with store.lock:
+            por_mes = store.gastos.sum_by("mes", *rango)
+            por_categoria = store.gastos.sum_by("categoria", *rango)
+            por_pagador = store.gastos.sum_by("pagador", *rango)
+        
+        return {
+            **ResumenService._total(por_mes),
+            "por_mes": ResumenService._grupos(por_mes, mes_a_texto, ordenar=True),
+            "por_categoria": ResumenService._grupos(por_categoria, store.categorias.value),
+            "por_pagador": ResumenService._grupos(por_pagador, participant_ids.value)
+        }
+    
+    @staticmethod
+    def pagos(desde: Optional[str] = None, hasta: Optional[str] = None) -> dict:
+        """
+        Totales de pagos por mes, por deudor y por acreedor
+        
+        Args:
+            desde (Optional[str]): Fecha mínima "YYYY-MM-DD" (inclusive)
+            hasta (Optional[str]): Fecha máxima "YYYY-MM-DD" (inclusive)
+            
+        Returns:
+            dict: Total general, cantidad y totales agrupados
+            
+        Raises:
+            HTTPException: Si alguna fecha no es válida
+        """
+        rango = ResumenService._rango(desde, hasta)
+        store = ResumenService._store()
+        with store.lock:
+            por_mes = store.pagos.sum_by("mes", *rango)
+            por_deudor = store.pagos.sum_by("deudor", *rango)
+            por_acreedor = store.pagos.sum_by("acreedor", *rango)
+        
+        return {
+            **ResumenService._total(por_mes),
+            "por_mes": ResumenService._grupos(por_mes, mes_a_texto, ordenar=True),
+            "por_deudor": ResumenService._grupos(por_deudor, participant_ids.value),
+            "por_acreedor": ResumenService._grupos(por_acreedor, participant_ids.value)
+        }
+    
+    @staticmethod
+    def _store() -> ColumnarStore:
+        """Copia columnar vigente (construida en el momento si no se mantiene)"""
+        db = load_database()
+        if columnar_store.enabled:
+            return columnar_store
+        return ColumnarStore.from_ledger(db)
+    
+    @staticmethod
+    def _rango(desde: Optional[str], hasta: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+        """Convertir el rango de fechas a ordinales"""
+        try:
+            return (
+                date.fromisoformat(desde).toordinal() if desde else None,
+                date.fromisoformat(hasta).toordinal() if hasta else None
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Fecha inválida (formato YYYY-MM-DD)")
+    
+    @staticmethod
+    def _total(grupos: Dict[int, Tuple[int, int]]) -> dict:
+        """Total general a partir de una agrupación completa"""
+        return {
+            "total": sum(centavos for centavos, _ in grupos.values()) / 100,
+            "cantidad": sum(cantidad for _, cantidad in grupos.values())
+        }
+    
+    @staticmethod
+    def _grupos(grupos: Dict[int, Tuple[int, int]], etiqueta, ordenar: bool = False) -> list:
+        """Convertir una agrupación a [{clave, total, cantidad}]"""
+        filas = [
+            {"clave": etiqueta(codigo), "total": centavos / 100, "cantidad": cantidad}
+            for codigo, (centavos, cantidad) in grupos.items()
+        ]
+        if ordenar:
+            filas.sort(key=lambda fila: fila["clave"])
+        else:
+            filas.sort(key=lambda fila: -fila["total"])
+        return filas
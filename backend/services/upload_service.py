@@ -1,61 +1,203 @@
 """
 Servicio para la lógica de negocio de upload de archivos
 """
+import hashlib
 import os
-import time
-from fastapi import UploadFile, HTTPException
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
+from database.comprobante_store import ComprobanteStore
+from database.connection import current_store
+from services.image_pipeline import ImagePipeline, VARIANTS, variant_path
+from utils.multipart_upload import MultipartError, MultipartFileStream
+import config
 
 
 class UploadService:
     """Servicio para gestionar upload de archivos"""
     
-    # Directorio donde se guardarán los archivos
-    UPLOAD_DIR = Path("backend/data/uploads")
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    ALLOWED_TYPES = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
+
+    # Margen para los encabezados y separadores del formulario al comparar
+    # Content-Length con el tamaño máximo del archivo
+    MULTIPART_OVERHEAD = 16 * 1024
+
+    @staticmethod
+    def store() -> ComprobanteStore:
+        """
+        Almacén de comprobantes del consorcio de la petición en curso
+
+        Cada consorcio guarda sus comprobantes en su propio directorio
+        (config.UPLOAD_DIR para el almacén por defecto).
+
+        Returns:
+            ComprobanteStore: Almacén deduplicado por contenido
+        """
+        return current_store().comprobantes
     
     @staticmethod
-    async def save_comprobante(file: UploadFile):
-        """Guardar archivo de comprobante"""
+    def prepare_storage() -> None:
+        """
+        Crear el directorio de comprobantes y verificar que se pueda escribir
+        
+        Raises:
+            OSError: Si el directorio no se puede crear o no es escribible
+        """
+        store = UploadService.store()
+        store.root.mkdir(parents=True, exist_ok=True)
+        probe = store.new_temp_path()
+        probe.write_bytes(b"")
+        probe.unlink()
+    
+    @staticmethod
+    async def save_comprobante(request: Request):
+        """
+        Guardar archivo de comprobante
+
+        El cuerpo multipart se lee en streaming (sin el formulario bufferizado
+        de Starlette): si Content-Length ya supera el tamaño máximo se rechaza
+        sin leerlo, y si no, el archivo se copia en bloques a un temporal
+        calculando el SHA-256 a medida que llega, cortando la subida apenas
+        supera el tamaño máximo. El temporal se mueve a su lugar con un rename
+        atómico. La memoria usada por subida queda acotada por el tamaño de bloque.
+
+        El archivo se guarda direccionado por contenido: subir dos veces el
+        mismo archivo no ocupa espacio adicional. Las imágenes se encolan para
+        generar sus variantes reducidas sin demorar la respuesta.
+
+        Args:
+            request (Request): Petición multipart/form-data con el campo "file"
+
+        Raises:
+            HTTPException: Si falta el archivo, el tipo no está permitido o
+                supera el tamaño máximo
+        """
         try:
-            # Validar tipo de archivo
-            allowed_types = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
-            if file.content_type not in allowed_types:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Tipo de archivo no permitido. Solo se permiten imágenes (JPG, PNG) y PDF"
-                )
-            
-            # Validar tamaño (máximo 10MB)
-            max_size = 10 * 1024 * 1024  # 10MB
-            file_content = await file.read()
-            if len(file_content) > max_size:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El archivo es demasiado grande. Máximo permitido: 10MB"
-                )
-            
-            # Generar nombre único para el archivo
-            timestamp = int(time.time())
-            file_name = f"{timestamp}_{file.filename.replace(' ', '_')}"
-            file_path = UploadService.UPLOAD_DIR / file_name
-            
-            # Guardar archivo
-            with open(file_path, "wb") as buffer:
-                buffer.write(file_content)
-            
+            content_length = request.headers.get("content-length")
+            if content_length and content_length.isdigit() and \
+                    int(content_length) > config.UPLOAD_MAX_SIZE + UploadService.MULTIPART_OVERHEAD:
+                raise UploadService._too_large()
+
+            try:
+                upload = MultipartFileStream(request, "file")
+            except MultipartError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            store = UploadService.store()
+            tmp_path = store.new_temp_path()
+            size, sha256 = await UploadService._stream_to_file(upload, tmp_path)
+            metadata = await run_in_threadpool(
+                store.add, tmp_path, sha256, size, upload.filename, upload.content_type
+            )
+            ImagePipeline.submit(store.blob_path(sha256), upload.content_type)
+
             return {
                 "success": True,
-                "filename": file_name,
-                "original_filename": file.filename,
-                "size": len(file_content),
+                "filename": ComprobanteStore.public_name(sha256, upload.filename),
+                "original_filename": upload.filename,
+                "size": size,
+                "sha256": sha256,
+                "deduplicated": metadata["deduplicated"],
                 "message": "Archivo subido correctamente"
             }
-            
+
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al subir archivo: {str(e)}")
+
+    @staticmethod
+    def _check_type(upload: MultipartFileStream) -> None:
+        """Validar el tipo del archivo recibido"""
+        if upload.content_type not in UploadService.ALLOWED_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail="Tipo de archivo no permitido. Solo se permiten imágenes (JPG, PNG) y PDF"
+            )
+
+    @staticmethod
+    async def _stream_to_file(upload: MultipartFileStream, tmp_path: Path):
+        """
+        Copiar el archivo de un formulario a un temporal por bloques, validando tipo y tamaño y calculando su hash
+
+        Los bloques que llegan del cliente se agrupan hasta config.UPLOAD_CHUNK_SIZE
+        antes de escribirse. El temporal queda sincronizado a disco; moverlo a
+        su lugar definitivo (con un rename atómico) queda a cargo del almacén
+        de comprobantes.
+
+        Args:
+            upload (MultipartFileStream): Archivo del formulario, sin leer
+            tmp_path (Path): Ruta del archivo temporal
+
+        Returns:
+            tuple: (tamaño en bytes, SHA-256 en hexadecimal)
+
+        Raises:
+            HTTPException: Si falta el archivo, el tipo no está permitido o
+                supera el tamaño máximo
+        """
+        max_size = config.UPLOAD_MAX_SIZE
+        chunk_size = config.UPLOAD_CHUNK_SIZE
+
+        digest = hashlib.sha256()
+        size = 0
+        block = bytearray()
+        buffer = None
+        try:
+            async for chunk in upload:
+                if buffer is None:
+                    # Primer bloque: los encabezados de la parte ya se leyeron
+                    UploadService._check_type(upload)
+                    buffer = open(tmp_path, "wb")
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadService._too_large()
+                digest.update(chunk)
+                block += chunk
+                if len(block) >= chunk_size:
+                    await run_in_threadpool(buffer.write, bytes(block))
+                    block.clear()
+            if not upload.found:
+                raise HTTPException(status_code=400, detail="Falta el archivo (campo \"file\")")
+            if buffer is None:
+                # Archivo vacío
+                UploadService._check_type(upload)
+                buffer = open(tmp_path, "wb")
+            if block:
+                await run_in_threadpool(buffer.write, bytes(block))
+            await run_in_threadpool(UploadService._sync, buffer)
+        except MultipartError as e:
+            UploadService._discard(buffer, tmp_path)
+            raise HTTPException(status_code=400, detail=str(e))
+        except BaseException:
+            UploadService._discard(buffer, tmp_path)
+            raise
+        buffer.close()
+
+        return size, digest.hexdigest()
+
+    @staticmethod
+    def _discard(buffer, tmp_path: Path) -> None:
+        """Cerrar y borrar el temporal de una subida fallida"""
+        if buffer is not None:
+            buffer.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    @staticmethod
+    def _sync(buffer) -> None:
+        """Forzar a disco el contenido de un archivo abierto"""
+        buffer.flush()
+        os.fsync(buffer.fileno())
+
+    @staticmethod
+    def _too_large() -> HTTPException:
+        """Error para archivos que superan el tamaño máximo"""
+        max_mb = config.UPLOAD_MAX_SIZE // (1024 * 1024)
+        return HTTPException(
+            status_code=400,
+            detail=f"El archivo es demasiado grande. Máximo permitido: {max_mb}MB"
+        )
     
     @staticmethod
     def get_comprobante_path(filename: str):
@@ -64,9 +206,34 @@ class UploadService:
         if ".." in filename or "/" in filename or "\\" in filename:
             raise HTTPException(status_code=400, detail="Nombre de archivo inválido")
         
-        file_path = UploadService.UPLOAD_DIR / filename
+        file_path = UploadService.store().resolve(filename)
         
-        if not file_path.exists():
+        if file_path is None:
             raise HTTPException(status_code=404, detail="Archivo no encontrado")
         
-        return file_path
\ No newline at end of file
+        return file_path
+
+    @staticmethod
+    def get_variant_path(filename: str, variant: str):
+        """
+        Obtener path de una variante reducida de un comprobante
+
+        Args:
+            filename (str): Nombre del comprobante
+            variant (str): Nombre de la variante ("thumb" o "display")
+
+        Returns:
+            Optional[Path]: Ruta de la variante, o None si todavía no existe
+
+        Raises:
+            HTTPException: Si la variante no es válida o el comprobante no existe
+        """
+        if variant not in VARIANTS:
+            raise HTTPException(status_code=400, detail="Variante inválida")
+
+        file_path = UploadService.get_comprobante_path(filename)
+        if ComprobanteStore.parse_name(filename) is None:
+            return None
+
+        path = variant_path(file_path, variant)
+        return path if path.exists() else None
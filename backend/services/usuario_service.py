@@ -2,7 +2,7 @@
 Servicio para la lógica de negocio del usuario actual
 """
 from models.schemas import UsuarioActual, UsuarioActualUpdate
-from database.connection import load_database, save_database
+from database.connection import load_database, transaction
 from services.participante_service import ParticipanteService
 from fastapi import HTTPException
 
@@ -41,20 +41,18 @@ class UsuarioService:
         Raises:
             HTTPException: Si el usuario no existe en participantes
         """
-        db = load_database()
-        
-        # Verificar que el usuario existe en participantes
-        if not ParticipanteService.exists(usuario_data.id):
-            raise HTTPException(
-                status_code=400, 
-                detail="El usuario debe existir en la lista de participantes"
-            )
-        
         # Crear el usuario actual
         usuario_actual = UsuarioActual(**usuario_data.model_dump())
         
-        db.usuarioActual = usuario_actual
-        save_database(db)
+        with transaction() as db:
+            # Verificar que el usuario existe en participantes
+            if not ParticipanteService.exists(usuario_data.id):
+                raise HTTPException(
+                    status_code=400, 
+                    detail="El usuario debe existir en la lista de participantes"
+                )
+            
+            db.usuarioActual = usuario_actual
         
         return usuario_actual
     
@@ -83,9 +81,8 @@ class UsuarioService:
             unidad=participante.unidad
         )
         
-        db = load_database()
-        db.usuarioActual = usuario_actual
-        save_database(db)
+        with transaction() as db:
+            db.usuarioActual = usuario_actual
         
         return usuario_actual
     
@@ -97,8 +94,7 @@ class UsuarioService:
         Returns:
             dict: Mensaje de confirmación
         """
-        db = load_database()
-        db.usuarioActual = None
-        save_database(db)
+        with transaction() as db:
+            db.usuarioActual = None
         
         return {"message": "Usuario actual limpiado correctamente"}
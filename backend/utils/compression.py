@@ -0,0 +1,111 @@
+"""
+Negociación y compresión de cuerpos de respuesta (gzip y brotli)
+
+La codificación elegida para la petición en curso queda en un ContextVar
+(ver CompressionMiddleware), de modo que las respuestas guardadas ya
+serializadas (ver utils.response_cache) pueden guardarse también ya
+comprimidas.
+
+Brotli requiere el paquete "brotli" (opcional); sin él se ofrece solo gzip.
+"""
+import gzip
+from contextvars import ContextVar
+from typing import Optional
+import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Niveles acotados: los niveles altos cuestan mucho CPU y ahorran poco en JSON
+GZIP_LEVEL = max(1, min(config.COMPRESSION_GZIP_LEVEL, 9))
+BROTLI_QUALITY = max(0, min(config.COMPRESSION_BROTLI_QUALITY, 11))
+
+# Codificaciones soportadas, en orden de preferencia ante igual calidad
+SUPPORTED = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Tipos de contenido que vale la pena comprimir
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+# Codificación aceptada por la petición en curso (None: sin comprimir)
+accepted_encoding: ContextVar[Optional[str]] = ContextVar("accepted_encoding", default=None)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Elegir la codificación a partir del header Accept-Encoding
+
+    Args:
+        accept_encoding (Optional[str]): Valor del header (por ejemplo "gzip, br;q=0.9")
+
+    Returns:
+        Optional[str]: "br" o "gzip", o None si el cliente no acepta ninguna soportada
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+    best = None
+    best_quality = 0.0
+    for encoding in SUPPORTED:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """
+    Indicar si un tipo de contenido se beneficia de la compresión
+
+    Args:
+        content_type (Optional[str]): Header Content-Type de la respuesta
+
+    Returns:
+        bool: True para JSON, texto, CSV y similares (no para imágenes ni PDF)
+    """
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Comprimir un cuerpo de respuesta
+
+    Args:
+        body (bytes): Cuerpo sin comprimir
+        encoding (str): "br" o "gzip"
+
+    Returns:
+        bytes: Cuerpo comprimido
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime fijo: el mismo cuerpo produce siempre los mismos bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def add_vary(headers, value: str = "Accept-Encoding") -> None:
+    """
+    Agregar un valor al header Vary sin repetirlo
+
+    Args:
+        headers (MutableHeaders): Headers de la respuesta
+        value (str): Header del que depende la respuesta
+    """
+    current = headers.get("vary")
+    if current is None:
+        headers["Vary"] = value
+    elif value.lower() not in (item.strip().lower() for item in current.split(",")):
+        headers["Vary"] = f"{current}, {value}"
@@ -0,0 +1,93 @@
+"""
+Middleware ASGI que comprime las respuestas según Accept-Encoding
+
+Comprime con gzip o brotli los cuerpos de tipo texto/JSON que superan
+COMPRESSION_MIN_BYTES y se envían en un solo mensaje. No toca las
+respuestas que ya vienen comprimidas (las respuestas guardadas de
+utils.response_cache), las que se envían por partes ni los archivos
+(zero-copy). Los cuerpos grandes se comprimen en el pool de hilos para no
+demorar el event loop.
+"""
+from typing import Optional
+import anyio
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from utils.compression import accepted_encoding, add_vary, compress, is_compressible, negotiate
+import config
+
+
+# Cuerpos a partir de los cuales la compresión se hace fuera del event loop
+THREAD_MIN_BYTES = 256 * 1024
+
+# Estados sin cuerpo o con cuerpo parcial
+_SKIP_STATUS = (204, 206, 304)
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CompressionMiddleware:
+    """Comprime las respuestas de texto y JSON con la codificación que acepta el cliente"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.COMPRESSION:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(_header(scope, b"accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Se demora hasta ver el cuerpo: Content-Length puede cambiar
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            pending, start = start, None
+            headers = MutableHeaders(scope=pending)
+            if (
+                pending["status"] in _SKIP_STATUS
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"))
+            ):
+                await send(pending)
+                await send(message)
+                return
+
+            add_vary(headers)
+            body = message.get("body", b"")
+            if message["type"] == "http.response.body" and not message.get("more_body", False) \
+                    and len(body) >= config.COMPRESSION_MIN_BYTES:
+                if len(body) >= THREAD_MIN_BYTES:
+                    compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+                else:
+                    compressed = compress(body, encoding)
+                if len(compressed) < len(body):
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(compressed))
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        # Otra representación: el ETag fuerte ya no identifica estos bytes
+                        headers["ETag"] = f"W/{etag}"
+                    message = {**message, "body": compressed}
+            await send(pending)
+            await send(message)
+
+        token = accepted_encoding.set(encoding)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            accepted_encoding.reset(token)
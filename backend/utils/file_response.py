@@ -0,0 +1,223 @@
+"""
+Respuesta de archivos con soporte de Range, validación condicional y envío zero-copy
+"""
+import mimetypes
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+
+# Tamaño de bloque cuando el servidor no ofrece envío zero-copy
+CHUNK_SIZE = 256 * 1024
+
+# Archivos direccionados por contenido: nunca cambian
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Archivos con nombre arbitrario: el cliente debe revalidar
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class RangeFileResponse(Response):
+    """
+    Envía un archivo respetando Range (206), If-None-Match / If-Modified-Since (304)
+    e If-Range. Usa la extensión ASGI "http.response.zerocopysend" (sendfile)
+    cuando el servidor la ofrece y, si no, lee el archivo por bloques.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        etag: Optional[str] = None,
+        immutable: bool = False,
+        content_disposition_type: str = "inline"
+    ):
+        """
+        Args:
+            path (str): Ruta del archivo a enviar
+            filename (Optional[str]): Nombre informado al cliente
+            media_type (Optional[str]): Tipo MIME (se deduce del nombre si se omite)
+            etag (Optional[str]): Validador fuerte (sin comillas); se deriva de mtime y tamaño si se omite
+            immutable (bool): True si el contenido nunca cambia para esta URL
+            content_disposition_type (str): "inline" o "attachment"
+        """
+        self.path = str(path)
+        self.filename = filename or os.path.basename(self.path)
+        self.media_type = media_type or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+        self.etag_value = etag
+        self.immutable = immutable
+        self.content_disposition_type = content_disposition_type
+        self.background = None
+        self.status_code = 200
+        self.raw_headers = []
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            await Response("Archivo no encontrado", status_code=404)(scope, receive, send)
+            return
+        if not stat.S_ISREG(stat_result.st_mode):
+            await Response("Archivo no encontrado", status_code=404)(scope, receive, send)
+            return
+
+        size = stat_result.st_size
+        etag = '"%s"' % (self.etag_value or f"{stat_result.st_mtime_ns:x}-{size:x}")
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        request_headers = _request_headers(scope)
+
+        headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"last-modified", last_modified.encode("latin-1")),
+            (b"accept-ranges", b"bytes"),
+            (b"cache-control", (IMMUTABLE_CACHE_CONTROL if self.immutable else REVALIDATE_CACHE_CONTROL).encode("latin-1")),
+        ]
+
+        if _not_modified(request_headers, etag, stat_result.st_mtime):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status = 200
+        start, length = 0, size
+        range_header = request_headers.get("range")
+        if range_header and _if_range_matches(request_headers.get("if-range"), etag, last_modified):
+            parsed = _parse_range(range_header, size)
+            if parsed == "unsatisfiable":
+                headers.append((b"content-range", f"bytes */{size}".encode("latin-1")))
+                headers.append((b"content-length", b"0"))
+                await send({"type": "http.response.start", "status": 416, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if parsed is not None:
+                start, end = parsed
+                length = end - start + 1
+                status = 206
+                headers.append((b"content-range", f"bytes {start}-{end}/{size}".encode("latin-1")))
+
+        disposition = f'{self.content_disposition_type}; filename="{self.filename}"'
+        headers += [
+            (b"content-type", self.media_type.encode("latin-1")),
+            (b"content-length", str(length).encode("latin-1")),
+            (b"content-disposition", disposition.encode("latin-1")),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+        if scope.get("method") == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            await self._send_zerocopy(send, start, length)
+        else:
+            await self._send_chunks(send, start, length)
+
+    async def _send_zerocopy(self, send: Send, start: int, length: int) -> None:
+        """Delegar el envío al servidor (sendfile)"""
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": fd,
+                "offset": start,
+                "count": length,
+            })
+        finally:
+            os.close(fd)
+
+    async def _send_chunks(self, send: Send, start: int, length: int) -> None:
+        """Leer y enviar el rango pedido por bloques"""
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # El archivo se achicó durante el envío
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _request_headers(scope: Scope) -> dict:
+    """Headers de la petición con nombres en minúscula"""
+    return {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in scope.get("headers", [])
+    }
+
+
+def _etag_list(value: str) -> List[str]:
+    """Lista de ETags de un header, ignorando el prefijo débil W/"""
+    tags = []
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tags.append(tag)
+    return tags
+
+
+def _not_modified(headers: dict, etag: str, mtime: float) -> bool:
+    """Evaluar If-None-Match (prioritario) e If-Modified-Since"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = _etag_list(if_none_match)
+        return "*" in tags or etag in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def _if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+    """If-Range: el Range solo aplica si el validador sigue vigente"""
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return if_range == etag
+    return if_range == last_modified
+
+
+def _parse_range(value: str, size: int):
+    """
+    Interpretar un header Range de un solo rango
+
+    Returns:
+        Tuple[int, int] con (inicio, fin) inclusivos, None para ignorar el
+        header (sintaxis no soportada o varios rangos), o "unsatisfiable"
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            # Sufijo: los últimos N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                return "unsatisfiable"
+            return (max(size - suffix, 0), size - 1) if size > 0 else "unsatisfiable"
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    if end < start:
+        return None
+    return start, min(end, size - 1)
@@ -1,21 +1,87 @@
 """
 Utilidades y funciones helper
 """
-import random
-import string
+import os
+import re
+import threading
+import time
 from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from fastapi import HTTPException
+
+
+# Alfabeto Base32 de Crockford usado por los ULID
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ULID_PATTERN = re.compile(r"^[0-7][0-9A-HJKMNP-TV-Z]{25}$")
+_ULID_RANDOM_MAX = (1 << 80) - 1
+
+# Último ULID generado por este proceso (para la monotonía dentro del mismo ms)
+_ulid_lock = threading.Lock()
+_ulid_last_ms = -1
+_ulid_last_random = 0
+
+
+def _reset_ulid_state() -> None:
+    """Descartar el estado heredado tras un fork para no repetir la secuencia del padre"""
+    global _ulid_lock, _ulid_last_ms, _ulid_last_random
+    _ulid_lock = threading.Lock()
+    _ulid_last_ms = -1
+    _ulid_last_random = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_ulid_state)
+
+
+def _encode_ulid(value: int) -> str:
+    """Codificar un entero de 128 bits como 26 caracteres Base32 de Crockford"""
+    chars = []
+    for _ in range(26):
+        chars.append(_ULID_ALPHABET[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars))
 
 
 def generate_id() -> str:
     """
-    Generar un ID único para entidades
+    Generar un ID único para entidades (ULID)
+    
+    48 bits de timestamp en milisegundos seguidos de 80 bits aleatorios. Dentro
+    del mismo milisegundo la parte aleatoria se incrementa, de modo que los IDs
+    de un proceso son estrictamente crecientes y se ordenan lexicográficamente
+    por fecha de creación. La parte aleatoria inicial de cada milisegundo hace
+    despreciable la colisión entre procesos.
     
     Returns:
         str: ID único generado
     """
-    timestamp = int(datetime.now().timestamp() * 1000)
-    random_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=9))
-    return f"{timestamp}{random_suffix}"
+    global _ulid_last_ms, _ulid_last_random
+    with _ulid_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _ulid_last_ms:
+            _ulid_last_ms = now_ms
+            _ulid_last_random = int.from_bytes(os.urandom(10), "big")
+        elif _ulid_last_random < _ULID_RANDOM_MAX:
+            # Mismo milisegundo (o reloj atrasado): continuar la secuencia
+            _ulid_last_random += 1
+        else:
+            _ulid_last_ms += 1
+            _ulid_last_random = int.from_bytes(os.urandom(10), "big")
+        value = (_ulid_last_ms << 80) | _ulid_last_random
+    return _encode_ulid(value)
+
+
+def is_ulid(entity_id: str) -> bool:
+    """
+    Verificar si un ID tiene formato ULID
+    
+    Args:
+        entity_id (str): ID a verificar
+        
+    Returns:
+        bool: True si es un ULID (los IDs anteriores no lo son)
+    """
+    return bool(_ULID_PATTERN.match(entity_id))
 
 
 def format_currency(amount: float) -> str:
@@ -52,3 +118,115 @@ def get_current_date() -> str:
         str: Fecha actual formateada
     """
     return datetime.now().strftime("%Y-%m-%d")
+
+
+def format_etag(version: int) -> str:
+    """
+    Formatear la versión de una entidad como ETag
+
+    Args:
+        version (int): Versión de la entidad
+
+    Returns:
+        str: ETag fuerte (entre comillas)
+    """
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Obtener la versión esperada a partir de un header If-Match
+
+    Args:
+        if_match (Optional[str]): Valor del header If-Match
+
+    Returns:
+        Optional[int]: Versión esperada, o None si no se exige ninguna
+
+    Raises:
+        HTTPException: Si el header no corresponde a una versión válida
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail="Header If-Match inválido")
+
+    return int(value)
+
+
+def check_version(current: int, expected: Optional[int]) -> None:
+    """
+    Verificar que la versión actual coincida con la esperada
+
+    Args:
+        current (int): Versión almacenada
+        expected (Optional[int]): Versión enviada por el cliente (None para omitir)
+
+    Raises:
+        HTTPException: Si la entidad fue modificada por otro cliente
+    """
+    if expected is not None and current != expected:
+        raise HTTPException(
+            status_code=409,
+            detail="La entidad fue modificada por otro usuario. Recargue e intente nuevamente"
+        )
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Obtener los campos pedidos con el parámetro fields= (separados por comas)
+
+    Args:
+        fields (Optional[str]): Valor del parámetro
+        allowed (Sequence[str]): Campos de la entidad, en el orden de la respuesta
+
+    Returns:
+        Optional[Tuple[str, ...]]: Campos pedidos más "id", en el orden de la
+            entidad, o None si se piden todos
+
+    Raises:
+        HTTPException: Si se pide un campo que la entidad no tiene
+    """
+    if fields is None or not fields.strip():
+        return None
+    pedidos = {field.strip() for field in fields.split(",") if field.strip()}
+    desconocidos = pedidos.difference(allowed)
+    if desconocidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos desconocidos: {', '.join(sorted(desconocidos))}"
+        )
+    pedidos.add("id")
+    return tuple(field for field in allowed if field in pedidos)
+
+
+def parse_embed(embed: Optional[str], allowed: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Obtener las relaciones pedidas con el parámetro embed= (separadas por comas)
+
+    Args:
+        embed (Optional[str]): Valor del parámetro
+        allowed (Sequence[str]): Relaciones que se pueden embeber
+
+    Returns:
+        Tuple[str, ...]: Relaciones pedidas, en el orden de allowed
+
+    Raises:
+        HTTPException: Si se pide una relación no soportada
+    """
+    if embed is None:
+        return ()
+    pedidas = {name.strip() for name in embed.split(",") if name.strip()}
+    desconocidas = pedidas.difference(allowed)
+    if desconocidas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No se puede embeber: {', '.join(sorted(desconocidas))}"
+        )
+    return tuple(name for name in allowed if name in pedidas)
@@ -0,0 +1,241 @@
+"""
+Métricas del proceso en formato de texto de Prometheus
+
+Contadores, gauges e histogramas mínimos (sin dependencias externas).
+Registrar una observación es una búsqueda binaria y un par de sumas bajo
+un lock; el texto de exposición solo se arma cuando se consulta /metrics.
+Cada worker lleva sus propias métricas.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+# Límites de los histogramas de duración (segundos)
+DURATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Límites de los histogramas de tamaño (bytes)
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864
+)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base de las métricas: nombre, ayuda y etiquetas"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Valor que solo crece"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        """
+        Incrementar el contador
+
+        Args:
+            *labelvalues (str): Valores de las etiquetas, en orden
+            amount (float): Cantidad a sumar
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Distribución de observaciones en intervalos fijos"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Por etiquetas: [conteo por intervalo (el último es +Inf), suma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """
+        Registrar una observación
+
+        Args:
+            value (float): Valor observado
+            *labelvalues (str): Valores de las etiquetas, en orden
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        """
+        Medir la duración de un bloque (también si lanza una excepción)
+
+        Args:
+            *labelvalues (str): Valores de las etiquetas, en orden
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        lines = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """
+    Armar el texto de exposición de todas las métricas registradas
+
+    Returns:
+        str: Métricas en formato de texto de Prometheus (versión 0.0.4)
+    """
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Métricas de la aplicación
+HTTP_REQUESTS = Counter(
+    "miconsorcio_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "miconsorcio_http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "route")
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "miconsorcio_http_response_size_bytes", "Tamaño del cuerpo de las respuestas HTTP",
+    ("method", "route"), buckets=SIZE_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "miconsorcio_http_requests_in_flight", "Peticiones HTTP en curso"
+)
+STORAGE_DURATION = Histogram(
+    "miconsorcio_storage_duration_seconds",
+    "Duración de las operaciones de la base de datos (load, read, save, flush)", ("operation",)
+)
+INDEX_REBUILD_DURATION = Histogram(
+    "miconsorcio_index_rebuild_duration_seconds", "Duración de la reconstrucción de índices derivados", ("index",)
+)
+PASSWORD_VERIFY_DURATION = Histogram(
+    "miconsorcio_password_verify_duration_seconds", "Duración de la verificación de contraseñas (bcrypt)"
+)
+EVENT_LOOP_LAG = Histogram(
+    "miconsorcio_event_loop_lag_seconds", "Retraso del event loop respecto del intervalo de muestreo"
+)
+TENANTS_RESIDENT = Gauge(
+    "miconsorcio_tenants_resident", "Consorcios con su almacén abierto en este worker"
+)
+TENANTS_RESIDENT_BYTES = Gauge(
+    "miconsorcio_tenants_resident_bytes", "Memoria estimada de las bases de consorcios cargadas"
+)
+TENANT_EVICTIONS = Counter(
+    "miconsorcio_tenant_evictions_total", "Consorcios desalojados del LRU de almacenes"
+)
@@ -0,0 +1,74 @@
+"""
+Middleware ASGI que mide cada petición HTTP
+
+Registra duración, tamaño de respuesta y estado por ruta (la plantilla de
+la ruta, por ejemplo "/gastos/{gasto_id}", para no crear una serie por ID)
+y la cantidad de peticiones en curso. Es ASGI puro: no envuelve el cuerpo
+de la respuesta, de modo que el envío zero-copy de archivos sigue
+funcionando.
+"""
+import time
+from typing import Callable, Dict, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from utils.metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_RESPONSE_SIZE
+
+
+# Etiqueta de las peticiones que no corresponden a ninguna ruta
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Mide latencia, tamaño y estado de las respuestas por ruta"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Optional[Dict[Callable, str]] = None
+
+    def _route_label(self, scope: Scope) -> str:
+        """Plantilla de la ruta que atendió la petición"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._routes is None or endpoint not in self._routes:
+            application = scope.get("app")
+            routes = getattr(application, "routes", [])
+            self._routes = {
+                route.endpoint: route.path for route in routes if hasattr(route, "endpoint")
+            }
+        return self._routes.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        declared_size: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size, declared_size
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-length":
+                        declared_size = int(value)
+                        break
+            elif message_type == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            method = scope["method"]
+            route = self._route_label(scope)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method, route)
+            if declared_size is not None and method != "HEAD":
+                size = declared_size
+            HTTP_RESPONSE_SIZE.observe(size, method, route)
@@ -0,0 +1,118 @@
+"""
+Lectura en streaming de un archivo de un formulario multipart
+
+Starlette lee el formulario completo (a un SpooledTemporaryFile) antes de
+llamar al handler, por lo que no se puede cortar una subida demasiado grande
+ni evitar escribirla dos veces a disco. Este lector recorre el cuerpo de la
+petición con el parser de python-multipart y entrega los bloques del archivo
+a medida que llegan.
+"""
+from typing import AsyncIterator, List, Optional, Tuple
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+
+class MultipartError(ValueError):
+    """Cuerpo multipart inválido"""
+
+
+class MultipartFileStream:
+    """
+    Archivo de un campo de un formulario multipart, leído sin bufferizar
+
+    Uso:
+        upload = MultipartFileStream(request, "file")
+        async for chunk in upload:
+            ...
+
+    filename y content_type quedan disponibles en cuanto empieza el primer
+    bloque (o al terminar, si el archivo está vacío). Los demás campos del
+    formulario se descartan.
+    """
+
+    def __init__(self, request: Request, field_name: str):
+        """
+        Args:
+            request (Request): Petición con cuerpo multipart/form-data
+            field_name (str): Nombre del campo del archivo
+
+        Raises:
+            MultipartError: Si la petición no es multipart o no tiene boundary
+        """
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise MultipartError("Se esperaba un formulario multipart/form-data")
+        self.request = request
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.found = False
+        self._boundary = params[b"boundary"]
+        # Estado de la parte en curso
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._in_file = False
+        self._done = False
+        self._pending: List[bytes] = []
+
+    def _on_part_begin(self) -> None:
+        self._headers = []
+        self._in_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers.append((self._header_name.lower(), self._header_value))
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        headers = dict(self._headers)
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        # Solo el primer archivo del campo pedido
+        if self.found or options.get(b"name") != self.field_name.encode() or b"filename" not in options:
+            return
+        self.found = True
+        self._in_file = True
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self.content_type = headers.get(b"content-type", b"").decode("latin-1") or None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._done = True
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        parser = MultipartParser(self._boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+        async for body in self.request.stream():
+            try:
+                parser.write(body)
+            except MultipartParseError as e:
+                raise MultipartError(f"Formulario multipart inválido: {e}") from e
+            pending, self._pending = self._pending, []
+            for chunk in pending:
+                if chunk:
+                    yield chunk
+            if self._done:
+                # El resto del cuerpo no interesa
+                return
+        if self.found and not self._done:
+            raise MultipartError("El formulario multipart está incompleto")
@@ -0,0 +1,89 @@
+"""
+Middleware ASGI que perfila las peticiones marcadas
+
+Una petición se perfila si trae "X-Profile: 1" o "?_profile=1" junto con
+"X-Admin-Token". El nombre del perfil guardado vuelve en el header
+"X-Profile-Id" (se descarga desde /admin/profiles/{name}). Si ya hay
+tantas peticiones perfilándose como permite la configuración, la petición
+se atiende sin perfilar y responde "X-Profile-Id: busy". Sin pyinstrument
+solo se perfilan los endpoints sincrónicos (con cProfile); las demás
+peticiones responden "X-Profile-Id: unsupported", y en Python 3.12+ 503.
+
+Las peticiones no marcadas solo pagan la búsqueda del header.
+"""
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.profile_service import ProfileService
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_flagged(scope: Scope) -> bool:
+    if _header(scope, b"x-profile") == "1":
+        return True
+    query = scope.get("query_string", b"")
+    return b"_profile=1" in query.split(b"&")
+
+
+class ProfilingMiddleware:
+    """Ejecuta bajo un profiler las peticiones marcadas por un administrador"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not ProfileService.enabled() or not _is_flagged(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not ProfileService.is_admin(_header(scope, b"x-admin-token")):
+            response = JSONResponse({"detail": "Token de administración inválido"}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        if not ProfileService.available():
+            response = JSONResponse(
+                {"detail": "El perfilado requiere pyinstrument en Python 3.12 o posterior"},
+                status_code=503
+            )
+            await response(scope, receive, send)
+            return
+
+        profile = ProfileService.start(scope["method"], scope["path"])
+        if profile is None:
+            await self.app(scope, receive, self._with_profile_id(send, lambda: "busy"))
+            return
+
+        # El perfil se guarda al terminar: la respuesta se retiene hasta entonces,
+        # por lo que no se puede usar el envío zero-copy (el archivo ya estaría cerrado)
+        extensions = scope.get("extensions") or {}
+        scope["extensions"] = {k: v for k, v in extensions.items() if k != "http.response.zerocopysend"}
+        messages = []
+
+        async def buffer(message: Message) -> None:
+            messages.append(message)
+
+        try:
+            await self.app(scope, receive, buffer)
+        finally:
+            profile_id = ProfileService.finish(profile)
+
+        send_with_id = self._with_profile_id(send, lambda: profile_id or "unsupported")
+        for message in messages:
+            await send_with_id(message)
+
+    @staticmethod
+    def _with_profile_id(send: Send, profile_id) -> Send:
+        async def wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Profile-Id", profile_id())
+            await send(message)
+        return wrapper
@@ -0,0 +1,173 @@
+"""
+Respuestas JSON pre-serializadas compartidas entre peticiones
+
+Las peticiones idénticas que llegan mientras otra está calculando la misma
+respuesta esperan ese cálculo en lugar de repetirlo (single-flight), y el
+resultado queda en un LRU chico hasta que cambian los datos (ver
+database.connection.data_version). Las claves incluyen el consorcio de la
+petición; los cuerpos comprimidos se guardan como variantes de la misma
+respuesta.
+"""
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+from database.connection import current_store, data_version, load_database
+from utils.compression import accepted_encoding, compress
+import config
+
+
+def render_json(content: Any) -> bytes:
+    """
+    Serializar igual que JSONResponse de Starlette
+
+    Args:
+        content (Any): Datos serializables a JSON
+
+    Returns:
+        bytes: JSON compacto en UTF-8
+    """
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class ResponseCache:
+    """LRU de cuerpos serializados con cálculo único por clave y versión"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        """
+        Args:
+            max_entries (int): Cantidad máxima de respuestas guardadas
+            max_bytes (int): Tamaño máximo total de las respuestas guardadas
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, bytes]]" = OrderedDict()
+        self._size = 0
+        self._in_flight: Dict[Tuple[Hashable, Hashable], "asyncio.Future[bytes]"] = {}
+
+    def _get(self, key: Hashable, version: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _put(self, key: Hashable, version: Hashable, body: bytes) -> None:
+        self._discard(key)
+        if len(body) > self.max_bytes:
+            return
+        self._entries[key] = (version, body)
+        self._size += len(body)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self) -> None:
+        """Descartar todas las respuestas guardadas"""
+        self._entries.clear()
+        self._size = 0
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], bytes],
+        version_of: Callable[[], Hashable] = data_version
+    ) -> bytes:
+        """
+        Obtener el cuerpo de una respuesta, calculándolo una sola vez por versión
+
+        El cálculo corre en el pool de hilos; las peticiones concurrentes con
+        la misma clave y versión de datos esperan ese mismo cálculo.
+
+        Args:
+            key (Hashable): Identificación de la respuesta (ruta y parámetros)
+            compute (Callable[[], bytes]): Función que serializa la respuesta
+            version_of (Callable[[], Hashable]): Versión de los datos de los
+                que depende la respuesta (por defecto, la de toda la base)
+
+        Returns:
+            bytes: Cuerpo serializado
+        """
+        # Detectar escrituras de otros workers antes de leer la versión
+        load_database()
+        version = version_of()
+        key = (current_store().tenant_id, key)
+
+        body = self._get(key, version)
+        if body is not None:
+            return body
+
+        flight = (key, version)
+        task = self._in_flight.get(flight)
+        if task is None:
+            # El cálculo no pertenece a ninguna petición: si la primera se
+            # cancela, las demás siguen esperando el mismo resultado
+            task = asyncio.ensure_future(run_in_threadpool(compute))
+            self._in_flight[flight] = task
+            task.add_done_callback(lambda done: self._finish(flight, done, version_of))
+        return await asyncio.shield(task)
+
+    def _finish(
+        self, flight: Tuple[Hashable, Hashable], task: "asyncio.Future[bytes]", version_of: Callable[[], Hashable]
+    ) -> None:
+        self._in_flight.pop(flight, None)
+        key, version = flight
+        if not task.cancelled() and task.exception() is None and version == version_of():
+            self._put(key, version, task.result())
+
+
+response_cache = ResponseCache(
+    max_entries=config.RESPONSE_CACHE_ENTRIES,
+    max_bytes=config.RESPONSE_CACHE_MAX_BYTES
+)
+
+
+async def cached_json_response(key: Hashable, compute: Callable[[], Any]) -> Response:
+    """
+    Responder con JSON compartido entre peticiones idénticas
+
+    Si la petición acepta gzip o brotli (ver CompressionMiddleware), el
+    cuerpo comprimido también queda guardado: las lecturas repetidas sin
+    cambios en los datos no serializan ni comprimen.
+
+    Args:
+        key (Hashable): Identificación de la respuesta (ruta y parámetros)
+        compute (Callable[[], Any]): Función que devuelve los datos a serializar
+
+    Returns:
+        Response: Respuesta JSON con el cuerpo compartido
+    """
+    encoding = accepted_encoding.get()
+    load_database()
+    version = data_version()
+    body = await response_cache.get_or_compute(key, lambda: render_json(compute()))
+    if encoding is None or len(body) < config.COMPRESSION_MIN_BYTES:
+        return Response(content=body, media_type="application/json")
+
+    def compute_encoded() -> bytes:
+        # Reusar el JSON ya serializado solo si los datos no cambiaron desde entonces
+        source = body if data_version() == version else render_json(compute())
+        return compress(source, encoding)
+
+    encoded = await response_cache.get_or_compute((key, encoding), compute_encoded)
+    return Response(
+        content=encoded,
+        media_type="application/json",
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+    )
@@ -0,0 +1,80 @@
+"""
+Middleware ASGI que elige el consorcio de cada petición
+
+El consorcio se indica con el prefijo de ruta "/consorcios/<id>" (que se
+quita antes de enrutar: "/consorcios/torre-norte/gastos/" llega a la ruta
+"/gastos/") o con el header "X-Consorcio". Las peticiones sin consorcio
+usan la base por defecto. El almacén del consorcio queda marcado en uso
+mientras dura la petición, de modo que no se desaloja a mitad de camino.
+"""
+from typing import Optional, Tuple
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from database.connection import use_store
+from database.tenants import TenantRegistry, tenant_registry
+import config
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _split_prefix(path: str) -> Tuple[Optional[str], str]:
+    """Separar el ID de consorcio del prefijo de la ruta: (id o None, resto de la ruta)"""
+    prefix = config.TENANT_PATH_PREFIX + "/"
+    if not path.startswith(prefix):
+        return None, path
+    tenant_id, _, rest = path[len(prefix):].partition("/")
+    return tenant_id, "/" + rest
+
+
+class TenantMiddleware:
+    """Asocia cada petición al almacén de su consorcio"""
+
+    def __init__(self, app: ASGIApp, registry: TenantRegistry = tenant_registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path_id, path = _split_prefix(scope["path"])
+        header_id = _header(scope, b"x-consorcio")
+        if path_id is not None and header_id is not None and path_id != header_id:
+            await self._error(scope, receive, send, 400, "El header X-Consorcio no coincide con la ruta")
+            return
+        tenant_id = path_id if path_id is not None else header_id
+        if tenant_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.registry.is_valid_id(tenant_id):
+            await self._error(scope, receive, send, 400, "ID de consorcio inválido")
+            return
+        store = self.registry.acquire(tenant_id)
+        if store is None:
+            await self._error(scope, receive, send, 404, "Consorcio no encontrado")
+            return
+
+        if path_id is not None:
+            # El scope se modifica en el lugar: los middlewares externos ven la ruta resuelta
+            mount = f"{config.TENANT_PATH_PREFIX}/{path_id}"
+            scope["path"] = path
+            scope["root_path"] = scope.get("root_path", "") + mount
+            if "raw_path" in scope and scope["raw_path"] is not None:
+                scope["raw_path"] = scope["raw_path"][len(mount.encode()):] or b"/"
+        try:
+            with use_store(store):
+                await self.app(scope, receive, send)
+        finally:
+            self.registry.release(store)
+
+    @staticmethod
+    async def _error(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str) -> None:
+        response = JSONResponse({"detail": detail}, status_code=status_code)
+        await response(scope, receive, send)